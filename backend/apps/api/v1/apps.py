@@ -6,3 +6,6 @@ class ApiConfig(AppConfig):
     name = "backend.apps.api.v1"
     verbose_name = " API"
     default_auto_field = "django.db.models.BigAutoField"
+
+    def ready(self):
+        import backend.apps.api.v1.signals  # noqa
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Process local tree of the areas
+
+The ancestors and descendants of every area are loaded once per process from their
+closure table, along with their localized names, so that pruning coverages and
+filtering by area need no queries per request. Every change of the areas bumps a
+version in Redis, which makes all processes reload the tree on their next lookup.
+"""
+
+from collections import defaultdict
+from threading import Lock
+from types import MappingProxyType
+from typing import Iterable
+
+from django.apps import apps
+from loguru import logger
+
+from backend.custom.client import get_redis_client
+
+VERSION_KEY = "areas:tree:version"
+
+LOCALES = ["pt", "en", "es"]
+
+_cache: dict[str, tuple[int, "AreaTree"]] = {}
+_lock = Lock()
+
+
+class AreaTree:
+    """Immutable tree of the areas by slug
+
+    Args:
+        links: `(ancestor, descendant, depth)` slugs of the closure table
+        names: localized names of the areas, by slug and locale
+    """
+
+    def __init__(
+        self,
+        links: Iterable[tuple[str, str, int]],
+        names: dict[str, dict[str, str]] = None,
+    ):
+        ancestors = defaultdict(list)
+        descendants = defaultdict(set)
+        for ancestor, descendant, depth in links:
+            if depth > 0:
+                ancestors[descendant].append((depth, ancestor))
+                descendants[ancestor].add(descendant)
+
+        self.ancestors = MappingProxyType(
+            {
+                slug: tuple(ancestor for _, ancestor in sorted(items))
+                for slug, items in ancestors.items()
+            }
+        )
+        self.descendants = MappingProxyType(
+            {slug: frozenset(items) for slug, items in descendants.items()}
+        )
+        self.names = MappingProxyType(
+            {slug: MappingProxyType(dict(locales)) for slug, locales in (names or {}).items()}
+        )
+
+    def get_ancestors(self, slug: str) -> tuple[str, ...]:
+        """Get the ancestors of an area, from its parent to the root"""
+        return self.ancestors.get(slug, ())
+
+    def get_descendants(self, slug: str) -> frozenset[str]:
+        """Get the descendants of an area, at any depth"""
+        return self.descendants.get(slug, frozenset())
+
+    def get_lineage(self, slug: str) -> tuple[str, ...]:
+        """Get an area followed by its ancestors"""
+        return (slug, *self.get_ancestors(slug))
+
+    def get_name(self, slug: str, locale: str = "pt") -> str:
+        """Get the name of an area in the locale, falling back to portuguese and its slug"""
+        names = self.names.get(slug, {})
+        return names.get(locale) or names.get("pt") or slug
+
+    def prune(self, slugs: Iterable[str]) -> list[str]:
+        """Keep only the areas without ancestors among the others
+
+        World encompasses everything, so it's the only area kept when present.
+        Areas unknown to the tree have no ancestors
+        """
+        all_areas = set(slugs)
+        if "world" in all_areas:
+            return ["world"]
+        return sorted(
+            area
+            for area in all_areas
+            if not any(ancestor in all_areas for ancestor in self.get_ancestors(area))
+        )
+
+
+def get_version() -> int | None:
+    """Get the version of the area tree, if available"""
+    try:
+        return int(get_redis_client().get(VERSION_KEY) or 0)
+    except Exception as error:
+        logger.warning(error)
+        return None
+
+
+def load_area_tree() -> AreaTree:
+    """Load the area tree from the closure table"""
+    Area = apps.get_model("v1", "Area")
+    AreaClosure = apps.get_model("v1", "AreaClosure")
+    links = AreaClosure.objects.values_list("ancestor__slug", "descendant__slug", "depth")
+    names = {}
+    for record in Area.objects.values("slug", "name", *[f"name_{locale}" for locale in LOCALES]):
+        names[record["slug"]] = {
+            locale: record[f"name_{locale}"] or record["name"] for locale in LOCALES
+        }
+    return AreaTree(links, names)
+
+
+def get_area_tree() -> AreaTree:
+    """Get the area tree of the current version"""
+    version = get_version()
+    if version is None:
+        return load_area_tree()
+
+    cached = _cache.get(VERSION_KEY)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    with _lock:
+        tree = load_area_tree()
+        _cache[VERSION_KEY] = (version, tree)
+    return tree
+
+
+def invalidate_area_tree():
+    """Make all processes reload the area tree"""
+    _cache.pop(VERSION_KEY, None)
+    try:
+        get_redis_client().incr(VERSION_KEY)
+    except Exception as error:
+        logger.error(error)
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+Search load benchmark
+
+- `catalog`: seeded generator of a synthetic catalog, with the real models
+- `load`: driver that replays a mix of search requests and reports their costs
+"""
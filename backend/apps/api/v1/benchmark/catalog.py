@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic catalog for the search benchmark
+
+Every record is derived from a seeded random generator, so the same seed and scale
+always produce the same catalog. All slugs start with a prefix, which is how the
+catalog is found again to be cleared.
+"""
+
+import random
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Q
+from loguru import logger
+
+from backend.apps.api.v1.area_tree import invalidate_area_tree
+from backend.apps.api.v1.models import (
+    Area,
+    AreaClosure,
+    BigQueryType,
+    Column,
+    Coverage,
+    CoverageSummary,
+    Dataset,
+    DatasetSearchDocument,
+    DateTimeRange,
+    Entity,
+    EntityCategory,
+    ObservationLevel,
+    Organization,
+    Table,
+    Tag,
+    Theme,
+)
+
+# Words of the generated names, in portuguese, english and spanish
+WORDS = [
+    ("população", "population", "población"),
+    ("censo", "census", "censo"),
+    ("saúde", "health", "salud"),
+    ("educação", "education", "educación"),
+    ("emprego", "employment", "empleo"),
+    ("renda", "income", "ingreso"),
+    ("eleições", "elections", "elecciones"),
+    ("mortalidade", "mortality", "mortalidad"),
+    ("nascimentos", "births", "nacimientos"),
+    ("escolas", "schools", "escuelas"),
+    ("hospitais", "hospitals", "hospitales"),
+    ("despesas", "expenses", "gastos"),
+    ("receitas", "revenues", "ingresos"),
+    ("transporte", "transport", "transporte"),
+    ("clima", "climate", "clima"),
+    ("agricultura", "agriculture", "agricultura"),
+    ("indústria", "industry", "industria"),
+    ("comércio", "trade", "comercio"),
+    ("segurança", "security", "seguridad"),
+    ("habitação", "housing", "vivienda"),
+    ("energia", "energy", "energía"),
+    ("municípios", "municipalities", "municipios"),
+    ("orçamento", "budget", "presupuesto"),
+    ("desmatamento", "deforestation", "deforestación"),
+]
+
+BIGQUERY_TYPES = ["STRING", "INT64", "FLOAT64", "DATE", "BOOL"]
+
+LEVELS = ["country", "state", "municipality"]
+
+
+@dataclass
+class CatalogScale:
+    """Number of records of the catalog, per parent where it applies"""
+
+    datasets: int = 100
+    tables: int = 3
+    columns: int = 10
+    coverages: int = 2
+    datetime_ranges: int = 2
+    states: int = 27
+    municipalities: int = 20
+    organizations: int = 20
+    themes: int = 10
+    tags: int = 50
+
+
+class CatalogGenerator:
+    """Generates a synthetic catalog of datasets with the real models
+
+    Records are bulk created, so signals don't fire and the search queue is left
+    alone. The coverage summaries and search documents are refreshed at the end, ready
+    to be indexed.
+    """
+
+    def __init__(self, prefix: str = "bench", scale: CatalogScale = None, seed: int = 0):
+        self.prefix = prefix
+        self.scale = scale or CatalogScale()
+        self.rng = random.Random(seed)
+
+    def slug(self, *parts) -> str:
+        return "_".join([self.prefix, *[str(part) for part in parts]])
+
+    def name(self, n_words: int = 3) -> dict[str, str]:
+        """Get a random name, translated to every locale"""
+        words = self.rng.sample(WORDS, n_words)
+        return {
+            locale: " ".join(word[i] for word in words).capitalize()
+            for i, locale in enumerate(["pt", "en", "es"])
+        }
+
+    def translated(self, field: str, names: dict[str, str], p_translated=0.8) -> dict:
+        """Get the translation fields, leaving some of them empty as in production"""
+        values = {field: names["pt"], f"{field}_pt": names["pt"]}
+        for locale in ["en", "es"]:
+            translated = self.rng.random() < p_translated
+            values[f"{field}_{locale}"] = names[locale] if translated else None
+        return values
+
+    def clear(self) -> int:
+        """Delete the catalog of the prefix, returning the number of deleted records"""
+        pattern = f"{self.prefix}_"
+        deleted = 0
+        with transaction.atomic():
+            for model in [Dataset, Organization, Theme, Tag, Area, Entity]:
+                queryset = model.objects.filter(Q(slug=self.prefix) | Q(slug__startswith=pattern))
+                deleted += queryset.delete()[0]
+        return deleted
+
+    @transaction.atomic
+    def generate(self) -> dict[str, int]:
+        """Generate the catalog, returning the number of records by model"""
+        scale = self.scale
+
+        # Vocabularies
+        category, _ = EntityCategory.objects.get_or_create(
+            slug="spatial", defaults={"name": "Spatial"}
+        )
+        entities = Entity.objects.bulk_create(
+            [
+                Entity(
+                    slug=self.slug(level),
+                    category=category,
+                    **self.translated("name", {"pt": level, "en": level, "es": level}, 1),
+                )
+                for level in LEVELS
+            ]
+        )
+        bigquery_types = [
+            BigQueryType.objects.get_or_create(name=name)[0] for name in BIGQUERY_TYPES
+        ]
+        themes = Theme.objects.bulk_create(
+            [
+                Theme(slug=self.slug("theme", i), **self.translated("name", self.name(1)))
+                for i in range(scale.themes)
+            ]
+        )
+        tags = Tag.objects.bulk_create(
+            [
+                Tag(slug=self.slug("tag", i), **self.translated("name", self.name(2)))
+                for i in range(scale.tags)
+            ]
+        )
+
+        # Areas, as a tree of a country, its states and their municipalities
+        country = Area(
+            slug=self.prefix,
+            administrative_level=0,
+            entity=entities[0],
+            **self.translated("name", {"pt": "País", "en": "Country", "es": "País"}, 1),
+        )
+        states = [
+            Area(
+                slug=self.slug(f"s{i:02d}"),
+                administrative_level=1,
+                entity=entities[1],
+                parent=country,
+                **self.translated("name", self.name(2)),
+            )
+            for i in range(scale.states)
+        ]
+        municipalities = [
+            Area(
+                slug=f"{state.slug}_{j:04d}",
+                administrative_level=2,
+                entity=entities[2],
+                parent=state,
+                **self.translated("name", self.name(2)),
+            )
+            for state in states
+            for j in range(scale.municipalities)
+        ]
+        areas = Area.objects.bulk_create([country, *states, *municipalities])
+        AreaClosure.rebuild([area.pk for area in areas])
+        invalidate_area_tree()
+        areas_by_level = [[country], states, municipalities]
+
+        organizations = Organization.objects.bulk_create(
+            [
+                Organization(
+                    slug=self.slug("organization", i),
+                    area=self.rng.choice(areas_by_level[self.rng.randrange(2)]),
+                    **self.translated("name", self.name(2)),
+                    **self.translated("description", self.name(8), 0.5),
+                )
+                for i in range(scale.organizations)
+            ]
+        )
+
+        # Datasets and their relations
+        datasets = Dataset.objects.bulk_create(
+            [
+                Dataset(
+                    slug=self.slug("dataset", i),
+                    page_views=int(self.rng.paretovariate(1.2) * 10),
+                    **self.translated("name", self.name(3)),
+                    **self.translated("description", self.name(12), 0.5),
+                )
+                for i in range(scale.datasets)
+            ]
+        )
+        Dataset.organizations.through.objects.bulk_create(
+            [
+                Dataset.organizations.through(dataset=dataset, organization=organization)
+                for dataset in datasets
+                for organization in self.rng.sample(organizations, self.rng.randint(1, 2))
+            ]
+        )
+        Dataset.themes.through.objects.bulk_create(
+            [
+                Dataset.themes.through(dataset=dataset, theme=theme)
+                for dataset in datasets
+                for theme in self.rng.sample(themes, min(len(themes), self.rng.randint(1, 3)))
+            ]
+        )
+        Dataset.tags.through.objects.bulk_create(
+            [
+                Dataset.tags.through(dataset=dataset, tag=tag)
+                for dataset in datasets
+                for tag in self.rng.sample(tags, min(len(tags), self.rng.randint(0, 5)))
+            ]
+        )
+
+        # Tables, with a varying number per dataset, and their columns
+        tables = []
+        for dataset in datasets:
+            n_tables = self.rng.randint(0, 2 * scale.tables)
+            for order in range(n_tables):
+                tables.append(
+                    Table(
+                        dataset=dataset,
+                        slug=f"table_{order}",
+                        order=order,
+                        is_closed=self.rng.random() < 0.1,
+                        page_views=int(self.rng.paretovariate(1.2)),
+                        **self.translated("name", self.name(2)),
+                        **self.translated("description", self.name(10), 0.5),
+                    )
+                )
+        tables = Table.objects.bulk_create(tables)
+        columns = Column.objects.bulk_create(
+            [
+                Column(
+                    table=table,
+                    order=order,
+                    bigquery_type=self.rng.choice(bigquery_types),
+                    is_closed=table.is_closed,
+                    **self.translated("name", {k: f"{v}_{order}" for k, v in self.name(1).items()}),
+                    **self.translated("description", self.name(6), 0.5),
+                )
+                for table in tables
+                for order in range(scale.columns)
+            ]
+        )
+        observation_levels = ObservationLevel.objects.bulk_create(
+            [
+                ObservationLevel(table=table, entity=entity, order=order)
+                for table in tables
+                for order, entity in enumerate(self.rng.sample(entities, self.rng.randint(1, 2)))
+            ]
+        )
+
+        # Coverages, the first one open and the others closed, with datetime ranges
+        coverages = []
+        datetime_ranges = []
+        for table in tables:
+            for i in range(self.rng.randint(1, scale.coverages)):
+                level = self.rng.choices(range(3), weights=[4, 3, 3])[0]
+                coverage = Coverage(
+                    table=table,
+                    area=self.rng.choice(areas_by_level[level]),
+                    is_closed=i > 0,
+                )
+                coverages.append(coverage)
+                start_year = self.rng.randint(1990, 2020)
+                for _ in range(self.rng.randint(1, scale.datetime_ranges)):
+                    end_year = min(start_year + self.rng.randint(0, 10), 2024)
+                    datetime_ranges.append(
+                        DateTimeRange(
+                            coverage=coverage,
+                            start_year=start_year,
+                            end_year=end_year,
+                            interval=1,
+                            is_closed=coverage.is_closed,
+                        )
+                    )
+                    start_year = end_year + 1
+        coverages = Coverage.objects.bulk_create(coverages)
+        datetime_ranges = DateTimeRange.objects.bulk_create(datetime_ranges)
+
+        summarized = Table.objects.filter(pk__in=[t.pk for t in tables]).prefetch_related(
+            "coverages__area", "coverages__datetime_ranges"
+        )
+        for table in summarized:
+            CoverageSummary.refresh(table)
+
+        documented = Dataset.objects.filter(pk__in=[d.pk for d in datasets])
+        for dataset in documented.with_catalog_flags().with_coverage_summaries():
+            DatasetSearchDocument.refresh(dataset)
+
+        counts = {
+            "areas": len(areas),
+            "organizations": len(organizations),
+            "themes": len(themes),
+            "tags": len(tags),
+            "datasets": len(datasets),
+            "tables": len(tables),
+            "columns": len(columns),
+            "observation_levels": len(observation_levels),
+            "coverages": len(coverages),
+            "datetime_ranges": len(datetime_ranges),
+        }
+        logger.info(f"Generated the catalog {self.prefix}: {counts}")
+        return counts
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Load driver for the search benchmark
+
+Replays a seeded mix of `/search/` and `/facet_values/` requests through the django
+test client, in process, and measures every request: its latency, the number of SQL
+queries and the number of calls to Elasticsearch. The same seed and catalog always
+produce the same requests, so runs can be compared with each other.
+"""
+
+import random
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import wraps
+from statistics import mean, quantiles
+from time import perf_counter
+
+from django.db import connection
+from django.test import Client
+from elasticsearch import Transport
+
+from backend.apps.api.v1.models import Area, Dataset, Entity, Organization, Tag, Theme
+
+LOCALES = ["pt", "en", "es"]
+
+FACETS = {
+    "theme_slug": Theme,
+    "organization_slug": Organization,
+    "tag_slug": Tag,
+    "entity_slug": Entity,
+    "spatial_coverage": Area,
+}
+
+CONTAINS = ["open_data", "closed_data", "tables", "raw_data_sources"]
+
+
+@dataclass
+class Sample:
+    """Measurements of one request"""
+
+    endpoint: str
+    status: int
+    latency: float
+    queries: int
+    es_calls: int
+
+
+class Counter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+@contextmanager
+def count_calls(owner, name: str):
+    """Count the calls to a method of a class, while in the context"""
+    counter = Counter()
+    method = getattr(owner, name)
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        counter()
+        return method(*args, **kwargs)
+
+    setattr(owner, name, wrapper)
+    try:
+        yield counter
+    finally:
+        setattr(owner, name, method)
+
+
+class RequestMix:
+    """Seeded mix of search requests, built from the vocabularies of the catalog
+
+    The weights approximate the production traffic: most requests browse the
+    catalog or search by text, followed by filters and the facet value lists
+    """
+
+    weights = {
+        "browse": 25,
+        "text": 25,
+        "filter": 20,
+        "spatial": 10,
+        "contains": 5,
+        "facet_values": 15,
+    }
+
+    def __init__(self, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.slugs = {
+            facet: sorted(model.objects.values_list("slug", flat=True))
+            for facet, model in FACETS.items()
+        }
+        self.words = sorted(
+            {
+                word
+                for name in Dataset.objects.values_list("name", flat=True)
+                for word in (name or "").lower().split()
+                if len(word) > 3
+            }
+        )
+
+    def locale(self) -> str:
+        return self.rng.choices(LOCALES, weights=[7, 2, 1])[0]
+
+    def sample(self, facet: str, k: int = 1) -> list[str]:
+        slugs = self.slugs[facet]
+        return self.rng.sample(slugs, min(k, len(slugs)))
+
+    def browse(self) -> tuple[str, dict]:
+        return "/search/", {"page": self.rng.choices([1, 2, 3], weights=[8, 1, 1])[0]}
+
+    def text(self) -> tuple[str, dict]:
+        if not self.words:
+            return self.browse()
+        words = self.rng.sample(self.words, min(self.rng.randint(1, 2), len(self.words)))
+        # Users search as they type, so prefixes are as common as words
+        if self.rng.random() < 0.5:
+            words[-1] = words[-1][: self.rng.randint(3, len(words[-1]))]
+        return "/search/", {"q": " ".join(words)}
+
+    def filter(self) -> tuple[str, dict]:
+        params = {}
+        for param, facet in [
+            ("theme", "theme_slug"),
+            ("organization", "organization_slug"),
+            ("tag", "tag_slug"),
+        ]:
+            if self.rng.random() < 0.4:
+                params[param] = self.sample(facet, self.rng.randint(1, 2))
+        return "/search/", params or {"theme": self.sample("theme_slug")}
+
+    def spatial(self) -> tuple[str, dict]:
+        areas = self.sample("spatial_coverage", self.rng.randint(1, 3))
+        return "/search/", {"spatial_coverage": ",".join(areas)}
+
+    def contains(self) -> tuple[str, dict]:
+        return "/search/", {"contains": self.rng.sample(CONTAINS, self.rng.randint(1, 2))}
+
+    def facet_values(self) -> tuple[str, dict]:
+        facet = self.rng.choice(sorted(FACETS))
+        params = {"facet": facet}
+        if self.rng.random() < 0.5 and self.words:
+            params["prefix"] = self.rng.choice(self.words)[: self.rng.randint(1, 3)]
+        return "/facet_values/", params
+
+    def __iter__(self):
+        kinds, weights = zip(*self.weights.items())
+        while True:
+            kind = self.rng.choices(kinds, weights=weights)[0]
+            path, params = getattr(self, kind)()
+            yield path, {**params, "locale": self.locale()}
+
+
+def replay(requests: list[tuple[str, dict]], warmup: int = 0) -> list[Sample]:
+    """Replay the requests in order, measuring each one of them
+
+    The first `warmup` requests are sent but not measured
+    """
+    client = Client()
+    samples = []
+
+    def count_query(execute, sql, params, many, context):
+        queries()
+        return execute(sql, params, many, context)
+
+    for i, (path, params) in enumerate(requests):
+        queries = Counter()
+        with connection.execute_wrapper(count_query):
+            with count_calls(Transport, "perform_request") as es_calls:
+                started_at = perf_counter()
+                response = client.get(path, params)
+                latency = perf_counter() - started_at
+        if i >= warmup:
+            samples.append(
+                Sample(path, response.status_code, latency, queries.count, es_calls.count)
+            )
+
+    return samples
+
+
+def summarize(samples: list[Sample]) -> dict[str, dict]:
+    """Summarize the samples by endpoint, and for all of them
+
+    Throughput is the number of requests per second of latency, as requests are sent
+    one after the other
+    """
+    groups = defaultdict(list)
+    for sample in samples:
+        groups[sample.endpoint].append(sample)
+        groups["all"].append(sample)
+
+    summary = {}
+    for endpoint, group in groups.items():
+        latencies = [sample.latency * 1000 for sample in group]
+        percentiles = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        summary[endpoint] = {
+            "requests": len(group),
+            "errors": sum(sample.status >= 400 for sample in group),
+            "throughput": len(group) / (sum(latencies) / 1000),
+            "p50": percentiles[49],
+            "p95": percentiles[94],
+            "p99": percentiles[98],
+            "queries": mean(sample.queries for sample in group),
+            "es_calls": mean(sample.es_calls for sample in group),
+        }
+    return summary
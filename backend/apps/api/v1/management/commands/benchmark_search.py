@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+from contextlib import nullcontext
+from itertools import islice
+from json import dump
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from haystack import connections
+
+from backend.apps.api.v1.benchmark.load import RequestMix, replay, summarize
+from backend.apps.api.v1.models import Dataset
+from backend.apps.api.v1.search_memory import use_memory_backend
+
+
+class Command(BaseCommand):
+    help = "Replays a mix of search requests and reports their latency and costs by endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-n",
+            "--requests",
+            type=int,
+            default=1000,
+            help="Number of measured requests",
+        )
+        parser.add_argument(
+            "-w",
+            "--warmup",
+            type=int,
+            default=50,
+            help="Number of requests sent before measuring",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the request mix",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Keep the response cache enabled, which is disabled by default",
+        )
+        parser.add_argument(
+            "--memory",
+            action="store_true",
+            help="Search the catalog with the in process backend instead of Elasticsearch",
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            help="Path of a json file to save the summary, to compare with other runs",
+        )
+
+    def handle(self, *args, **options):
+        mix = RequestMix(options["seed"])
+        requests = list(islice(mix, options["warmup"] + options["requests"]))
+
+        cache = {} if options["cache"] else {"SEARCH_CACHE_TIMEOUT": 0}
+        backend = use_memory_backend() if options["memory"] else nullcontext()
+        with override_settings(**cache), backend as memory_backend:
+            if memory_backend:
+                index = connections["default"].get_unified_index().get_index(Dataset)
+                memory_backend.update(index, index.index_queryset())
+            samples = replay(requests, warmup=options["warmup"])
+
+        summary = summarize(samples)
+        self.stdout.write(
+            f"{'endpoint':<16}{'requests':>9}{'errors':>7}{'req/s':>8}"
+            f"{'p50':>9}{'p95':>9}{'p99':>9}{'sql':>7}{'es':>6}"
+        )
+        for endpoint, stats in summary.items():
+            self.stdout.write(
+                f"{endpoint:<16}{stats['requests']:>9}{stats['errors']:>7}"
+                f"{stats['throughput']:>8.1f}{stats['p50']:>7.1f}ms{stats['p95']:>7.1f}ms"
+                f"{stats['p99']:>7.1f}ms{stats['queries']:>7.1f}{stats['es_calls']:>6.1f}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                keys = ["requests", "warmup", "seed", "cache", "memory"]
+                dump({"options": {key: options[key] for key in keys}, "summary": summary}, file)
+
+        self.stdout.write(self.style.SUCCESS("Done"))
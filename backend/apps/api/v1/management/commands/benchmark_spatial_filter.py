@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import random
+from statistics import median
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from haystack import connections
+
+from backend.apps.api.v1.area_tree import get_area_tree
+from backend.apps.api.v1.models import Area
+
+
+def build_query_string_filter(areas: list[str]) -> dict:
+    """Spatial coverage filter as it was built before, one query string for all areas"""
+    queries = []
+    for area in areas:
+        parts = area.split("_")
+        patterns = ["_".join(parts[:i]) for i in range(1, len(parts) + 1)]
+        queries.append(
+            "(" + " OR ".join(f'spatial_coverage_exact:"{pattern}"' for pattern in patterns) + ")"
+        )
+    query = f"_exists_:spatial_coverage_exact AND {' AND '.join(queries)}"
+    return {"query": {"query_string": {"query": query}}}
+
+
+def build_lineage_filter(areas: list[str]) -> dict:
+    """Spatial coverage filter by the lineage of the areas, one clause per area in filter context"""
+    tree = get_area_tree()
+    clauses = []
+    for area in areas:
+        ancestors = [slug for slug in tree.get_ancestors(area) if slug != "world"]
+        clauses.append({"terms": {"spatial_coverage": [area, *ancestors]}})
+    return {"query": {"bool": {"filter": clauses}}}
+
+
+class Command(BaseCommand):
+    help = "Compares the spatial coverage filter by query string and by area lineage."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-n",
+            "--areas",
+            type=int,
+            nargs="+",
+            default=[1, 10, 50],
+            help="Numbers of selected areas to compare",
+        )
+        parser.add_argument(
+            "-r",
+            "--repeat",
+            type=int,
+            default=50,
+            help="Number of requests per filter and number of areas",
+        )
+        parser.add_argument(
+            "-u",
+            "--using",
+            default="default",
+            help="Search backend to query",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the random selection of areas",
+        )
+
+    def handle(self, *args, **options):
+        backend = connections[options["using"]].get_backend()
+        slugs = sorted(Area.objects.exclude(slug="world").values_list("slug", flat=True))
+        rng = random.Random(options["seed"])
+
+        for n_areas in options["areas"]:
+            areas = rng.sample(slugs, min(n_areas, len(slugs)))
+            for name, build in [
+                ("query_string", build_query_string_filter),
+                ("lineage", build_lineage_filter),
+            ]:
+                body = {**build(areas), "size": 10, "track_total_hits": True}
+                took, elapsed, hits = [], [], 0
+                for _ in range(options["repeat"]):
+                    started_at = perf_counter()
+                    response = backend.conn.search(index=backend.index_name, body=body)
+                    elapsed.append((perf_counter() - started_at) * 1000)
+                    took.append(response["took"])
+                    hits = response["hits"]["total"]["value"]
+                self.stdout.write(
+                    f"{len(areas):>3} areas, {name:<12}: {hits} hits, "
+                    f"took p50 {median(took):.1f}ms max {max(took)}ms, "
+                    f"round trip p50 {median(elapsed):.1f}ms max {max(elapsed):.1f}ms"
+                )
+
+        self.stdout.write(self.style.SUCCESS("Done"))
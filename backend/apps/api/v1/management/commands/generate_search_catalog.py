@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from dataclasses import fields
+
+from django.core.management.base import BaseCommand
+from haystack import connections
+
+from backend.apps.api.v1.benchmark.catalog import CatalogGenerator, CatalogScale
+from backend.apps.api.v1.models import Column, Dataset
+
+
+class Command(BaseCommand):
+    help = "Generates a synthetic catalog for the search benchmark."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prefix",
+            default="bench",
+            help="Prefix of the slugs of the catalog",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the random generator",
+        )
+        for field in fields(CatalogScale):
+            parser.add_argument(
+                f"--{field.name.replace('_', '-')}",
+                dest=field.name,
+                type=int,
+                default=field.default,
+                help=f"Number of {field.name.replace('_', ' ')}",
+            )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete the catalog of the prefix before generating it",
+        )
+        parser.add_argument(
+            "--index",
+            action="store_true",
+            help="Index the generated datasets and their columns in the search backend",
+        )
+        parser.add_argument(
+            "-u",
+            "--using",
+            default="default",
+            help="Search backend to index the datasets",
+        )
+
+    def handle(self, *args, **options):
+        scale = CatalogScale(**{field.name: options[field.name] for field in fields(CatalogScale)})
+        generator = CatalogGenerator(options["prefix"], scale, options["seed"])
+
+        if options["clear"]:
+            deleted = generator.clear()
+            self.stdout.write(f"Deleted {deleted} records of {options['prefix']}")
+
+        for model, count in generator.generate().items():
+            self.stdout.write(f"{model}: {count}")
+
+        if options["index"]:
+            backend = connections[options["using"]].get_backend()
+            index = connections[options["using"]].get_unified_index().get_index(Dataset)
+            queryset = index.index_queryset().filter(slug__startswith=f"{options['prefix']}_")
+            backend.update(index, queryset)
+            column_index = connections[options["using"]].get_unified_index().get_index(Column)
+            dataset_ids = list(queryset.values_list("pk", flat=True))
+            n_columns = column_index.update_datasets(backend, dataset_ids)
+            self.stdout.write(f"Indexed {len(dataset_ids)} datasets and {n_columns} columns")
+
+        self.stdout.write(self.style.SUCCESS("Done"))
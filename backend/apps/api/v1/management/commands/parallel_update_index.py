@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+from time import perf_counter
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections as db_connections
+from elasticsearch.helpers import parallel_bulk
+from haystack import connections
+from haystack.constants import ID
+from haystack.exceptions import SkipDocument
+
+from backend.apps.api.v1.models import Column, Dataset
+from backend.apps.api.v1.search_cache import bump_generation
+
+
+def init_worker():
+    """Drop the database connections inherited from the parent process"""
+    db_connections.close_all()
+
+
+def index_shard(
+    using: str, index_name: str, model_ct: str, pks: list, batchsize: int, threads: int
+) -> dict:
+    """Prepare the records of a shard, datasets or columns, and stream them to the search engine
+
+    Runs in a worker process, so it opens its own database and search engine connections
+    """
+    started_at = perf_counter()
+
+    backend = connections[using].get_backend().get_index_backend(index_name)
+    index = connections[using].get_unified_index().get_index(apps.get_model(model_ct))
+    queryset = index.index_queryset(using=using)
+
+    def get_actions():
+        for start in range(0, len(pks), batchsize):
+            for obj in queryset.filter(pk__in=pks[start : start + batchsize]):
+                try:
+                    document = {
+                        key: backend._from_python(value)
+                        for key, value in index.full_prepare(obj).items()
+                    }
+                except SkipDocument:
+                    continue
+                document["_id"] = document[ID]
+                yield document
+
+    n_documents = 0
+    errors = []
+    for ok, info in parallel_bulk(
+        backend.conn,
+        get_actions(),
+        index=index_name,
+        thread_count=threads,
+        chunk_size=batchsize,
+        raise_on_error=False,
+    ):
+        if ok:
+            n_documents += 1
+        else:
+            errors.append(info)
+
+    return {
+        "pid": multiprocessing.current_process().pid,
+        "model": model_ct,
+        "documents": n_documents,
+        "errors": errors,
+        "seconds": perf_counter() - started_at,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Updates the search index with many processes, "
+        "each one indexing a shard of datasets or columns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            default=multiprocessing.cpu_count(),
+            help="Number of worker processes, defaults to the number of cores",
+        )
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            "--batchsize",
+            dest="batchsize",
+            type=int,
+            default=100,
+            help="Number of datasets read and sent per bulk request",
+        )
+        parser.add_argument(
+            "-t",
+            "--threads",
+            type=int,
+            default=2,
+            help="Number of parallel bulk requests of each worker",
+        )
+        parser.add_argument(
+            "-u",
+            "--using",
+            default="default",
+            help="Search backend to update",
+        )
+        parser.add_argument(
+            "--versioned",
+            action="store_true",
+            help="Index into a new versioned index and swap to it when done",
+        )
+
+    def handle(self, *args, **options):
+        using = options["using"]
+        workers = max(options["workers"], 1)
+
+        backend = connections[using].get_backend()
+        unified_index = connections[using].get_unified_index()
+
+        pks = {}
+        shards = []
+        for model in [Dataset, Column]:
+            model_ct = model._meta.label_lower
+            queryset = unified_index.get_index(model).index_queryset(using=using)
+            pks[model_ct] = list(queryset.order_by("pk").values_list("pk", flat=True))
+            shards.extend((model_ct, pks[model_ct][i::workers]) for i in range(workers))
+
+        if options["versioned"]:
+            index_name = backend.create_versioned_index()
+            self.stdout.write(f"Created index {index_name}")
+        else:
+            backend.setup()
+            index_name = backend.index_name
+
+        started_at = perf_counter()
+        db_connections.close_all()
+        try:
+            with multiprocessing.get_context("fork").Pool(workers, initializer=init_worker) as pool:
+                results = pool.starmap(
+                    index_shard,
+                    [
+                        (
+                            using,
+                            index_name,
+                            model_ct,
+                            shard,
+                            options["batchsize"],
+                            options["threads"],
+                        )
+                        for model_ct, shard in shards
+                        if shard
+                    ],
+                )
+            seconds = perf_counter() - started_at
+
+            for result in results:
+                rate = result["documents"] / max(result["seconds"], 0.001)
+                self.stdout.write(
+                    f"Worker {result['pid']}: {result['documents']} {result['model']} documents in "
+                    f"{result['seconds']:.1f}s ({rate:.1f} docs/s), "
+                    f"{len(result['errors'])} errors"
+                )
+                for error in result["errors"][:10]:
+                    self.stderr.write(str(error))
+
+            n_documents = sum(result["documents"] for result in results)
+            self.stdout.write(
+                f"Total: {n_documents} documents in {seconds:.1f}s "
+                f"({n_documents / max(seconds, 0.001):.1f} docs/s) with {workers} workers"
+            )
+
+            if options["versioned"]:
+                expected_counts = {model_ct: len(shard) for model_ct, shard in pks.items()}
+                backend.promote_versioned_index(index_name, expected_counts)
+                self.stdout.write(f"Index {backend.index_name} now points to {index_name}")
+            else:
+                backend.conn.indices.refresh(index=index_name)
+                bump_generation()
+        except Exception:
+            if options["versioned"]:
+                backend.conn.indices.delete(index=index_name, ignore=404)
+            raise
+
+        n_records = sum(len(shard) for shard in pks.values())
+        self.stdout.write(self.style.SUCCESS(f"Indexed {n_documents} of {n_records} records"))
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from haystack import connections
+
+from backend.apps.api.v1.models import Column, Dataset, DatasetSearchDocument
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the search index into a new index and swaps to it without downtime."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            "--batchsize",
+            dest="batchsize",
+            type=int,
+            default=100,
+            help="Number of datasets indexed per bulk request",
+        )
+        parser.add_argument(
+            "-u",
+            "--using",
+            default="default",
+            help="Search backend to rebuild",
+        )
+        parser.add_argument(
+            "--refresh-documents",
+            action="store_true",
+            help="Recompute the search documents of the datasets before indexing them",
+        )
+
+    def handle(self, *args, **options):
+        using = options["using"]
+        batchsize = options["batchsize"]
+
+        backend = connections[using].get_backend()
+        index = connections[using].get_unified_index().get_index(Dataset)
+        column_index = connections[using].get_unified_index().get_index(Column)
+
+        started_at = timezone.now()
+        index_name = backend.create_versioned_index()
+        target = backend.get_index_backend(index_name)
+        self.stdout.write(f"Created index {index_name}")
+
+        try:
+            queryset = index.index_queryset(using=using).order_by("pk")
+            if options["refresh_documents"]:
+                queryset = queryset.with_catalog_flags().with_coverage_summaries()
+            total = queryset.count()
+            for start in range(0, total, batchsize):
+                datasets = list(queryset[start : start + batchsize])
+                if options["refresh_documents"]:
+                    for dataset in datasets:
+                        dataset.search_document = DatasetSearchDocument.refresh(dataset)
+                target.update(index, datasets, commit=False)
+                self.stdout.write(f"Indexed {min(start + batchsize, total)} of {total} datasets")
+
+            queryset = column_index.index_queryset(using=using).order_by("pk")
+            total = queryset.count()
+            for start in range(0, total, 10 * batchsize):
+                target.update(column_index, queryset[start : start + 10 * batchsize], commit=False)
+                self.stdout.write(
+                    f"Indexed {min(start + 10 * batchsize, total)} of {total} columns"
+                )
+
+            # Catch up with the datasets that changed while the index was being built
+            changed_ids = index.get_changed_dataset_ids(started_at)
+            if changed_ids:
+                datasets = list(index.index_queryset(using=using).filter(pk__in=changed_ids))
+                target.update(index, datasets, commit=False)
+                for pk in changed_ids - {dataset.pk for dataset in datasets}:
+                    target.remove(f"{Dataset._meta.label_lower}.{pk}", commit=False)
+                # Stale columns are only found once the loaded ones are searchable
+                backend.conn.indices.refresh(index=index_name)
+                column_index.update_datasets(target, changed_ids, using=using, commit=False)
+
+            backend.promote_versioned_index(
+                index_name,
+                {
+                    Dataset._meta.label_lower: index.index_queryset(using=using).count(),
+                    Column._meta.label_lower: column_index.index_queryset(using=using).count(),
+                },
+            )
+        except Exception:
+            backend.conn.indices.delete(index=index_name, ignore=404)
+            raise
+
+        message = f"Index {backend.index_name} now points to {index_name}"
+        self.stdout.write(self.style.SUCCESS(message))
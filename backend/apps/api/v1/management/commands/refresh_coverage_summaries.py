@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from backend.apps.api.v1.models import CoverageSummary
+
+
+class Command(BaseCommand):
+    help = "Refreshes the coverage summaries of the resources with coverages."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-b",
+            "--batchsize",
+            type=int,
+            default=500,
+            help="Number of resources refreshed per batch",
+        )
+
+    def handle(self, *args, **options):
+        batchsize = options["batchsize"]
+        for field in CoverageSummary.resource_fields:
+            model = CoverageSummary._meta.get_field(field).related_model
+            queryset = (
+                model.objects.filter(coverages__isnull=False)
+                .distinct()
+                .order_by("pk")
+                .prefetch_related("coverages__area", "coverages__datetime_ranges")
+            )
+            pks = list(queryset.values_list("pk", flat=True))
+            for start in range(0, len(pks), batchsize):
+                for resource in queryset.filter(pk__in=pks[start : start + batchsize]):
+                    CoverageSummary.refresh(resource)
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {len(pks)}")
+
+        self.stdout.write(self.style.SUCCESS("Done"))
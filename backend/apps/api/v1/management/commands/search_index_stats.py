@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from json import dumps
+
+from django.core.management.base import BaseCommand
+from haystack import connections
+from haystack.constants import DJANGO_CT, DJANGO_ID
+
+from backend.apps.api.v1.search_views import get_source_fields
+
+
+class Command(BaseCommand):
+    help = "Shows the size of the search index on disk and the payload of its search results."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-u",
+            "--using",
+            default="default",
+            help="Search backend to inspect",
+        )
+        parser.add_argument(
+            "-n",
+            "--size",
+            type=int,
+            default=10,
+            help="Number of hits of the sample page",
+        )
+        parser.add_argument(
+            "-l",
+            "--locale",
+            default="pt",
+            help="Locale of the source fields of the search view",
+        )
+
+    def handle(self, *args, **options):
+        backend = connections[options["using"]].get_backend()
+
+        stats = backend.conn.indices.stats(index=backend.index_name, metric="docs,store")
+        for index_name, index_stats in stats["indices"].items():
+            primaries = index_stats["primaries"]
+            n_documents = primaries["docs"]["count"]
+            size = primaries["store"]["size_in_bytes"]
+            self.stdout.write(
+                f"{index_name}: {n_documents} documents, {size / 2**20:.1f} MiB on disk, "
+                f"{size / max(n_documents, 1) / 2**10:.1f} KiB per document"
+            )
+
+        body = {"query": {"match_all": {}}, "size": options["size"]}
+        source_fields = [DJANGO_CT, DJANGO_ID, *get_source_fields(options["locale"])]
+        for name, kwargs in [
+            ("whole source", {"_source": True}),
+            ("source fields", {"_source_includes": source_fields}),
+        ]:
+            hits = backend.conn.search(index=backend.index_name, body=body, **kwargs)["hits"]
+            payload = sum(len(dumps(hit["_source"])) for hit in hits["hits"])
+            self.stdout.write(
+                f"{name}: {payload / max(len(hits['hits']), 1) / 2**10:.1f} KiB per hit"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from haystack import connections
+
+from backend.apps.api.v1.models import Column, Dataset, DatasetSearchDocument
+from backend.apps.api.v1.search_cache import bump_generation
+from backend.apps.core.models import Metadata
+
+WATERMARK_KEY = {"search_index": "watermark"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Updates the search index with the datasets that changed since the last update, "
+        "including changes of their resources, coverages, datetime ranges and organizations, "
+        "and with their columns. Search documents missing or outdated are refreshed too."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            "--batchsize",
+            dest="batchsize",
+            type=int,
+            default=100,
+            help="Number of datasets indexed per bulk request",
+        )
+        parser.add_argument(
+            "-u",
+            "--using",
+            default="default",
+            help="Search backend to update",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Ignore the watermark and update all datasets",
+        )
+
+    def handle(self, *args, **options):
+        using = options["using"]
+        batchsize = options["batchsize"]
+
+        backend = connections[using].get_backend()
+        index = connections[using].get_unified_index().get_index(Dataset)
+
+        # Changes made while the update runs are picked by the next one
+        started_at = timezone.now()
+        watermark = Metadata.objects.filter(key=WATERMARK_KEY).first()
+
+        # Datasets without an up to date search document are refreshed with the changed ones
+        stale_ids = index.get_stale_dataset_ids(using=using)
+        if stale_ids:
+            self.stdout.write(f"{len(stale_ids)} datasets lack an up to date search document")
+
+        if watermark and not options["full"]:
+            since = parse_datetime(watermark.value["updated_at"])
+            changed_ids = index.get_changed_dataset_ids(since)
+            self.stdout.write(f"{len(changed_ids)} datasets changed since {since.isoformat()}")
+            changed_ids |= stale_ids
+            refreshed_ids = changed_ids
+            queryset = index.index_queryset(using=using).filter(pk__in=changed_ids)
+            queryset = queryset.with_catalog_flags().with_coverage_summaries()
+        else:
+            changed_ids = None
+            refreshed_ids = stale_ids
+            queryset = index.index_queryset(using=using)
+            self.stdout.write("No watermark found, updating all datasets")
+
+        queryset = queryset.order_by("pk")
+        indexed_ids = set()
+        total = queryset.count()
+        for start in range(0, total, batchsize):
+            datasets = list(queryset[start : start + batchsize])
+            for dataset in datasets:
+                if dataset.pk in refreshed_ids:
+                    dataset.search_document = DatasetSearchDocument.refresh(dataset)
+                indexed_ids.add(dataset.pk)
+            backend.update(index, datasets, commit=False)
+
+        # Datasets that changed but aren't published anymore
+        removed_ids = (changed_ids or set()) - indexed_ids
+        for pk in removed_ids:
+            backend.remove(f"{Dataset._meta.label_lower}.{pk}", commit=False)
+
+        # Columns of the updated datasets, and the stale ones of the removed datasets
+        column_index = connections[using].get_unified_index().get_index(Column)
+        n_columns = column_index.update_datasets(
+            backend, indexed_ids | removed_ids, using=using, commit=False
+        )
+
+        if total or removed_ids:
+            backend.conn.indices.refresh(index=backend.index_name)
+            bump_generation()
+
+        Metadata.objects.update_or_create(
+            key=WATERMARK_KEY,
+            defaults={"value": {"updated_at": started_at.isoformat()}},
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Updated {total} and removed {len(removed_ids)} datasets, with {n_columns} columns"
+            )
+        )
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("v1", "0055_alter_type_fields_many_tables"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DatasetSearchDocument",
+            fields=[
+                (
+                    "dataset",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="v1.dataset",
+                    ),
+                ),
+                ("temporal_coverage", models.CharField(blank=True, default="", max_length=255)),
+                ("spatial_coverage", models.JSONField(blank=True, default=list)),
+                ("contains_open_data", models.BooleanField(default=False)),
+                ("contains_closed_data", models.BooleanField(default=False)),
+                ("contains_direct_download_free", models.BooleanField(default=False)),
+                ("contains_direct_download_paid", models.BooleanField(default=False)),
+                ("contains_temporalcoverage_free", models.BooleanField(default=False)),
+                ("contains_temporalcoverage_paid", models.BooleanField(default=False)),
+                ("contains_tables", models.BooleanField(default=False)),
+                ("contains_raw_data_sources", models.BooleanField(default=False)),
+                ("contains_information_requests", models.BooleanField(default=False)),
+                ("n_tables", models.IntegerField(default=0)),
+                ("n_raw_data_sources", models.IntegerField(default=0)),
+                ("n_information_requests", models.IntegerField(default=0)),
+                ("first_table_id", models.UUIDField(blank=True, null=True)),
+                ("first_open_table_id", models.UUIDField(blank=True, null=True)),
+                ("first_closed_table_id", models.UUIDField(blank=True, null=True)),
+                ("first_raw_data_source_id", models.UUIDField(blank=True, null=True)),
+                ("first_information_request_id", models.UUIDField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Dataset Search Document",
+                "verbose_name_plural": "Dataset Search Documents",
+                "db_table": "dataset_search_document",
+            },
+        ),
+    ]
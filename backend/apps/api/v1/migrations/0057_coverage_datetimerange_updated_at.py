@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("v1", "0056_dataset_search_document"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="coverage",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="datetimerange",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
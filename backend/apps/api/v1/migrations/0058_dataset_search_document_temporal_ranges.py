@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("v1", "0057_coverage_datetimerange_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datasetsearchdocument",
+            name="temporal_ranges",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:18
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("v1", "0058_dataset_search_document_temporal_ranges"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CoverageSummary",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ("since", models.DateTimeField(blank=True, null=True)),
+                ("since_str", models.CharField(blank=True, default="", max_length=10)),
+                ("until", models.DateTimeField(blank=True, null=True)),
+                ("until_str", models.CharField(blank=True, default="", max_length=10)),
+                ("open_since", models.DateTimeField(blank=True, null=True)),
+                ("open_since_str", models.CharField(blank=True, default="", max_length=10)),
+                ("open_until", models.DateTimeField(blank=True, null=True)),
+                ("open_until_str", models.CharField(blank=True, default="", max_length=10)),
+                ("closed_since", models.DateTimeField(blank=True, null=True)),
+                ("closed_since_str", models.CharField(blank=True, default="", max_length=10)),
+                ("closed_until", models.DateTimeField(blank=True, null=True)),
+                ("closed_until_str", models.CharField(blank=True, default="", max_length=10)),
+                ("temporal_ranges", models.JSONField(blank=True, default=dict)),
+                ("has_open_coverage", models.BooleanField(default=False)),
+                ("has_closed_coverage", models.BooleanField(default=False)),
+                ("spatial_coverage", models.JSONField(blank=True, default=list)),
+                ("spatial_coverage_names", models.JSONField(blank=True, default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "column",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="coverage_summary",
+                        to="v1.column",
+                    ),
+                ),
+                (
+                    "information_request",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="coverage_summary",
+                        to="v1.informationrequest",
+                    ),
+                ),
+                (
+                    "raw_data_source",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="coverage_summary",
+                        to="v1.rawdatasource",
+                    ),
+                ),
+                (
+                    "table",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="coverage_summary",
+                        to="v1.table",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Coverage Summary",
+                "verbose_name_plural": "Coverage Summaries",
+                "db_table": "coverage_summary",
+            },
+        ),
+    ]
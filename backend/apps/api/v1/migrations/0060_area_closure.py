@@ -0,0 +1,65 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:21
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_area_closure(apps, schema_editor):
+    Area = apps.get_model("v1", "Area")
+    AreaClosure = apps.get_model("v1", "AreaClosure")
+
+    parents = dict(Area.objects.values_list("pk", "parent_id"))
+    rows = []
+    for pk in parents:
+        ancestor, depth, seen = pk, 0, set()
+        while ancestor is not None and ancestor not in seen:
+            seen.add(ancestor)
+            rows.append(AreaClosure(ancestor_id=ancestor, descendant_id=pk, depth=depth))
+            ancestor, depth = parents.get(ancestor), depth + 1
+    AreaClosure.objects.bulk_create(rows, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("v1", "0059_coverage_summary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AreaClosure",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ("depth", models.PositiveSmallIntegerField()),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descendant_links",
+                        to="v1.area",
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ancestor_links",
+                        to="v1.area",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Area Closure",
+                "verbose_name_plural": "Area Closures",
+                "db_table": "area_closure",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="areaclosure",
+            constraint=models.UniqueConstraint(
+                fields=("ancestor", "descendant"), name="area_closure_unique_ancestor_descendant"
+            ),
+        ),
+        migrations.RunPython(build_area_closure, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:24
+
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+
+def get_bound(year, month, day, hour, minute, second):
+    if not year:
+        return None, ""
+    bound = datetime(
+        year, month or 1, day or 1, hour or 0, minute or 0, second or 0, tzinfo=timezone.utc
+    )
+    precision = "day" if month and day else "month" if month else "year"
+    return bound, precision
+
+
+def set_datetime_range_bounds(apps, schema_editor):
+    DateTimeRange = apps.get_model("v1", "DateTimeRange")
+
+    ranges = []
+    for dt in DateTimeRange.objects.iterator(chunk_size=2000):
+        dt.since, dt.since_precision = get_bound(
+            dt.start_year,
+            dt.start_month,
+            dt.start_day,
+            dt.start_hour,
+            dt.start_minute,
+            dt.start_second,
+        )
+        dt.until, dt.until_precision = get_bound(
+            dt.end_year,
+            dt.end_month,
+            dt.end_day,
+            dt.end_hour,
+            dt.end_minute,
+            dt.end_second,
+        )
+        ranges.append(dt)
+    DateTimeRange.objects.bulk_update(
+        ranges,
+        ["since", "since_precision", "until", "until_precision"],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("v1", "0060_area_closure"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datetimerange",
+            name="since",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="datetimerange",
+            name="since_precision",
+            field=models.CharField(
+                blank=True,
+                choices=[("year", "Year"), ("month", "Month"), ("day", "Day")],
+                default="",
+                editable=False,
+                max_length=5,
+            ),
+        ),
+        migrations.AddField(
+            model_name="datetimerange",
+            name="until",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="datetimerange",
+            name="until_precision",
+            field=models.CharField(
+                blank=True,
+                choices=[("year", "Year"), ("month", "Month"), ("day", "Day")],
+                default="",
+                editable=False,
+                max_length=5,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="datetimerange",
+            index=models.Index(fields=["since", "until"], name="datetime_range_since_until"),
+        ),
+        migrations.RunPython(set_datetime_range_bounds, migrations.RunPython.noop),
+    ]
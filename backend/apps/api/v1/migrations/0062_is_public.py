@@ -0,0 +1,78 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:26
+
+from django.db import migrations, models
+from django.db.models import Q
+
+UNPUBLISHED_STATUSES = ["under_review", "excluded"]
+
+
+def set_is_public(apps, schema_editor):
+    Dataset = apps.get_model("v1", "Dataset")
+    Table = apps.get_model("v1", "Table")
+    RawDataSource = apps.get_model("v1", "RawDataSource")
+
+    hidden = Q(status__slug__in=UNPUBLISHED_STATUSES)
+    Dataset.objects.filter(hidden).update(is_public=False)
+    for model in [Table, RawDataSource]:
+        model.objects.filter(hidden | Q(dataset__status__slug__in=UNPUBLISHED_STATUSES)).update(
+            is_public=False
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("v1", "0061_datetime_range_bounds"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dataset",
+            name="is_public",
+            field=models.BooleanField(
+                default=True,
+                editable=False,
+                help_text="Whether it's published in the catalog, kept from its status",
+            ),
+        ),
+        migrations.AddField(
+            model_name="rawdatasource",
+            name="is_public",
+            field=models.BooleanField(
+                default=True,
+                editable=False,
+                help_text="Whether it's published in the catalog, along with its dataset",
+            ),
+        ),
+        migrations.AddField(
+            model_name="table",
+            name="is_public",
+            field=models.BooleanField(
+                default=True,
+                editable=False,
+                help_text="Whether it's published in the catalog, along with its dataset",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dataset",
+            index=models.Index(
+                condition=models.Q(("is_public", True)), fields=["id"], name="dataset_public"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="rawdatasource",
+            index=models.Index(
+                condition=models.Q(("is_public", True)),
+                fields=["dataset", "order"],
+                name="raw_data_source_public",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="table",
+            index=models.Index(
+                condition=models.Q(("is_public", True)),
+                fields=["dataset", "order"],
+                name="table_public",
+            ),
+        ),
+        migrations.RunPython(set_is_public, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("v1", "0062_is_public"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="column",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# Generated manually, as Django 4.2 has no `db_default`
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Default the precisions of the bounds in the database too
+
+    Rows inserted with raw SQL, as by the `populate` command from older dumps,
+    don't set them, and `DateTimeRange.objects.refresh_bounds` fills them afterwards
+    """
+
+    dependencies = [
+        ("v1", "0063_column_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "ALTER TABLE datetime_range ALTER COLUMN since_precision SET DEFAULT '';",
+                "ALTER TABLE datetime_range ALTER COLUMN until_precision SET DEFAULT '';",
+            ],
+            reverse_sql=[
+                "ALTER TABLE datetime_range ALTER COLUMN since_precision DROP DEFAULT;",
+                "ALTER TABLE datetime_range ALTER COLUMN until_precision DROP DEFAULT;",
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated manually, as Django 4.2 has no `db_default`
+
+from django.db import migrations
+
+TABLES = ["dataset", "table", "raw_data_source"]
+
+
+class Migration(migrations.Migration):
+    """Default the `is_public` flags in the database too
+
+    Rows inserted with raw SQL, as by the `populate` command from older dumps,
+    don't set them, and `refresh_is_public` hides the unpublished ones afterwards
+    """
+
+    dependencies = [
+        ("v1", "0064_datetime_range_bound_defaults"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                f'ALTER TABLE "{table}" ALTER COLUMN is_public SET DEFAULT true;'
+                for table in TABLES
+            ],
+            reverse_sql=[
+                f'ALTER TABLE "{table}" ALTER COLUMN is_public DROP DEFAULT;' for table in TABLES
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Generated manually, as Django 4.2 has no `db_default`
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Default the `updated_at` of the columns in the database too
+
+    Rows inserted with raw SQL, as by the `populate` command from older dumps, don't set it.
+    The clock time is taken, as `auto_now` does, rather than the start of the transaction
+    """
+
+    dependencies = [
+        ("v1", "0065_is_public_defaults"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='ALTER TABLE "column" ALTER COLUMN updated_at SET DEFAULT clock_timestamp();',
+            reverse_sql='ALTER TABLE "column" ALTER COLUMN updated_at DROP DEFAULT;',
+        ),
+    ]
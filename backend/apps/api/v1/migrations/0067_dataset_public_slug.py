@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("v1", "0066_column_updated_at_default"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="dataset",
+            name="dataset_public",
+        ),
+        migrations.AddIndex(
+            model_name="dataset",
+            index=models.Index(
+                condition=models.Q(("is_public", True)), fields=["slug"], name="dataset_public"
+            ),
+        ),
+    ]
@@ -1,17 +1,22 @@
 # -*- coding: utf-8 -*-
 import logging
+from calendar import monthrange
 from collections import defaultdict
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import wraps
 from math import log10
 from uuid import uuid4
 
-from django.core.exceptions import ValidationError
-from django.db import models
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import models, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.functional import cached_property
-from ordered_model.models import OrderedModel
+from ordered_model.models import OrderedModel, OrderedModelManager, OrderedModelQuerySet
 
 from backend.apps.account.models import Account
+from backend.apps.api.v1.area_tree import get_area_tree
 from backend.custom.model import BaseModel
 from backend.custom.storage import OverwriteStorage, upload_to, validate_image
 from backend.custom.utils import check_kebab_case, check_snake_case
@@ -90,6 +95,82 @@ class Area(BaseModel):
         return super().clean()
 
 
+class AreaClosure(BaseModel):
+    """Ancestors of each area at every depth, including the area itself at depth 0
+
+    The rows of an area are rebuilt along with its descendants whenever it changes,
+    see `signals`, which replaces following `Area.parent` row by row
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid4)
+    ancestor = models.ForeignKey(
+        "Area",
+        on_delete=models.CASCADE,
+        related_name="descendant_links",
+    )
+    descendant = models.ForeignKey(
+        "Area",
+        on_delete=models.CASCADE,
+        related_name="ancestor_links",
+    )
+    depth = models.PositiveSmallIntegerField()
+
+    graphql_visible = False
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+    class Meta:
+        """Meta definition for AreaClosure."""
+
+        db_table = "area_closure"
+        verbose_name = "Area Closure"
+        verbose_name_plural = "Area Closures"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ancestor", "descendant"],
+                name="area_closure_unique_ancestor_descendant",
+            ),
+        ]
+
+    @classmethod
+    def rebuild(cls, area_ids: list = None) -> int:
+        """Rebuild the rows of the areas and their descendants, or of all areas
+
+        Returns:
+            The number of rebuilt rows
+        """
+        parents = dict(Area.objects.values_list("pk", "parent_id"))
+        children = defaultdict(list)
+        for pk, parent_id in parents.items():
+            children[parent_id].append(pk)
+
+        if area_ids is None:
+            affected = set(parents)
+        else:
+            affected = set()
+            pending = [pk for pk in area_ids if pk in parents]
+            while pending:
+                pk = pending.pop()
+                if pk not in affected:
+                    affected.add(pk)
+                    pending.extend(children[pk])
+
+        rows = []
+        for pk in affected:
+            ancestor, depth, seen = pk, 0, set()
+            # Cycles of parents are broken where they repeat
+            while ancestor is not None and ancestor not in seen:
+                seen.add(ancestor)
+                rows.append(cls(ancestor_id=ancestor, descendant_id=pk, depth=depth))
+                ancestor, depth = parents.get(ancestor), depth + 1
+
+        with transaction.atomic():
+            cls.objects.filter(descendant_id__in=affected).delete()
+            cls.objects.bulk_create(rows, batch_size=5000)
+        return len(rows)
+
+
 class Coverage(BaseModel):
     """
     Coverage model
@@ -154,6 +235,7 @@ class Coverage(BaseModel):
         related_name="coverages",
     )
     is_closed = models.BooleanField("Is Closed", default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     graphql_nested_filter_fields_whitelist = ["id"]
 
@@ -217,11 +299,16 @@ class Coverage(BaseModel):
         return 0
 
     def get_similarity_of_datetime(self, other: "Coverage"):
-        for dt_self in self.datetime_ranges.all():
-            for dt_other in other.datetime_ranges.all():
-                if dt_self.get_similarity_of_datetime(dt_other):
-                    return 1
-        return 0
+        """Whether a datetime range of the coverage is similar to one of the other,
+        see `DateTimeRange.get_similarity_of_datetime`, in a single query
+        """
+        similar_ranges = DateTimeRange.objects.filter(
+            Q(until__gte=OuterRef("since")) | Q(since__lte=OuterRef("until")),
+            coverage=other,
+            until__isnull=False,
+        )
+        ranges = self.datetime_ranges.filter(since__isnull=False)
+        return int(ranges.filter(Exists(similar_ranges)).exists())
 
     def clean(self) -> None:
         """
@@ -511,6 +598,140 @@ class Status(BaseModel):
         ordering = ["slug"]
 
 
+UNPUBLISHED_STATUSES = ["under_review", "excluded"]
+
+
+class PublicQuerySet(models.QuerySet):
+    """Queryset of the models with an `is_public` flag, kept by `signals`"""
+
+    hidden = Q(status__slug__in=UNPUBLISHED_STATUSES)
+
+    def public(self):
+        """Filter the records published in the catalog"""
+        return self.filter(is_public=True)
+
+    def refresh_is_public(self) -> int:
+        """Recompute the `is_public` flag of the records, returning the number of changes"""
+        n_hidden = self.filter(self.hidden, is_public=True).update(is_public=False)
+        n_public = self.exclude(self.hidden).filter(is_public=False).update(is_public=True)
+        return n_hidden + n_public
+
+
+class ResourceQuerySet(PublicQuerySet, OrderedModelQuerySet):
+    """Queryset of the resources of datasets, which are hidden along with their dataset"""
+
+    hidden = PublicQuerySet.hidden | Q(dataset__status__slug__in=UNPUBLISHED_STATUSES)
+
+
+def catalog_flag(method):
+    """Read the flag from the annotation of `DatasetQuerySet.with_catalog_flags`, if present"""
+    annotation = f"catalog_{method.__name__}"
+
+    @wraps(method)
+    def wrapper(self):
+        if annotation in self.__dict__:
+            return self.__dict__[annotation]
+        return method(self)
+
+    return wrapper
+
+
+class DatasetQuerySet(PublicQuerySet):
+    def with_coverage_summaries(self):
+        """Prefetch the coverage summaries of the resources of the datasets
+
+        Resources without coverages have no summary, so their coverages are prefetched
+        too, to summarize them without querying, see `get_coverage_summary`
+        """
+        return self.prefetch_related(
+            "tables__coverage_summary",
+            "tables__coverages",
+            "raw_data_sources__coverage_summary",
+            "raw_data_sources__coverages",
+            "information_requests__coverage_summary",
+            "information_requests__coverages",
+        )
+
+    def with_catalog_flags(self):
+        """Annotate the `contains_*`, `n_*` and `first_*_id` flags of the datasets
+
+        The flags are computed by subqueries of the same statement, whatever the number
+        of datasets, and the properties of the same name read them instead of querying
+        the resources of each table
+        """
+        tables = (
+            Table.objects.public()
+            .filter(dataset=OuterRef("pk"))
+            .exclude(slug__in=["dicionario", "dictionary"])
+        )
+        raw_data_sources = RawDataSource.objects.public().filter(dataset=OuterRef("pk"))
+        information_requests = InformationRequest.objects.filter(dataset=OuterRef("pk")).exclude(
+            status__slug__in=UNPUBLISHED_STATUSES
+        )
+
+        def coverages(is_closed: bool, lookup: str = "table") -> Exists:
+            return Exists(Coverage.objects.filter(is_closed=is_closed, **{lookup: OuterRef("pk")}))
+
+        def datetime_ranges(is_closed: bool, **kwargs) -> Exists:
+            return Exists(
+                DateTimeRange.objects.filter(
+                    coverage__table=OuterRef("pk"), coverage__is_closed=is_closed, **kwargs
+                )
+            )
+
+        # Same as `Table.contains_open_data` and `Table.contains_closed_data`
+        open_table = coverages(False) | coverages(False, "column__table")
+        closed_table = (
+            coverages(True)
+            | coverages(True, "column__table")
+            | Q(
+                uncompressed_file_size__gt=100 * 1024 * 1024,
+                uncompressed_file_size__lte=1000 * 1024 * 1024,
+            )
+        )
+
+        # Same as `Table.contains_temporalcoverage_paid`, after the cases of
+        # `get_full_temporal_coverage`, whose negation is the free one
+        paid_temporal_coverage = datetime_ranges(True, end_year__isnull=False) & (
+            datetime_ranges(True, start_year__isnull=False)
+            | (
+                datetime_ranges(False, start_year__isnull=False)
+                & datetime_ranges(False, end_year__isnull=False)
+            )
+        )
+
+        def count(queryset) -> Coalesce:
+            queryset = queryset.order_by().values("dataset").annotate(n=Count("pk"))
+            return Coalesce(Subquery(queryset.values("n")), 0)
+
+        def first(queryset) -> Subquery:
+            return Subquery(queryset.order_by("order").values("pk")[:1])
+
+        return self.annotate(
+            catalog_contains_open_data=Exists(tables.filter(coverages(False))),
+            catalog_contains_closed_data=Exists(tables.filter(closed_table)),
+            catalog_contains_direct_download_free=count(
+                tables.filter(uncompressed_file_size__lt=100 * 1024 * 1024)
+            ),
+            catalog_contains_direct_download_paid=count(
+                tables.filter(uncompressed_file_size__gt=100 * 1024 * 1024)
+            ),
+            catalog_contains_temporalcoverage_free=count(tables.exclude(paid_temporal_coverage)),
+            catalog_contains_temporalcoverage_paid=count(tables.filter(paid_temporal_coverage)),
+            catalog_contains_tables=Exists(tables),
+            catalog_contains_raw_data_sources=Exists(raw_data_sources),
+            catalog_contains_information_requests=Exists(information_requests),
+            catalog_n_tables=count(tables),
+            catalog_n_raw_data_sources=count(raw_data_sources),
+            catalog_n_information_requests=count(information_requests),
+            catalog_first_table_id=first(tables),
+            catalog_first_open_table_id=first(tables.filter(open_table)),
+            catalog_first_closed_table_id=first(tables.filter(closed_table)),
+            catalog_first_raw_data_source_id=first(raw_data_sources),
+            catalog_first_information_request_id=first(information_requests),
+        )
+
+
 class Dataset(BaseModel):
     """Dataset model"""
 
@@ -554,8 +775,17 @@ class Dataset(BaseModel):
     usage_guide = models.TextField(
         blank=True, null=True, default="", max_length=255, verbose_name="Guia de Uso"
     )
+    is_public = models.BooleanField(
+        default=True,
+        editable=False,
+        help_text="Whether it's published in the catalog, kept from its status",
+    )
 
+    objects = DatasetQuerySet.as_manager()
+
+    graphql_fields_blacklist = BaseModel.graphql_fields_blacklist + ["is_public"]
     graphql_nested_filter_fields_whitelist = ["id", "slug"]
+    graphql_filter_fields_blacklist = ["search_document"]
 
     def __str__(self):
         return str(self.slug)
@@ -567,6 +797,9 @@ class Dataset(BaseModel):
         verbose_name = "Dataset"
         verbose_name_plural = "Datasets"
         ordering = ["slug"]
+        indexes = [
+            models.Index(fields=["slug"], condition=Q(is_public=True), name="dataset_public"),
+        ]
 
     @cached_property
     def get_tables(self):
@@ -613,6 +846,16 @@ class Dataset(BaseModel):
             return f"{temporal_coverage['end']}"
         return ""
 
+    @property
+    def temporal_ranges(self) -> dict[str, list[dict]]:
+        """Date ranges covered by all related resources, in open and closed coverages"""
+        resources = self.generate_resources
+        return {
+            "all": get_temporal_ranges(resources),
+            "open": get_temporal_ranges(resources, is_closed=False),
+            "closed": get_temporal_ranges(resources, is_closed=True),
+        }
+
     @property
     def spatial_coverage(self) -> list[str]:
         """Union spatial coverage of all related resources"""
@@ -648,6 +891,7 @@ class Dataset(BaseModel):
         return entities
 
     @property
+    @catalog_flag
     def contains_open_data(self):
         """Returns true if there are tables or columns with open coverages"""
 
@@ -655,11 +899,7 @@ class Dataset(BaseModel):
 
         open_data = False
 
-        tables = (
-            cached_tables.exclude(status__slug__in=["under_review", "excluded"])
-            .exclude(slug__in=["dicionario", "dictionary"])
-            .all()
-        )
+        tables = cached_tables.public().exclude(slug__in=["dicionario", "dictionary"]).all()
         for table in tables:
             table_coverages = table.coverages.filter(is_closed=False)
             if table_coverages:
@@ -668,29 +908,27 @@ class Dataset(BaseModel):
         return open_data
 
     @property
+    @catalog_flag
     def contains_closed_data(self):
         """Returns true if there are tables or columns with closed coverages,
         or if the uncompressed file size is above 1 GB"""
 
         cached_tables = self.get_tables
 
-        for table in (
-            cached_tables.exclude(status__slug__in=["under_review", "excluded"])
-            .exclude(slug__in=["dicionario", "dictionary"])
-            .all()
-        ):
+        for table in cached_tables.public().exclude(slug__in=["dicionario", "dictionary"]).all():
             if table.contains_closed_data:
                 return True
         return False
 
     @property
+    @catalog_flag
     def contains_direct_download_free(self):
         cached_tables = self.get_tables
 
         return len(
             [
                 table
-                for table in cached_tables.exclude(status__slug__in=["under_review", "excluded"])
+                for table in cached_tables.public()
                 .exclude(slug__in=["dicionario", "dictionary"])
                 .all()
                 if table.contains_direct_download_free
@@ -698,13 +936,14 @@ class Dataset(BaseModel):
         )
 
     @property
+    @catalog_flag
     def contains_direct_download_paid(self):
         cached_tables = self.get_tables
 
         return len(
             [
                 table
-                for table in cached_tables.exclude(status__slug__in=["under_review", "excluded"])
+                for table in cached_tables.public()
                 .exclude(slug__in=["dicionario", "dictionary"])
                 .all()
                 if table.contains_direct_download_paid
@@ -712,13 +951,14 @@ class Dataset(BaseModel):
         )
 
     @property
+    @catalog_flag
     def contains_temporalcoverage_free(self):
         cached_tables = self.get_tables
 
         return len(
             [
                 table
-                for table in cached_tables.exclude(status__slug__in=["under_review", "excluded"])
+                for table in cached_tables.public()
                 .exclude(slug__in=["dicionario", "dictionary"])
                 .all()
                 if table.contains_temporalcoverage_free
@@ -726,13 +966,14 @@ class Dataset(BaseModel):
         )
 
     @property
+    @catalog_flag
     def contains_temporalcoverage_paid(self):
         cached_tables = self.get_tables
 
         return len(
             [
                 table
-                for table in cached_tables.exclude(status__slug__in=["under_review", "excluded"])
+                for table in cached_tables.public()
                 .exclude(slug__in=["dicionario", "dictionary"])
                 .all()
                 if table.contains_temporalcoverage_paid
@@ -740,77 +981,57 @@ class Dataset(BaseModel):
         )
 
     @property
+    @catalog_flag
     def contains_tables(self):
         """Returns true if there are tables in the dataset"""
 
         cached_tables = self.get_tables
 
-        return (
-            len(
-                cached_tables.exclude(status__slug__in=["under_review", "excluded"])
-                .exclude(slug__in=["dicionario", "dictionary"])
-                .all()
-            )
-            > 0
-        )
+        return len(cached_tables.public().exclude(slug__in=["dicionario", "dictionary"]).all()) > 0
 
     @property
+    @catalog_flag
     def contains_raw_data_sources(self):
         """Returns true if there are raw data sources in the dataset"""
 
         cached_get_raw_data_sources = self.get_raw_data_sources
 
-        return (
-            len(
-                cached_get_raw_data_sources.exclude(
-                    status__slug__in=["under_review", "excluded"]
-                ).all()
-            )
-            > 0
-        )
+        return len(cached_get_raw_data_sources.public().all()) > 0
 
     @property
+    @catalog_flag
     def contains_information_requests(self):
         """Returns true if there are information requests in the dataset"""
         return (
-            len(
-                self.information_requests.exclude(
-                    status__slug__in=["under_review", "excluded"]
-                ).all()
-            )
-            > 0
+            len(self.information_requests.exclude(status__slug__in=UNPUBLISHED_STATUSES).all()) > 0
         )
 
     @property
+    @catalog_flag
     def n_tables(self):
         cached_tables = self.get_tables
 
-        return len(
-            cached_tables.exclude(status__slug__in=["under_review", "excluded"])
-            .exclude(slug__in=["dicionario", "dictionary"])
-            .all()
-        )
+        return len(cached_tables.public().exclude(slug__in=["dicionario", "dictionary"]).all())
 
     @property
+    @catalog_flag
     def n_raw_data_sources(self):
         cached_get_raw_data_sources = self.get_raw_data_sources
 
-        return len(
-            cached_get_raw_data_sources.exclude(status__slug__in=["under_review", "excluded"]).all()
-        )
+        return len(cached_get_raw_data_sources.public().all())
 
     @property
+    @catalog_flag
     def n_information_requests(self):
-        return len(
-            self.information_requests.exclude(status__slug__in=["under_review", "excluded"]).all()
-        )
+        return len(self.information_requests.exclude(status__slug__in=UNPUBLISHED_STATUSES).all())
 
     @property
+    @catalog_flag
     def first_table_id(self):
         cached_tables = self.get_tables
 
         if (
-            resource := cached_tables.exclude(status__slug__in=["under_review", "excluded"])
+            resource := cached_tables.public()
             .exclude(slug__in=["dicionario", "dictionary"])
             .order_by("order")
             .first()
@@ -818,11 +1039,12 @@ class Dataset(BaseModel):
             return resource.pk
 
     @property
+    @catalog_flag
     def first_open_table_id(self):
         cached_tables = self.get_tables
 
         for resource in (
-            cached_tables.exclude(status__slug__in=["under_review", "excluded"])
+            cached_tables.public()
             .exclude(slug__in=["dicionario", "dictionary"])
             .order_by("order")
             .all()
@@ -831,11 +1053,12 @@ class Dataset(BaseModel):
                 return resource.pk
 
     @property
+    @catalog_flag
     def first_closed_table_id(self):
         cached_tables = self.get_tables
 
         for resource in (
-            cached_tables.exclude(status__slug__in=["under_review", "excluded"])
+            cached_tables.public()
             .exclude(slug__in=["dicionario", "dictionary"])
             .order_by("order")
             .all()
@@ -844,22 +1067,24 @@ class Dataset(BaseModel):
                 return resource.pk
 
     @property
+    @catalog_flag
     def first_raw_data_source_id(self):
         cached_get_raw_data_sources = self.get_raw_data_sources
 
         resource = (
             cached_get_raw_data_sources
-            .exclude(status__slug__in=["under_review", "excluded"])
+            .public()
             .order_by("order")
             .first()
         )  # fmt: skip
         return resource.pk if resource else None
 
     @property
+    @catalog_flag
     def first_information_request_id(self):
         resource = (
             self.information_requests
-            .exclude(status__slug__in=["under_review", "excluded"])
+            .exclude(status__slug__in=UNPUBLISHED_STATUSES)
             .order_by("order")
             .first()
         )  # fmt: skip
@@ -871,9 +1096,8 @@ class Dataset(BaseModel):
 
         updates = [
             u.last_updated_at
-            for u in cached_tables.exclude(
-                status__slug__in=["under_review", "excluded"]).exclude(
-                    slug__in=["dicionario", "dictionary"]).all()
+            for u in cached_tables.public().exclude(
+                slug__in=["dicionario", "dictionary"]).all()
             if u.last_updated_at
         ]  # fmt: skip
         return max(updates) if updates else None
@@ -884,8 +1108,7 @@ class Dataset(BaseModel):
 
         polls = [
             u.get("last_polled_at")
-            for u in cached_get_raw_data_sources.exclude(
-                status__slug__in=["under_review", "excluded"]).all().values("last_polled_at")
+            for u in cached_get_raw_data_sources.public().values("last_polled_at")
             if u.get("last_polled_at")
         ]  # fmt: skip
         return max(polls) if polls else None
@@ -896,13 +1119,94 @@ class Dataset(BaseModel):
 
         updates = [
             u.last_updated_at
-            for u in cached_get_raw_data_sources.exclude(
-                status__slug__in=["under_review", "excluded"]).all()
+            for u in cached_get_raw_data_sources.public()
             if u.last_updated_at
         ]  # fmt: skip
         return max(updates) if updates else None
 
 
+class DatasetSearchDocument(BaseModel):
+    """Precomputed dataset values read by the search index
+
+    Computing these values walks every table, coverage and datetime range of the
+    dataset, so they are materialized here and refreshed only when one of them changes
+    """
+
+    dataset = models.OneToOneField(
+        "Dataset",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    temporal_coverage = models.CharField(max_length=255, blank=True, default="")
+    temporal_ranges = models.JSONField(default=dict, blank=True)
+    spatial_coverage = models.JSONField(default=list, blank=True)
+    contains_open_data = models.BooleanField(default=False)
+    contains_closed_data = models.BooleanField(default=False)
+    contains_direct_download_free = models.BooleanField(default=False)
+    contains_direct_download_paid = models.BooleanField(default=False)
+    contains_temporalcoverage_free = models.BooleanField(default=False)
+    contains_temporalcoverage_paid = models.BooleanField(default=False)
+    contains_tables = models.BooleanField(default=False)
+    contains_raw_data_sources = models.BooleanField(default=False)
+    contains_information_requests = models.BooleanField(default=False)
+    n_tables = models.IntegerField(default=0)
+    n_raw_data_sources = models.IntegerField(default=0)
+    n_information_requests = models.IntegerField(default=0)
+    first_table_id = models.UUIDField(null=True, blank=True)
+    first_open_table_id = models.UUIDField(null=True, blank=True)
+    first_closed_table_id = models.UUIDField(null=True, blank=True)
+    first_raw_data_source_id = models.UUIDField(null=True, blank=True)
+    first_information_request_id = models.UUIDField(null=True, blank=True)
+
+    graphql_visible = False
+
+    def __str__(self):
+        return str(self.dataset)
+
+    class Meta:
+        """Meta class"""
+
+        db_table = "dataset_search_document"
+        verbose_name = "Dataset Search Document"
+        verbose_name_plural = "Dataset Search Documents"
+
+    @classmethod
+    def get_values(cls, dataset: Dataset) -> dict:
+        """Compute the document values from the dataset properties"""
+        return {
+            "temporal_coverage": dataset.temporal_coverage,
+            "temporal_ranges": dataset.temporal_ranges,
+            "spatial_coverage": dataset.spatial_coverage,
+            "contains_open_data": bool(dataset.contains_open_data),
+            "contains_closed_data": bool(dataset.contains_closed_data),
+            "contains_direct_download_free": bool(dataset.contains_direct_download_free),
+            "contains_direct_download_paid": bool(dataset.contains_direct_download_paid),
+            "contains_temporalcoverage_free": bool(dataset.contains_temporalcoverage_free),
+            "contains_temporalcoverage_paid": bool(dataset.contains_temporalcoverage_paid),
+            "contains_tables": dataset.contains_tables,
+            "contains_raw_data_sources": dataset.contains_raw_data_sources,
+            "contains_information_requests": dataset.contains_information_requests,
+            "n_tables": dataset.n_tables,
+            "n_raw_data_sources": dataset.n_raw_data_sources,
+            "n_information_requests": dataset.n_information_requests,
+            "first_table_id": dataset.first_table_id,
+            "first_open_table_id": dataset.first_open_table_id,
+            "first_closed_table_id": dataset.first_closed_table_id,
+            "first_raw_data_source_id": dataset.first_raw_data_source_id,
+            "first_information_request_id": dataset.first_information_request_id,
+        }
+
+    @classmethod
+    def refresh(cls, dataset: Dataset) -> "DatasetSearchDocument":
+        """Recompute the search document of a dataset"""
+        document, _ = cls.objects.update_or_create(
+            dataset=dataset,
+            defaults=cls.get_values(dataset),
+        )
+        return document
+
+
 class Update(BaseModel):
     id = models.UUIDField(primary_key=True, default=uuid4)
     entity = models.ForeignKey(
@@ -1114,8 +1418,16 @@ class Table(BaseModel, OrderedModel):
         default=0,
         help_text="Number of page views by Google Analytics",
     )
+    is_public = models.BooleanField(
+        default=True,
+        editable=False,
+        help_text="Whether it's published in the catalog, along with its dataset",
+    )
+
+    objects = OrderedModelManager.from_queryset(ResourceQuerySet)()
 
     order_with_respect_to = ("dataset",)
+    graphql_fields_blacklist = BaseModel.graphql_fields_blacklist + ["is_public"]
     graphql_nested_filter_fields_whitelist = ["id", "dataset"]
 
     def __str__(self):
@@ -1133,6 +1445,11 @@ class Table(BaseModel, OrderedModel):
                 fields=["dataset", "slug"], name="constraint_dataset_table_slug"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["dataset", "order"], condition=Q(is_public=True), name="table_public"
+            ),
+        ]
 
     @property
     def full_slug(self):
@@ -1365,7 +1682,7 @@ class Table(BaseModel, OrderedModel):
             Table.objects
             .exclude(id=self.id)
             .exclude(is_directory=True)
-            .exclude(status__slug__in=["under_review", "excluded"])
+            .public()
             .filter(columns__directory_primary_key__isnull=False)
             .distinct()
             .all()
@@ -1397,36 +1714,26 @@ class Table(BaseModel, OrderedModel):
         """
         errors = {}
         try:
-            temporal_coverages_by_area = defaultdict(lambda: [])
-            for coverage in self.coverages.all():
-                if area := coverage.area:
-                    try:
-                        temporal_coverages_by_area[str(area.slug)].append(
-                            *list(coverage.datetime_ranges.all())
-                        )
-                    except TypeError:
-                        continue
-            for area, temporal_coverages in temporal_coverages_by_area.items():
-                datetime_ranges = []
-                for temporal_coverage in temporal_coverages:
-                    datetime_ranges.append(
-                        (
-                            datetime(
-                                temporal_coverage.start_year,
-                                temporal_coverage.start_month or 1,
-                                temporal_coverage.start_day or 1,
-                            ),
-                            datetime(
-                                temporal_coverage.end_year or datetime.now().year,
-                                temporal_coverage.end_month or 1,
-                                temporal_coverage.end_day or 1,
-                            ),
-                        )
-                    )
-                datetime_ranges.sort(key=lambda x: x[0])
-                for i in range(1, len(datetime_ranges)):
-                    if datetime_ranges[i - 1][1] > datetime_ranges[i][0]:
-                        errors["coverages_areas"] = f"Temporal coverages in area {area} overlap"
+            # Ranges of other coverages of the same area starting before and ending after
+            # the start of a range, where ranges without end are still ongoing
+            ranges = DateTimeRange.objects.filter(
+                coverage__table_id=self.pk,
+                coverage__area__isnull=False,
+                since__isnull=False,
+            )
+            overlapping_ranges = ranges.filter(
+                Q(until__gt=OuterRef("since")) | Q(until__isnull=True),
+                coverage__area=OuterRef("coverage__area"),
+                since__lte=OuterRef("since"),
+            ).exclude(coverage=OuterRef("coverage"))
+            areas = (
+                ranges.filter(Exists(overlapping_ranges))
+                .order_by("coverage__area__slug")
+                .values_list("coverage__area__slug", flat=True)
+                .distinct()
+            )
+            for area in areas:
+                errors["coverages_areas"] = f"Temporal coverages in area {area} overlap"
         except ValueError:
             pass
 
@@ -1599,6 +1906,7 @@ class Column(BaseModel, OrderedModel):
     is_closed = models.BooleanField(
         default=False, help_text="Column is for BD Pro subscribers only"
     )
+    updated_at = models.DateTimeField(auto_now=True)
     order_with_respect_to = ("table",)
 
     graphql_nested_filter_fields_whitelist = ["id", "name"]
@@ -1868,8 +2176,17 @@ class RawDataSource(BaseModel, OrderedModel):
         null=True,
         blank=True,
     )
+    is_public = models.BooleanField(
+        default=True,
+        editable=False,
+        help_text="Whether it's published in the catalog, along with its dataset",
+    )
+
+    objects = OrderedModelManager.from_queryset(ResourceQuerySet)()
+
     order_with_respect_to = ("dataset",)
 
+    graphql_fields_blacklist = BaseModel.graphql_fields_blacklist + ["is_public"]
     graphql_nested_filter_fields_whitelist = ["id"]
 
     class Meta:
@@ -1879,6 +2196,13 @@ class RawDataSource(BaseModel, OrderedModel):
         verbose_name = "Raw Data Source"
         verbose_name_plural = "Raw Data Sources"
         ordering = ["url"]
+        indexes = [
+            models.Index(
+                fields=["dataset", "order"],
+                condition=Q(is_public=True),
+                name="raw_data_source_public",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.dataset.name})"
@@ -2063,8 +2387,38 @@ class ObservationLevel(BaseModel, OrderedModel):
         return qs
 
 
+class DateTimeRangeQuerySet(models.QuerySet):
+    """Queryset of the datetime ranges, which stores their bounds in bulk writes too"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.set_bounds()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.set_bounds()
+        return super().bulk_update(objs, {*fields, *self.model.bound_fields}, *args, **kwargs)
+
+    def refresh_bounds(self, batch_size: int = 2000) -> int:
+        """Recompute the stored bounds of the ranges written without the orm, as by raw sql"""
+        ranges = list(self.iterator(chunk_size=batch_size))
+        return self.bulk_update(ranges, [], batch_size=batch_size)
+
+
 class DateTimeRange(BaseModel):
-    """Model definition for DateTimeRange."""
+    """Model definition for DateTimeRange.
+
+    The bounds of the range are stored along with their parts, to be filtered,
+    sorted and aggregated in SQL
+    """
+
+    PRECISIONS = [("year", "Year"), ("month", "Month"), ("day", "Day")]
+    PRECISION_FORMATS = {"year": "%Y", "month": "%Y-%m", "day": "%Y-%m-%d"}
+
+    bound_fields = ["since", "since_precision", "until", "until_precision"]
 
     id = models.UUIDField(primary_key=True, default=uuid4)
     coverage = models.ForeignKey(
@@ -2093,8 +2447,19 @@ class DateTimeRange(BaseModel):
         blank=True,
     )
     is_closed = models.BooleanField("Is Closed", default=False)
+    since = models.DateTimeField(blank=True, null=True, editable=False)
+    since_precision = models.CharField(
+        max_length=5, blank=True, default="", editable=False, choices=PRECISIONS
+    )
+    until = models.DateTimeField(blank=True, null=True, editable=False)
+    until_precision = models.CharField(
+        max_length=5, blank=True, default="", editable=False, choices=PRECISIONS
+    )
+    updated_at = models.DateTimeField(auto_now=True)
 
-    graphql_fields_blacklist = BaseModel.graphql_fields_blacklist + ["since", "until"]
+    objects = DateTimeRangeQuerySet.as_manager()
+
+    graphql_fields_blacklist = BaseModel.graphql_fields_blacklist + bound_fields
     graphql_nested_filter_fields_whitelist = ["id"]
 
     def __str__(self):
@@ -2107,49 +2472,70 @@ class DateTimeRange(BaseModel):
         verbose_name = "DateTime Range"
         verbose_name_plural = "DateTime Ranges"
         ordering = ["id"]
+        indexes = [
+            models.Index(fields=["since", "until"], name="datetime_range_since_until"),
+        ]
+
+    @staticmethod
+    def get_bound(year, month, day, hour, minute, second) -> tuple[datetime | None, str]:
+        """Get a bound of the range and its precision from its parts
+
+        Dates are stored in utc, as the time zone of the datetime ranges is unknown
+        """
+        if not year:
+            return None, ""
+        bound = datetime(
+            year, month or 1, day or 1, hour or 0, minute or 0, second or 0, tzinfo=timezone.utc
+        )
+        precision = "day" if month and day else "month" if month else "year"
+        return bound, precision
+
+    def set_bounds(self):
+        """Sync the stored bounds with their parts, which `save` and the bulk writes do"""
+        self.since, self.since_precision = self.get_bound(
+            self.start_year,
+            self.start_month,
+            self.start_day,
+            self.start_hour,
+            self.start_minute,
+            self.start_second,
+        )
+        self.until, self.until_precision = self.get_bound(
+            self.end_year,
+            self.end_month,
+            self.end_day,
+            self.end_hour,
+            self.end_minute,
+            self.end_second,
+        )
+
+    def save(self, *args, **kwargs):
+        self.set_bounds()
+        if update_fields := kwargs.get("update_fields"):
+            kwargs["update_fields"] = {*update_fields, *self.bound_fields}
+        return super().save(*args, **kwargs)
 
     @property
-    def since(self):
-        if self.start_year:
-            return datetime(
-                self.start_year,
-                self.start_month or 1,
-                self.start_day or 1,
-                self.start_hour or 0,
-                self.start_minute or 0,
-                self.start_second or 0,
-            )
+    def until_end(self) -> datetime | None:
+        """Last day of the period of `until`, which is stored as its first day"""
+        if not self.until:
+            return None
+        if self.until_precision == "year":
+            return self.until.replace(month=12, day=31)
+        if self.until_precision == "month":
+            return self.until.replace(day=monthrange(self.until.year, self.until.month)[1])
+        return self.until
 
     @property
     def since_str(self):
-        if self.start_year and self.start_month and self.start_day:
-            return self.since.strftime("%Y-%m-%d")
-        if self.start_year and self.start_month:
-            return self.since.strftime("%Y-%m")
-        if self.start_year:
-            return self.since.strftime("%Y")
+        if self.since:
+            return self.since.strftime(self.PRECISION_FORMATS[self.since_precision])
         return ""
 
-    @property
-    def until(self):
-        if self.end_year:
-            return datetime(
-                self.end_year,
-                self.end_month or 1,
-                self.end_day or 1,
-                self.end_hour or 0,
-                self.end_minute or 0,
-                self.end_second or 0,
-            )
-
     @property
     def until_str(self):
-        if self.end_year and self.end_month and self.end_day:
-            return self.until.strftime("%Y-%m-%d")
-        if self.end_year and self.end_month:
-            return self.until.strftime("%Y-%m")
-        if self.end_year:
-            return self.until.strftime("%Y")
+        if self.until:
+            return self.until.strftime(self.PRECISION_FORMATS[self.until_precision])
         return ""
 
     @property
@@ -2172,6 +2558,7 @@ class DateTimeRange(BaseModel):
     def clean(self):
         errors = {}
         try:
+            self.set_bounds()
             if self.since and self.until and self.since > self.until:
                 errors["date_range"] = "Start date must be less than or equal to end date"
             if self.since and self.until and not self.interval:
@@ -2189,6 +2576,168 @@ class DateTimeRange(BaseModel):
         return super().clean()
 
 
+class CoverageSummary(BaseModel):
+    """Temporal and spatial coverage of a resource, summarized from its coverages
+
+    Walking the coverages, datetime ranges and areas of a resource costs a few queries,
+    so the coverage helpers read this summary instead. It's refreshed whenever one of its
+    coverages, datetime ranges or areas changes, see `signals`
+    """
+
+    resource_fields = ["table", "column", "raw_data_source", "information_request"]
+
+    id = models.UUIDField(primary_key=True, default=uuid4)
+    table = models.OneToOneField(
+        "Table",
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name="coverage_summary",
+    )
+    column = models.OneToOneField(
+        "Column",
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name="coverage_summary",
+    )
+    raw_data_source = models.OneToOneField(
+        "RawDataSource",
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name="coverage_summary",
+    )
+    information_request = models.OneToOneField(
+        "InformationRequest",
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name="coverage_summary",
+    )
+    since = models.DateTimeField(null=True, blank=True)
+    since_str = models.CharField(max_length=10, blank=True, default="")
+    until = models.DateTimeField(null=True, blank=True)
+    until_str = models.CharField(max_length=10, blank=True, default="")
+    open_since = models.DateTimeField(null=True, blank=True)
+    open_since_str = models.CharField(max_length=10, blank=True, default="")
+    open_until = models.DateTimeField(null=True, blank=True)
+    open_until_str = models.CharField(max_length=10, blank=True, default="")
+    closed_since = models.DateTimeField(null=True, blank=True)
+    closed_since_str = models.CharField(max_length=10, blank=True, default="")
+    closed_until = models.DateTimeField(null=True, blank=True)
+    closed_until_str = models.CharField(max_length=10, blank=True, default="")
+    temporal_ranges = models.JSONField(default=dict, blank=True)
+    has_open_coverage = models.BooleanField(default=False)
+    has_closed_coverage = models.BooleanField(default=False)
+    spatial_coverage = models.JSONField(default=list, blank=True)
+    spatial_coverage_names = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    graphql_visible = False
+
+    def __str__(self):
+        return str(self.resource)
+
+    class Meta:
+        """Meta definition for CoverageSummary."""
+
+        db_table = "coverage_summary"
+        verbose_name = "Coverage Summary"
+        verbose_name_plural = "Coverage Summaries"
+
+    @property
+    def resource(self):
+        for field in self.resource_fields:
+            if resource := getattr(self, field):
+                return resource
+
+    @classmethod
+    def get_resource_field(cls, resource) -> str:
+        """Get the field of the summary that points to the resource"""
+        for field in cls.resource_fields:
+            if isinstance(resource, cls._meta.get_field(field).related_model):
+                return field
+        raise ValueError(f"Coverages of {resource._meta.label} aren't summarized")
+
+    @classmethod
+    def get_values(cls, resource) -> dict:
+        """Summarize the coverages of a resource, from the stored bounds of their ranges"""
+        bounds = {}
+        ranges = {"all": [], "open": [], "closed": []}
+        areas = {}
+        has_coverage = {"open": False, "closed": False}
+
+        def update_bound(name: str, value: datetime, value_str: str, is_lower: bool):
+            current = bounds.get(name)
+            if current is None or (value < current[0] if is_lower else value > current[0]):
+                bounds[name] = (value, value_str)
+
+        for coverage in resource.coverages.all():
+            scope = "closed" if coverage.is_closed else "open"
+            has_coverage[scope] = True
+            if coverage.area:
+                areas[coverage.area.slug] = {
+                    locale: getattr(coverage.area, f"name_{locale}", None) or coverage.area.name
+                    for locale in ["pt", "en", "es"]
+                }
+            for dt in coverage.datetime_ranges.all():
+                if dt.since:
+                    update_bound("since", dt.since, dt.since_str, True)
+                    update_bound(f"{scope}_since", dt.since, dt.since_str, True)
+                if dt.until:
+                    update_bound("until", dt.until, dt.until_str, False)
+                    update_bound(f"{scope}_until", dt.until, dt.until_str, False)
+                # Ranges are kept without time zone, as they are indexed, and end at the end
+                # of the period of `until`, as dates of the search do. A missing bound
+                # leaves the range open on its side
+                if dt.since or dt.until:
+                    dt_range = [
+                        bound.replace(tzinfo=None) if bound else None
+                        for bound in (dt.since, dt.until_end)
+                    ]
+                    ranges["all"].append(dt_range)
+                    ranges[scope].append(dt_range)
+
+        values = {}
+        for scope in ["", "open_", "closed_"]:
+            for bound in ["since", "until"]:
+                value, value_str = bounds.get(f"{scope}{bound}", (None, ""))
+                values[f"{scope}{bound}"] = value
+                values[f"{scope}{bound}_str"] = value_str
+
+        spatial_coverage = prune_area_slugs(areas)
+        return {
+            **values,
+            "temporal_ranges": {scope: merge_ranges(ranges[scope]) for scope in ranges},
+            "has_open_coverage": has_coverage["open"],
+            "has_closed_coverage": has_coverage["closed"],
+            "spatial_coverage": spatial_coverage,
+            "spatial_coverage_names": {slug: areas[slug] for slug in spatial_coverage},
+        }
+
+    @classmethod
+    def refresh(cls, resource) -> "CoverageSummary":
+        """Recompute the coverage summary of a resource"""
+        summary, _ = cls.objects.update_or_create(
+            **{cls.get_resource_field(resource): resource},
+            defaults=cls.get_values(resource),
+        )
+        return summary
+
+
+def get_coverage_summary(resource) -> CoverageSummary:
+    """Get the coverage summary of a resource
+
+    Resources without coverages, or whose coverages didn't change since the summaries
+    were created, are summarized on the fly, without saving their summary
+    """
+    try:
+        return resource.coverage_summary
+    except ObjectDoesNotExist:
+        return CoverageSummary(**CoverageSummary.get_values(resource))
+
+
 class QualityCheck(BaseModel):
     """Model definition for QualityCheck."""
 
@@ -2304,26 +2853,76 @@ class Date:
         return {"date": self.str, "type": self.type}
 
 
+# Bounds of the summarized dates, which are in utc
+MIN_DATETIME = datetime.min.replace(tzinfo=timezone.utc)
+MAX_DATETIME = datetime.max.replace(tzinfo=timezone.utc)
+
+
 def get_temporal_coverage(resources: list) -> dict:
     """Get maximum temporal coverage of resources
 
     Case:
     - Table A has data with dates between [X, Y]
     """
-    since = Date(datetime.max, None, None)
-    until = Date(datetime.min, None, None)
+    since = Date(MAX_DATETIME, None, None)
+    until = Date(MIN_DATETIME, None, None)
     for resource in resources:
-        for cov in resource.coverages.all():
-            for dt in cov.datetime_ranges.all():
-                if dt.since and dt.since < since.dt:
-                    since.dt = dt.since
-                    since.str = dt.since_str
-                if dt.until and dt.until > until.dt:
-                    until.dt = dt.until
-                    until.str = dt.until_str
+        summary = get_coverage_summary(resource)
+        if summary.since and summary.since < since.dt:
+            since.dt = summary.since
+            since.str = summary.since_str
+        if summary.until and summary.until > until.dt:
+            until.dt = summary.until
+            until.str = summary.until_str
     return {"start": since.str, "end": until.str}
 
 
+def get_temporal_ranges(resources: list, is_closed: bool = None) -> list[dict]:
+    """Get the date ranges covered by resources, merging the overlapping ones
+
+    Ranges are formatted as `{"gte": since, "lte": until}`, like Elasticsearch ranges,
+    without the bound on the side they're open
+
+    Args:
+        is_closed: only the ranges of closed or open coverages, defaults to all
+    """
+    scope = "all" if is_closed is None else "closed" if is_closed else "open"
+    ranges = []
+    for resource in resources:
+        for dt_range in get_coverage_summary(resource).temporal_ranges.get(scope, []):
+            ranges.append(
+                [
+                    datetime.fromisoformat(dt_range[bound]) if bound in dt_range else None
+                    for bound in ("gte", "lte")
+                ]
+            )
+    return merge_ranges(ranges)
+
+
+def merge_ranges(ranges: list[list[datetime | None]]) -> list[dict]:
+    """Merge the overlapping `[since, until]` ranges, formatting them as `get_temporal_ranges`
+
+    Missing bounds leave the ranges open on their side
+    """
+    bounded = [[since or datetime.min, until or datetime.max] for since, until in ranges]
+    merged = []
+    for since, until in sorted(bounded):
+        if merged and since <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], until)
+        else:
+            merged.append([since, until])
+
+    formatted = []
+    for since, until in merged:
+        dt_range = {}
+        if since != datetime.min:
+            dt_range["gte"] = since.isoformat()
+        if until != datetime.max:
+            dt_range["lte"] = until.isoformat()
+        formatted.append(dt_range)
+    return formatted
+
+
 def get_full_temporal_coverage(resources: list) -> dict:
     """Get temporal coverage steps of resources
 
@@ -2332,27 +2931,24 @@ def get_full_temporal_coverage(resources: list) -> dict:
     - Table A has data with dates between [X, Y], where [X, Y] is closed
     - Table A has data with dates between [X, Y, Z], where [X, Y] is open and [Y, Z] is closed
     """
-    open_since = Date(datetime.max, None, "open")
-    open_until = Date(datetime.min, None, "open")
-    paid_since = Date(datetime.max, None, "closed")
-    paid_until = Date(datetime.min, None, "closed")
+    open_since = Date(MAX_DATETIME, None, "open")
+    open_until = Date(MIN_DATETIME, None, "open")
+    paid_since = Date(MAX_DATETIME, None, "closed")
+    paid_until = Date(MIN_DATETIME, None, "closed")
     for resource in resources:
-        for cov in resource.coverages.all():
-            for dt in cov.datetime_ranges.all():
-                if not cov.is_closed:
-                    if dt.since and dt.since < open_since.dt:
-                        open_since.dt = dt.since
-                        open_since.str = dt.since_str
-                    if dt.until and dt.until > open_until.dt:
-                        open_until.dt = dt.until
-                        open_until.str = dt.until_str
-                else:
-                    if dt.since and dt.since < paid_since.dt:
-                        paid_since.dt = dt.since
-                        paid_since.str = dt.since_str
-                    if dt.until and dt.until > paid_until.dt:
-                        paid_until.dt = dt.until
-                        paid_until.str = dt.until_str
+        summary = get_coverage_summary(resource)
+        if summary.open_since and summary.open_since < open_since.dt:
+            open_since.dt = summary.open_since
+            open_since.str = summary.open_since_str
+        if summary.open_until and summary.open_until > open_until.dt:
+            open_until.dt = summary.open_until
+            open_until.str = summary.open_until_str
+        if summary.closed_since and summary.closed_since < paid_since.dt:
+            paid_since.dt = summary.closed_since
+            paid_since.str = summary.closed_since_str
+        if summary.closed_until and summary.closed_until > paid_until.dt:
+            paid_until.dt = summary.closed_until
+            paid_until.str = summary.closed_until_str
     if open_since.str and paid_since.str and paid_until.str:
         paid_since.type = "open"
         return [open_since.as_dict, paid_since.as_dict, paid_until.as_dict]
@@ -2365,48 +2961,33 @@ def get_full_temporal_coverage(resources: list) -> dict:
         return [paid_since.as_dict, paid_until.as_dict]
 
 
-def get_spatial_coverage(resources: list) -> list:
-    """Get spatial coverage of resources by returning unique area slugs,
-    keeping only the highest level in each branch
+def prune_area_slugs(slugs) -> list[str]:
+    """Keep only the highest level area of each branch, by the parents of the areas
 
     For example:
     - If areas = [br_mg_3100104, br_mg_3100104] -> returns [br_mg_3100104]
     - If areas = [br_mg_3100104, br_sp_3500105] -> returns [br_mg_3100104, br_sp_3500105]
     - If areas = [br_mg, us_ny, us] -> returns [br_mg, us]
     - If areas = [br_mg, world, us] -> returns [world]
-    - If resources have no areas -> returns empty list
+    - If there are no areas -> returns empty list
     """
-    # Collect all unique area slugs across resources
-    all_areas = set()
-    for resource in resources:
-        for coverage in resource.coverages.all():
-            if coverage.area:
-                all_areas.add(coverage.area.slug)
+    all_areas = set(slugs)
 
     if not all_areas:
         return []
 
-    # If 'world' is present, it encompasses everything
-    if "world" in all_areas:
-        return ["world"]
-
-    # Filter out areas that have a parent in the set
-    filtered_areas = set()
-    for area in all_areas:
-        parts = area.split("_")
-        is_parent_present = False
-
-        # Check if any parent path exists in all_areas
-        for i in range(1, len(parts)):
-            parent = "_".join(parts[:i])
-            if parent in all_areas:
-                is_parent_present = True
-                break
+    # Ancestors are read from the area tree, see `AreaClosure`
+    return get_area_tree().prune(all_areas)
 
-        if not is_parent_present:
-            filtered_areas.add(area)
 
-    return sorted(list(filtered_areas))
+def get_spatial_coverage(resources: list) -> list:
+    """Get spatial coverage of resources by returning unique area slugs,
+    keeping only the highest level in each branch, see `prune_area_slugs`
+    """
+    all_areas = set()
+    for resource in resources:
+        all_areas.update(get_coverage_summary(resource).spatial_coverage)
+    return prune_area_slugs(all_areas)
 
 
 def get_spatial_coverage_name(resources: list, locale: str = "pt") -> list:
@@ -2438,13 +3019,10 @@ def get_spatial_coverage_name(resources: list, locale: str = "pt") -> list:
     # Collect all unique areas (both slug and name) across resources
     all_areas = {}
     for resource in resources:
-        for coverage in resource.coverages.all():
-            if coverage.area:
-                # Get localized name using getattr, fallback to default name if not found
-                localized_name = (
-                    getattr(coverage.area, f"name_{locale}", None) or coverage.area.name
-                )
-                all_areas[coverage.area.slug] = localized_name
+        summary = get_coverage_summary(resource)
+        for slug in summary.spatial_coverage:
+            names = summary.spatial_coverage_names.get(slug, {})
+            all_areas[slug] = names.get(locale) or names.get("pt") or slug
 
     if not all_areas:
         return []
@@ -2453,20 +3031,4 @@ def get_spatial_coverage_name(resources: list, locale: str = "pt") -> list:
     if "world" in all_areas:
         return [translations["world"].get(locale, translations["world"]["pt"])]
 
-    # Filter out areas that have a parent in the set
-    filtered_areas = set()
-    for area_slug in all_areas:
-        parts = area_slug.split("_")
-        is_parent_present = False
-
-        # Check if any parent path exists in all_areas
-        for i in range(1, len(parts)):
-            parent = "_".join(parts[:i])
-            if parent in all_areas:
-                is_parent_present = True
-                break
-
-        if not is_parent_present:
-            filtered_areas.add(all_areas[area_slug])
-
-    return sorted(list(filtered_areas))
+    return sorted({all_areas[slug] for slug in prune_area_slugs(all_areas)})
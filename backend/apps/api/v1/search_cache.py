@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Response cache of the search views
+
+Responses are keyed by the canonical form of the request parameters and by the
+generation of the search index, which is bumped on every write to the index. Old
+generations are never read again and simply expire.
+
+Only one request computes a missing response, while the concurrent ones wait for it,
+so that a burst of identical queries doesn't reach the search engine all at once.
+"""
+
+from hashlib import sha1
+from json import dumps
+from time import monotonic, sleep
+from typing import Callable
+
+from django.conf import settings
+from django.http import HttpResponse
+from loguru import logger
+
+from backend.custom.client import get_redis_client
+
+GENERATION_KEY = "search:cache:generation"
+RESPONSE_KEY = "search:cache:{generation}:{digest}"
+LOCK_KEY = "search:cache:lock:{digest}"
+
+LOCK_TIMEOUT = 10
+WAIT_TIMEOUT = 5
+WAIT_INTERVAL = 0.05
+
+
+def get_generation() -> int:
+    """Get the generation of the search index"""
+    return int(get_redis_client().get(GENERATION_KEY) or 0)
+
+
+def bump_generation():
+    """Invalidate the cached responses, after a write to the search index"""
+    try:
+        get_redis_client().incr(GENERATION_KEY)
+    except Exception as error:
+        logger.error(error)
+
+
+def get_digest(namespace: str, params: dict[str, list[str]]) -> str:
+    """Hash the canonical form of the request parameters
+
+    Empty values are dropped and multiple values are sorted, so that the order of
+    the parameters in the url doesn't matter
+    """
+    canonical = {
+        key: sorted(value for value in values if value)
+        for key, values in sorted(params.items())
+        if any(values)
+    }
+    return sha1(dumps([namespace, canonical]).encode()).hexdigest()
+
+
+def get_cached_response(
+    namespace: str,
+    params: dict[str, list[str]],
+    get_response: Callable[[], HttpResponse],
+) -> HttpResponse:
+    """Get a cached json response, computing it once on a miss
+
+    If the cache is unavailable, the response is computed as usual
+    """
+    if not settings.SEARCH_CACHE_TIMEOUT:
+        return get_response()
+
+    try:
+        redis = get_redis_client()
+        digest = get_digest(namespace, params)
+        response_key = RESPONSE_KEY.format(generation=get_generation(), digest=digest)
+        lock_key = LOCK_KEY.format(digest=digest)
+
+        if content := redis.get(response_key):
+            return as_response(content, "HIT")
+
+        if not redis.set(lock_key, 1, nx=True, ex=LOCK_TIMEOUT):
+            # Another request is computing it, wait for it before giving up
+            deadline = monotonic() + WAIT_TIMEOUT
+            while monotonic() < deadline:
+                sleep(WAIT_INTERVAL)
+                if content := redis.get(response_key):
+                    return as_response(content, "HIT")
+                if not redis.exists(lock_key):
+                    break
+            return get_response()
+    except Exception as error:
+        logger.warning(error)
+        return get_response()
+
+    response = None
+    try:
+        response = get_response()
+        response["X-Cache"] = "MISS"
+        return response
+    finally:
+        try:
+            if response is not None and response.status_code == 200:
+                redis.set(response_key, response.content, ex=settings.SEARCH_CACHE_TIMEOUT)
+            redis.delete(lock_key)
+        except Exception as error:
+            logger.warning(error)
+
+
+def as_response(content: bytes, status: str) -> HttpResponse:
+    response = HttpResponse(content, content_type="application/json")
+    response["X-Cache"] = status
+    return response
@@ -6,14 +6,75 @@ https://github.com/mounirmesselmeni/MounirMesselmeni.github.io/tree/master/2015/
 """
 
 from abc import ABCMeta
+from copy import deepcopy
+from datetime import datetime
 
-from haystack import indexes  # noqa: F401
+import elasticsearch
+import haystack
+from haystack import indexes
 from haystack.backends import elasticsearch7_backend as es_backend
+from haystack.backends import log_query
+from haystack.constants import DEFAULT_ALIAS, DJANGO_CT, DJANGO_ID
+from haystack.models import SearchResult
+
+from backend.apps.api.v1.search_cache import bump_generation
+from backend.apps.api.v1.search_profile import get_profile
+
+
+class CompletionField(indexes.MultiValueField):
+    """Inputs of a completion suggester, matched by prefix while the user types"""
+
+    field_type = "completion"
+
+
+class DateRangeField(indexes.MultiValueField):
+    """Date ranges, as `{"gte": since, "lte": until}`, filtered by range queries"""
+
+    field_type = "date_range"
+
+
+class StoredCharField(indexes.CharField):
+    """Value only returned with the results, neither searched, sorted nor faceted"""
+
+    field_type = "stored"
+
+
+class StoredMultiValueField(indexes.MultiValueField):
+    """Values only returned with the results, neither searched, sorted nor faceted"""
+
+    field_type = "stored"
+
+
+class StoredObjectField(indexes.SearchField):
+    """Json object only returned with the results, its keys aren't even mapped"""
+
+    field_type = "object"
 
 
 class ASCIIFoldingElasticBackend(es_backend.Elasticsearch7SearchBackend, metaclass=ABCMeta):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    """Elasticsearch backend with ascii folding analyzers
+
+    The configured `INDEX_NAME` may be either a concrete index or an alias to a
+    versioned index, which allows rebuilding the index without downtime:
+
+    1. `create_versioned_index` creates an empty index, without replicas and refresh
+    2. `get_index_backend` returns a backend that writes into it
+    3. `promote_versioned_index` validates it and swaps the alias to it
+
+    Committed writes bump the generation of the cached search responses
+    """
+
+    FIELD_MAPPINGS = {
+        **es_backend.Elasticsearch7SearchBackend.FIELD_MAPPINGS,
+        "completion": {"type": "completion", "analyzer": "suggest"},
+        "date_range": {"type": "date_range"},
+        "stored": {"type": "keyword", "index": False, "doc_values": False},
+        "object": {"type": "object", "enabled": False},
+    }
+
+    def __init__(self, connection_alias, **connection_options):
+        super().__init__(connection_alias, **connection_options)
+        self.connection_options = connection_options
         analyzer = {
             "ngram": {
                 "tokenizer": "ngram",
@@ -38,6 +99,10 @@ class ASCIIFoldingElasticBackend(es_backend.Elasticsearch7SearchBackend, metacla
                 "language": "Spanish",
                 "filter": ["asciifolding"],
             },
+            "suggest": {
+                "tokenizer": "standard",
+                "filter": ["asciifolding", "lowercase"],
+            },
         }
         tokenizer = {
             "ngram": {
@@ -73,6 +138,325 @@ class ASCIIFoldingElasticBackend(es_backend.Elasticsearch7SearchBackend, metacla
             mapping.update({field_class.index_fieldname: field_mapping})
         return (content_field_name, mapping)
 
+    @log_query
+    def search(self, query_string, source_fields=None, **kwargs):
+        """Search, returning only the given source fields of each hit
+
+        Same as the original search, which always returns the whole source
+        """
+        if len(query_string) == 0:
+            return {"results": [], "hits": 0}
+
+        if not self.setup_complete:
+            self.setup()
+
+        search_kwargs = self.build_search_kwargs(query_string, **kwargs)
+        search_kwargs["from"] = kwargs.get("start_offset", 0)
+
+        end_offset = kwargs.get("end_offset")
+        start_offset = kwargs.get("start_offset", 0)
+        if end_offset is not None and end_offset > start_offset:
+            search_kwargs["size"] = end_offset - start_offset
+
+        if source_fields:
+            source = {"_source_includes": [DJANGO_CT, DJANGO_ID, *source_fields]}
+        else:
+            source = {"_source": True}
+
+        try:
+            raw_results = self.send_search(search_kwargs, **source)
+        except elasticsearch.TransportError:
+            if not self.silently_fail:
+                raise
+            self.log.exception("Failed to query Elasticsearch using '%s'", query_string)
+            raw_results = {}
+
+        return self._process_results(
+            raw_results,
+            highlight=kwargs.get("highlight"),
+            result_class=kwargs.get("result_class", SearchResult),
+            distance_point=kwargs.get("distance_point"),
+        )
+
+    def send_search(self, body: dict, **kwargs) -> dict:
+        """Send a search request, measuring it if the current request is profiled"""
+        profile = get_profile()
+        if profile is None:
+            return self.conn.search(body=body, index=self.index_name, **kwargs)
+
+        if profile.es_profile:
+            body = {**body, "profile": True}
+        with profile.measure("es") as timing:
+            raw_results = self.conn.search(body=body, index=self.index_name, **kwargs)
+        timing["took"] = raw_results.get("took")
+        timing["hits"] = len(raw_results.get("hits", {}).get("hits", []))
+        if profile.es_profile:
+            timing["profile"] = raw_results.get("profile")
+        return raw_results
+
+    def build_search_kwargs(
+        self, query_string, filter_clauses=None, composite_facets=None, **kwargs
+    ):
+        kwargs = super().build_search_kwargs(query_string, **kwargs)
+        if filter_clauses:
+            query = kwargs["query"]
+            if "bool" not in query:
+                query = kwargs["query"] = {"bool": {"must": query}}
+            filters = [query["bool"]["filter"]] if "filter" in query["bool"] else []
+            query["bool"]["filter"] = filters + filter_clauses
+        if composite_facets:
+            index = haystack.connections[self.connection_alias].get_unified_index()
+            for facet_fieldname, options in composite_facets.items():
+                field = index.get_facet_fieldname(facet_fieldname)
+                aggregation = {
+                    "composite": {
+                        "size": options["size"],
+                        "sources": [{"key": {"terms": {"field": field}}}],
+                    }
+                }
+                if options["after"] is not None:
+                    aggregation["composite"]["after"] = {"key": options["after"]}
+                if options["include"] is not None:
+                    aggregation = {
+                        "filter": {"terms": {field: options["include"]}},
+                        "aggs": {"values": aggregation},
+                    }
+                aggregation["meta"] = {"_type": "composite"}
+                kwargs.setdefault("aggs", {})[facet_fieldname] = aggregation
+        return kwargs
+
+    def _process_results(self, raw_results, *args, **kwargs):
+        results = super()._process_results(raw_results, *args, **kwargs)
+
+        # Keep the sort values of each hit, to continue after it with `search_after`
+        sort_values = {
+            (hit["_source"][DJANGO_CT], hit["_source"][DJANGO_ID]): hit["sort"]
+            for hit in raw_results.get("hits", {}).get("hits", [])
+            if "sort" in hit
+        }
+        for result in results["results"]:
+            result.sort_values = sort_values.get(
+                (f"{result.app_label}.{result.model_name}", result.pk)
+            )
+
+        # Composite facets are paginated by the key after their last bucket
+        for facet_fieldname, facet_info in raw_results.get("aggregations", {}).items():
+            if facet_info["meta"]["_type"] == "composite":
+                facet_info = facet_info.get("values", facet_info)
+                results["facets"].setdefault("composite", {})[facet_fieldname] = {
+                    "values": [
+                        (bucket["key"]["key"], bucket["doc_count"])
+                        for bucket in facet_info["buckets"]
+                    ],
+                    "after": facet_info.get("after_key", {}).get("key"),
+                }
+        return results
+
+    def complete(
+        self, field_name: str, prefix: str, size: int = 10, fields: list[str] = None
+    ) -> list[dict]:
+        """Get the documents with a completion input starting with the prefix
+
+        Args:
+            fields: source fields of the documents to return, defaults to all
+        """
+        if not self.setup_complete:
+            self.setup()
+
+        body = {
+            "_source": fields or True,
+            "suggest": {
+                field_name: {
+                    "prefix": prefix,
+                    "completion": {"field": field_name, "size": size},
+                }
+            },
+        }
+        try:
+            raw_results = self.send_search(body)
+        except elasticsearch.TransportError:
+            if not self.silently_fail:
+                raise
+            self.log.exception("Failed to complete '%s' in Elasticsearch", prefix)
+            return []
+
+        return [
+            option["_source"]
+            for suggestion in raw_results["suggest"][field_name]
+            for option in suggestion["options"]
+        ]
+
+    def get_index_backend(self, index_name: str) -> "ASCIIFoldingElasticBackend":
+        """Get a backend that reads and writes into another index"""
+        connection_options = {**self.connection_options, "INDEX_NAME": index_name}
+        return type(self)(self.connection_alias, **connection_options)
+
+    def get_alias_indices(self) -> list[str]:
+        """Get the concrete indices behind the index name, if it's an alias"""
+        if not self.conn.indices.exists_alias(name=self.index_name):
+            return []
+        return list(self.conn.indices.get_alias(name=self.index_name).keys())
+
+    def get_versioned_indices(self) -> list[str]:
+        """Get all versioned indices of the index name"""
+        prefix = f"{self.index_name}_"
+        indices = self.conn.indices.get(index=f"{prefix}*", ignore=404)
+        return sorted(
+            name
+            for name in indices
+            if name.startswith(prefix) and name.removeprefix(prefix).isdigit()
+        )
+
+    def create_versioned_index(self) -> str:
+        """Create an empty versioned index, tuned for bulk loading"""
+        index_name = f"{self.index_name}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+
+        unified_index = haystack.connections[self.connection_alias].get_unified_index()
+        _, field_mapping = self.build_schema(unified_index.all_searchfields())
+
+        body = deepcopy(self.DEFAULT_SETTINGS)
+        body["settings"]["number_of_replicas"] = 0
+        body["settings"]["refresh_interval"] = "-1"
+        body["mappings"] = self._get_current_mapping(field_mapping)
+        self.conn.indices.create(index=index_name, body=body)
+        return index_name
+
+    def promote_versioned_index(self, index_name: str, expected_counts: dict[str, int]):
+        """Validate a versioned index, point the index name to it and drop the old ones
+
+        Args:
+            expected_counts: number of documents of each model, by label like `v1.dataset`
+
+        Raises:
+            ValueError: if the number of documents of a model differs from the expected
+        """
+        self.conn.indices.refresh(index=index_name)
+        for model_ct, expected_count in expected_counts.items():
+            body = {"query": {"term": {DJANGO_CT: model_ct}}}
+            count = self.conn.count(index=index_name, body=body)["count"]
+            if count != expected_count:
+                raise ValueError(
+                    f"Index {index_name} has {count} documents of {model_ct}, "
+                    f"but {expected_count} were expected"
+                )
+
+        # Restore the settings of the live index before serving reads
+        number_of_replicas = "1"
+        if self.conn.indices.exists(index=self.index_name):
+            live_settings = self.conn.indices.get_settings(index=self.index_name)
+            for settings in live_settings.values():
+                number_of_replicas = settings["settings"]["index"]["number_of_replicas"]
+        self.conn.indices.put_settings(
+            index=index_name,
+            body={"index": {"number_of_replicas": number_of_replicas, "refresh_interval": None}},
+        )
+        self.conn.cluster.health(index=index_name, wait_for_status="yellow")
+
+        # Swap the alias atomically, replacing the concrete index of older deploys
+        old_indices = self.get_alias_indices()
+        actions = [{"remove": {"index": name, "alias": self.index_name}} for name in old_indices]
+        if not old_indices and self.conn.indices.exists(index=self.index_name):
+            actions.append({"remove_index": {"index": self.index_name}})
+        actions.append({"add": {"index": index_name, "alias": self.index_name}})
+        self.conn.indices.update_aliases(body={"actions": actions})
+
+        for name in self.get_versioned_indices():
+            if name != index_name:
+                self.conn.indices.delete(index=name, ignore=404)
+
+        self.setup_complete = False
+        self.existing_mapping = {}
+        bump_generation()
+
+    def update(self, index, iterable, commit=True):
+        super().update(index, iterable, commit=commit)
+        if commit:
+            bump_generation()
+
+    def remove(self, obj_or_string, commit=True):
+        super().remove(obj_or_string, commit=commit)
+        if commit:
+            bump_generation()
+
+    def remove_by_query(self, query: dict, commit=True):
+        """Remove the documents matching a query, like the stale ones of a dataset"""
+        if not self.setup_complete:
+            self.setup()
+        self.conn.delete_by_query(
+            index=self.index_name,
+            body={"query": query},
+            conflicts="proceed",
+            refresh=commit,
+        )
+        if commit:
+            bump_generation()
+
+    def clear(self, models=None, commit=True):
+        # Indices can't be deleted through their alias
+        if models is None and (indices := self.get_alias_indices()):
+            self.conn.indices.delete(index=",".join(indices), ignore=404)
+            self.setup_complete = False
+            self.existing_mapping = {}
+            self.content_field_name = None
+        else:
+            super().clear(models=models, commit=commit)
+        bump_generation()
+
+
+class ExtendedQueryMixin:
+    """Search query with raw clauses in filter context, composite facets
+    and source filtering, shared by the search engines of this app
+
+    Unlike narrow queries, the clauses aren't parsed as query strings,
+    so they are cheaper and cached by Elasticsearch
+    """
+
+    def __init__(self, using=DEFAULT_ALIAS):
+        super().__init__(using=using)
+        self.filter_clauses = []
+        self.composite_facets = {}
+        self.source_fields = []
+
+    def add_filter_clause(self, clause: dict):
+        self.filter_clauses.append(clause)
+
+    def add_composite_facet(
+        self, field: str, size: int, after: str = None, include: list[str] = None
+    ):
+        """Count the values of a field in pages ordered by value
+
+        Args:
+            after: count only the values after this one, from the previous page
+            include: count only these values
+        """
+        self.composite_facets[field] = {"size": size, "after": after, "include": include}
+
+    def set_source_fields(self, fields: list[str]):
+        """Return only these fields of each result, instead of all of them"""
+        self.source_fields = list(fields)
+
+    def build_params(self, spelling_query=None, **kwargs):
+        search_kwargs = super().build_params(spelling_query=spelling_query, **kwargs)
+        if self.source_fields:
+            search_kwargs["source_fields"] = self.source_fields
+        if self.filter_clauses:
+            search_kwargs["filter_clauses"] = self.filter_clauses
+        if self.composite_facets:
+            search_kwargs["composite_facets"] = self.composite_facets
+        return search_kwargs
+
+    def _clone(self, klass=None, using=None):
+        clone = super()._clone(klass=klass, using=using)
+        clone.filter_clauses = self.filter_clauses[:]
+        clone.composite_facets = self.composite_facets.copy()
+        clone.source_fields = self.source_fields[:]
+        return clone
+
+
+class ASCIIFoldingElasticSearchQuery(ExtendedQueryMixin, es_backend.Elasticsearch7SearchQuery):
+    pass
+
 
 class AsciifoldingElasticSearchEngine(es_backend.Elasticsearch7SearchEngine):
     backend = ASCIIFoldingElasticBackend
+    query = ASCIIFoldingElasticSearchQuery
@@ -1,7 +1,32 @@
 # -*- coding: utf-8 -*-
+from collections import defaultdict
+from datetime import datetime
+
+from django.db.models import Q
 from haystack import indexes
+from haystack.constants import DJANGO_ID
 
-from backend.apps.api.v1.models import Dataset
+from backend.apps.api.v1.models import (
+    Column,
+    Coverage,
+    Dataset,
+    DatasetSearchDocument,
+    DateTimeRange,
+    InformationRequest,
+    Organization,
+    RawDataSource,
+    Table,
+    Tag,
+    Theme,
+)
+from backend.apps.api.v1.search_engines import (
+    CompletionField,
+    DateRangeField,
+    StoredCharField,
+    StoredMultiValueField,
+    StoredObjectField,
+)
+from backend.apps.api.v1.search_views import LOCALES, prerender_search_result
 
 
 class DatasetIndex(indexes.SearchIndex, indexes.Indexable):
@@ -9,180 +34,107 @@ class DatasetIndex(indexes.SearchIndex, indexes.Indexable):
 
     updated_at = indexes.DateTimeField(model_attr="updated_at")
 
-    dataset_id = indexes.CharField(
+    dataset_id = StoredCharField(
         model_attr="pk",
-        indexed=False,
     )
-    dataset_slug = indexes.CharField(
+    dataset_slug = StoredCharField(
         model_attr="slug",
-        indexed=False,
     )
-    dataset_name_pt = indexes.CharField(
+    dataset_name_pt = StoredCharField(
         model_attr="name_pt",
         null=True,
-        indexed=False,
     )
-    dataset_name_en = indexes.CharField(
+    dataset_name_en = StoredCharField(
         model_attr="name_en",
         null=True,
-        indexed=False,
     )
-    dataset_name_es = indexes.CharField(
+    dataset_name_es = StoredCharField(
         model_attr="name_es",
         null=True,
-        indexed=False,
     )
-    dataset_description_pt = indexes.CharField(
+    dataset_description_pt = StoredCharField(
         model_attr="description_pt",
         null=True,
-        indexed=False,
     )
-    dataset_description_en = indexes.CharField(
+    dataset_description_en = StoredCharField(
         model_attr="description_en",
         null=True,
-        indexed=False,
     )
-    dataset_description_es = indexes.CharField(
+    dataset_description_es = StoredCharField(
         model_attr="description_es",
         null=True,
-        indexed=False,
     )
 
+    result_pt = StoredObjectField(null=True)
+    result_en = StoredObjectField(null=True)
+    result_es = StoredObjectField(null=True)
+
+    suggest_pt = CompletionField(null=True)
+    suggest_en = CompletionField(null=True)
+    suggest_es = CompletionField(null=True)
+
     spatial_coverage = indexes.MultiValueField(
-        model_attr="spatial_coverage",
+        model_attr="search_document__spatial_coverage",
         null=True,
         faceted=True,
         indexed=True,
     )
 
     temporal_coverage = indexes.MultiValueField(
-        model_attr="temporal_coverage",
+        model_attr="search_document__temporal_coverage",
         null=True,
         faceted=True,
         indexed=True,
     )
 
-    table_id = indexes.MultiValueField(
-        model_attr="tables__pk",
-        indexed=False,
-    )
-    table_slug = indexes.MultiValueField(
-        model_attr="tables__slug",
-        indexed=False,
-    )
-    table_name_pt = indexes.MultiValueField(
-        model_attr="tables__name_pt",
-        null=True,
-        indexed=False,
-    )
-    table_name_en = indexes.MultiValueField(
-        model_attr="tables__name_en",
-        null=True,
-        indexed=False,
-    )
-    table_name_es = indexes.MultiValueField(
-        model_attr="tables__name_es",
-        null=True,
-        indexed=False,
-    )
-    table_description_pt = indexes.MultiValueField(
-        model_attr="tables__description_pt",
-        null=True,
-        indexed=False,
-    )
-    table_description_en = indexes.MultiValueField(
-        model_attr="tables__description_en",
-        null=True,
-        indexed=False,
-    )
-    table_description_es = indexes.MultiValueField(
-        model_attr="tables__description_es",
-        null=True,
-        indexed=False,
-    )
+    temporal_range = DateRangeField(null=True)
+    temporal_range_open = DateRangeField(null=True)
+    temporal_range_closed = DateRangeField(null=True)
 
-    organization_id = indexes.MultiValueField(
+    organization_id = StoredMultiValueField(
         model_attr="organizations__id",
-        faceted=True,
-        indexed=False,
     )
     organization_slug = indexes.MultiValueField(
         model_attr="organizations__slug",
         faceted=True,
         indexed=False,
     )
-    organization_name = indexes.MultiValueField(
+    organization_name = StoredMultiValueField(
         model_attr="organizations__name",
-        faceted=True,
-        indexed=False,
     )
-    organization_name_pt = indexes.MultiValueField(
+    organization_name_pt = StoredMultiValueField(
         model_attr="organizations__name_pt",
         null=True,
-        faceted=True,
-        indexed=False,
     )
-    organization_name_en = indexes.MultiValueField(
+    organization_name_en = StoredMultiValueField(
         model_attr="organizations__name_en",
         null=True,
-        faceted=True,
-        indexed=False,
     )
-    organization_name_es = indexes.MultiValueField(
+    organization_name_es = StoredMultiValueField(
         model_attr="organizations__name_es",
         null=True,
-        faceted=True,
-        indexed=False,
     )
-    organization_picture = indexes.MultiValueField(
+    organization_picture = StoredMultiValueField(
         model_attr="organizations__picture",
         default="",
-        indexed=False,
-    )
-    organization_website = indexes.MultiValueField(
-        model_attr="organizations__website",
-        default="",
-        indexed=False,
-    )
-    organization_description_pt = indexes.MultiValueField(
-        model_attr="organizations__description_pt",
-        null=True,
-        indexed=False,
-    )
-    organization_description_en = indexes.MultiValueField(
-        model_attr="organizations__description_en",
-        null=True,
-        indexed=False,
-    )
-    organization_description_es = indexes.MultiValueField(
-        model_attr="organizations__description_es",
-        null=True,
-        indexed=False,
     )
-
     tag_slug = indexes.MultiValueField(
         model_attr="tags__slug",
         default="",
         faceted=True,
         indexed=False,
     )
-    tag_name_pt = indexes.MultiValueField(
+    tag_name_pt = StoredMultiValueField(
         model_attr="tags__name_pt",
         null=True,
-        faceted=True,
-        indexed=False,
     )
-    tag_name_en = indexes.MultiValueField(
+    tag_name_en = StoredMultiValueField(
         model_attr="tags__name_en",
         null=True,
-        faceted=True,
-        indexed=False,
     )
-    tag_name_es = indexes.MultiValueField(
+    tag_name_es = StoredMultiValueField(
         model_attr="tags__name_es",
         null=True,
-        faceted=True,
-        indexed=False,
     )
     theme_slug = indexes.MultiValueField(
         model_attr="themes__slug",
@@ -190,23 +142,17 @@ class DatasetIndex(indexes.SearchIndex, indexes.Indexable):
         faceted=True,
         indexed=False,
     )
-    theme_name_pt = indexes.MultiValueField(
+    theme_name_pt = StoredMultiValueField(
         model_attr="themes__name_pt",
         null=True,
-        faceted=True,
-        indexed=False,
     )
-    theme_name_en = indexes.MultiValueField(
+    theme_name_en = StoredMultiValueField(
         model_attr="themes__name_en",
         null=True,
-        faceted=True,
-        indexed=False,
     )
-    theme_name_es = indexes.MultiValueField(
+    theme_name_es = StoredMultiValueField(
         model_attr="themes__name_es",
         null=True,
-        faceted=True,
-        indexed=False,
     )
     entity_slug = indexes.MultiValueField(
         model_attr="tables__observation_levels__entity__slug",
@@ -214,117 +160,218 @@ class DatasetIndex(indexes.SearchIndex, indexes.Indexable):
         faceted=True,
         indexed=False,
     )
-    entity_name_pt = indexes.MultiValueField(
+    entity_name_pt = StoredMultiValueField(
         model_attr="tables__observation_levels__entity__name_pt",
         null=True,
-        faceted=True,
-        indexed=False,
     )
-    entity_name_en = indexes.MultiValueField(
+    entity_name_en = StoredMultiValueField(
         model_attr="tables__observation_levels__entity__name_en",
         null=True,
-        faceted=True,
-        indexed=False,
     )
-    entity_name_es = indexes.MultiValueField(
+    entity_name_es = StoredMultiValueField(
         model_attr="tables__observation_levels__entity__name_es",
         null=True,
-        faceted=True,
-        indexed=False,
     )
 
     contains_open_data = indexes.BooleanField(
-        model_attr="contains_open_data",
+        model_attr="search_document__contains_open_data",
         indexed=False,
     )
     contains_closed_data = indexes.BooleanField(
-        model_attr="contains_closed_data",
+        model_attr="search_document__contains_closed_data",
         indexed=False,
     )
 
     contains_direct_download_free = indexes.BooleanField(
-        model_attr="contains_direct_download_free",
+        model_attr="search_document__contains_direct_download_free",
         indexed=False,
     )
 
     contains_direct_download_paid = indexes.BooleanField(
-        model_attr="contains_direct_download_paid",
+        model_attr="search_document__contains_direct_download_paid",
         indexed=False,
     )
 
     contains_temporalcoverage_free = indexes.BooleanField(
-        model_attr="contains_temporalcoverage_free",
+        model_attr="search_document__contains_temporalcoverage_free",
         indexed=False,
     )
 
     contains_temporalcoverage_paid = indexes.BooleanField(
-        model_attr="contains_temporalcoverage_paid",
+        model_attr="search_document__contains_temporalcoverage_paid",
         indexed=False,
     )
 
     contains_tables = indexes.BooleanField(
-        model_attr="contains_tables",
+        model_attr="search_document__contains_tables",
         indexed=False,
     )
     contains_raw_data_sources = indexes.BooleanField(
-        model_attr="contains_raw_data_sources",
+        model_attr="search_document__contains_raw_data_sources",
         indexed=False,
     )
     contains_information_requests = indexes.BooleanField(
-        model_attr="contains_information_requests",
+        model_attr="search_document__contains_information_requests",
         indexed=False,
     )
 
     n_tables = indexes.IntegerField(
-        model_attr="n_tables",
+        model_attr="search_document__n_tables",
         indexed=False,
     )
     n_raw_data_sources = indexes.IntegerField(
-        model_attr="n_raw_data_sources",
+        model_attr="search_document__n_raw_data_sources",
         indexed=False,
     )
     n_information_requests = indexes.IntegerField(
-        model_attr="n_information_requests",
+        model_attr="search_document__n_information_requests",
         indexed=False,
     )
 
-    first_table_id = indexes.CharField(
-        model_attr="first_table_id",
+    first_table_id = StoredCharField(
+        model_attr="search_document__first_table_id",
         default="",
-        indexed=False,
     )
-    first_open_table_id = indexes.CharField(
-        model_attr="first_open_table_id",
+    first_open_table_id = StoredCharField(
+        model_attr="search_document__first_open_table_id",
         default="",
-        indexed=False,
     )
-    first_closed_table_id = indexes.CharField(
-        model_attr="first_closed_table_id",
+    first_closed_table_id = StoredCharField(
+        model_attr="search_document__first_closed_table_id",
         default="",
-        indexed=False,
     )
-    first_raw_data_source_id = indexes.CharField(
-        model_attr="first_raw_data_source_id",
+    first_raw_data_source_id = StoredCharField(
+        model_attr="search_document__first_raw_data_source_id",
         default="",
-        indexed=False,
     )
-    first_information_request_id = indexes.CharField(
-        model_attr="first_information_request_id",
+    first_information_request_id = StoredCharField(
+        model_attr="search_document__first_information_request_id",
         default="",
-        indexed=False,
     )
 
+    organization_fields = [
+        "organization_id",
+        "organization_slug",
+        "organization_name",
+        "organization_name_pt",
+        "organization_name_en",
+        "organization_name_es",
+        "organization_picture",
+    ]
+
+    # Fields that aren't read by the prerendered results
+    unrendered_fields = ("text", "result_", "suggest_", "temporal_range")
+
     def get_model(self):
         return Dataset
 
+    def get_updated_field(self):
+        return "updated_at"
+
+    def get_changed_dataset_ids(self, start_date: datetime, end_date: datetime = None) -> set:
+        """Get the datasets that changed, or whose resources changed, between the dates
+
+        A dataset isn't updated when its tables, columns, raw data sources, information
+        requests, coverages, datetime ranges, organizations, tags or themes change, so each
+        of them is checked. Deletions leave no date behind, so the datasets of deleted
+        records are only updated by the signal queue, see `BDSignalProcessor`, or by the
+        weekly rebuild
+        """
+
+        def get_ids(queryset, *fields: str) -> set:
+            queryset = queryset.filter(updated_at__gte=start_date)
+            if end_date:
+                queryset = queryset.filter(updated_at__lte=end_date)
+            ids = set()
+            for values in queryset.values_list(*fields):
+                ids.update(pk for pk in values if pk)
+            return ids
+
+        coverage_fields = [
+            "table__dataset_id",
+            "raw_data_source__dataset_id",
+            "information_request__dataset_id",
+            "column__table__dataset_id",
+        ]
+        return set().union(
+            get_ids(Dataset.objects, "pk"),
+            get_ids(Table.objects, "dataset_id"),
+            get_ids(Column.objects, "table__dataset_id"),
+            get_ids(RawDataSource.objects, "dataset_id"),
+            get_ids(InformationRequest.objects, "dataset_id"),
+            get_ids(Coverage.objects, *coverage_fields),
+            get_ids(DateTimeRange.objects, *[f"coverage__{f}" for f in coverage_fields]),
+            get_ids(Organization.objects, "datasets__id"),
+            get_ids(Tag.objects, "datasets__id"),
+            get_ids(Theme.objects, "datasets__id"),
+        )
+
+    def get_stale_dataset_ids(self, using=None) -> set:
+        """Get the datasets without a search document, or the temporal ranges added to it
+        later, which `prepare` computes on every update until they're refreshed"""
+        queryset = self.index_queryset(using=using).filter(
+            Q(search_document__isnull=True) | Q(search_document__temporal_ranges={})
+        )
+        return set(queryset.values_list("pk", flat=True))
+
+    def build_queryset(self, using=None, start_date=None, end_date=None):
+        if not start_date:
+            return super().build_queryset(using=using, end_date=end_date)
+
+        dataset_ids = self.get_changed_dataset_ids(start_date, end_date)
+        return self.index_queryset(using=using).filter(pk__in=dataset_ids)
+
     def read_queryset(self, using=None):
-        return self.get_model().objects.exclude(status__slug__in=["under_review", "excluded"])
+        return self.get_model().objects.public()
 
     def index_queryset(self, using=None):
-        return self.get_model().objects.exclude(status__slug__in=["under_review", "excluded"])
+        return (
+            self.get_model()
+            .objects.public()
+            .select_related("search_document")
+            .prefetch_related(
+                "organizations",
+                "tags",
+                "themes",
+                "tables__observation_levels__entity",
+            )
+        )
 
     def load_all_queryset(self, using=None):
-        return self.get_model().objects.exclude(status__slug__in=["under_review", "excluded"])
+        return self.get_model().objects.public()
+
+    def prepare_suggest_pt(self, obj):
+        return self.prepare_suggest(obj, "pt")
+
+    def prepare_suggest_en(self, obj):
+        return self.prepare_suggest(obj, "en")
+
+    def prepare_suggest_es(self, obj):
+        return self.prepare_suggest(obj, "es")
+
+    def prepare_suggest(self, obj, locale: str) -> list[str]:
+        """
+        Get the names of the dataset and its organizations in the locale,
+        from each of their words on, so that any word of the name completes it
+        """
+        names = [getattr(obj, f"name_{locale}") or obj.name]
+        for org in obj.organizations.all():
+            names.append(getattr(org, f"name_{locale}") or org.name)
+
+        inputs = []
+        for name in filter(None, names):
+            words = name.split()
+            inputs.extend(" ".join(words[i:]) for i in range(min(len(words), 10)))
+        return list(dict.fromkeys(inputs))
+
+    def prepare_temporal_range(self, obj):
+        return obj.search_document.temporal_ranges.get("all", [])
+
+    def prepare_temporal_range_open(self, obj):
+        return obj.search_document.temporal_ranges.get("open", [])
+
+    def prepare_temporal_range_closed(self, obj):
+        return obj.search_document.temporal_ranges.get("closed", [])
 
     def prepare_organization_picture(self, obj):
         """
@@ -344,25 +391,199 @@ class DatasetIndex(indexes.SearchIndex, indexes.Indexable):
         }
         return mapping
 
-    def prepare(self, obj):
-        data = super().prepare(obj)
-
-        organization_fields = [
-            "organization_id",
-            "organization_slug",
-            "organization_name",
-            "organization_name_pt",
-            "organization_name_en",
-            "organization_name_es",
-            "organization_picture",
-            "organization_website",
-            "organization_description_pt",
-            "organization_description_en",
-            "organization_description_es",
-        ]
+    def set_search_document(self, obj):
+        # Datasets not refreshed by `update_search_index` yet lack a search document, or the
+        # temporal ranges added to it later, so its values are computed without saving them
+        if not hasattr(obj, "search_document") or not obj.search_document.temporal_ranges:
+            obj.search_document = DatasetSearchDocument(
+                dataset=obj, **DatasetSearchDocument.get_values(obj)
+            )
 
-        for field in organization_fields:
+    def as_lists(self, data: dict) -> dict:
+        """Store the organization fields as lists, even with a single organization"""
+        for field in self.organization_fields:
             if field in data and not isinstance(data[field], (list, tuple)):
                 data[field] = [data[field]] if data[field] is not None else []
+        return data
+
+    def prepare(self, obj):
+        self.set_search_document(obj)
+        data = self.as_lists(super().prepare(obj))
+
+        for locale in LOCALES:
+            data[f"result_{locale}"] = prerender_search_result(data, locale)
 
         return data
+
+    def prepare_result(self, obj, locale: str) -> dict:
+        """Prerender the search result of a dataset in the locale
+
+        Only the fields read by the result are prepared, skipping the text, the
+        suggestions and the date ranges, and the results in the other locales
+        """
+        self.set_search_document(obj)
+        data = {DJANGO_ID: str(obj.pk)}
+        for field_name, field in self.fields.items():
+            if field_name.startswith(self.unrendered_fields):
+                continue
+            data[field.index_fieldname] = field.prepare(obj)
+            if prepare := getattr(self, f"prepare_{field_name}", None):
+                data[field.index_fieldname] = prepare(obj)
+        return prerender_search_result(self.as_lists(data), locale)
+
+
+class ColumnIndex(indexes.SearchIndex, indexes.Indexable):
+    """Columns of the published tables, to find the tables with a given column
+
+    Columns are updated with their datasets, see `update_datasets`, which also removes
+    the columns of the tables that aren't published anymore
+    """
+
+    text = indexes.CharField(document=True, use_template=True)
+
+    column_id = StoredCharField(
+        model_attr="pk",
+    )
+    column_name = StoredCharField(
+        model_attr="name",
+    )
+    column_description_pt = StoredCharField(
+        model_attr="description_pt",
+        null=True,
+    )
+    column_description_en = StoredCharField(
+        model_attr="description_en",
+        null=True,
+    )
+    column_description_es = StoredCharField(
+        model_attr="description_es",
+        null=True,
+    )
+    column_bigquery_type = indexes.CharField(
+        model_attr="bigquery_type__name",
+        null=True,
+        faceted=True,
+        indexed=False,
+    )
+    column_directory_primary_key = StoredCharField(
+        null=True,
+    )
+    column_is_closed = indexes.BooleanField(
+        model_attr="is_closed",
+        indexed=False,
+    )
+
+    table_id = StoredCharField(
+        model_attr="table_id",
+    )
+    table_slug = StoredCharField(
+        model_attr="table__slug",
+    )
+    table_name_pt = StoredCharField(
+        model_attr="table__name_pt",
+        null=True,
+    )
+    table_name_en = StoredCharField(
+        model_attr="table__name_en",
+        null=True,
+    )
+    table_name_es = StoredCharField(
+        model_attr="table__name_es",
+        null=True,
+    )
+
+    column_dataset_id = indexes.CharField(
+        model_attr="table__dataset_id",
+        faceted=True,
+        indexed=False,
+    )
+    dataset_slug = StoredCharField(
+        model_attr="table__dataset__slug",
+    )
+    dataset_name_pt = StoredCharField(
+        model_attr="table__dataset__name_pt",
+        null=True,
+    )
+    dataset_name_en = StoredCharField(
+        model_attr="table__dataset__name_en",
+        null=True,
+    )
+    dataset_name_es = StoredCharField(
+        model_attr="table__dataset__name_es",
+        null=True,
+    )
+
+    def get_model(self):
+        return Column
+
+    def read_queryset(self, using=None):
+        return self.get_model().objects.filter(
+            table__is_public=True, table__dataset__is_public=True
+        )
+
+    def index_queryset(self, using=None):
+        return (
+            self.get_model()
+            .objects.filter(table__is_public=True, table__dataset__is_public=True)
+            .select_related(
+                "table__dataset",
+                "bigquery_type",
+                "directory_primary_key__table__dataset",
+            )
+        )
+
+    def load_all_queryset(self, using=None):
+        return self.read_queryset(using=using)
+
+    def prepare_column_directory_primary_key(self, obj):
+        if obj.directory_primary_key:
+            return str(obj.directory_primary_key)
+        return None
+
+    def update_datasets(self, backend, dataset_ids, using=None, batchsize=1000, commit=True):
+        """Index the columns of the datasets and remove the ones that aren't indexed anymore
+
+        Datasets are updated in batches of about `batchsize` columns, so that the columns
+        kept by each removal stay far below the `index.max_terms_count` of Elasticsearch
+
+        Returns:
+            The number of indexed columns
+        """
+        if not dataset_ids:
+            return 0
+
+        dataset_ids = sorted({str(pk) for pk in dataset_ids})
+        queryset = self.index_queryset(using=using).filter(table__dataset_id__in=dataset_ids)
+        pks_by_dataset = defaultdict(list)
+        for pk, dataset_id in queryset.order_by("pk").values_list("pk", "table__dataset_id"):
+            pks_by_dataset[str(dataset_id)].append(pk)
+
+        n_columns = 0
+        batch_dataset_ids, batch_pks = [], []
+        for dataset_id in dataset_ids:
+            pks = pks_by_dataset[dataset_id]
+            if batch_dataset_ids and len(batch_pks) + len(pks) > batchsize:
+                n_columns += self.update_batch(
+                    backend, queryset, batch_dataset_ids, batch_pks, batchsize, commit
+                )
+                batch_dataset_ids, batch_pks = [], []
+            batch_dataset_ids.append(dataset_id)
+            batch_pks.extend(pks)
+        n_columns += self.update_batch(
+            backend, queryset, batch_dataset_ids, batch_pks, batchsize, commit
+        )
+        return n_columns
+
+    def update_batch(self, backend, queryset, dataset_ids, pks, batchsize, commit):
+        """Index the columns of a batch of datasets and remove their other columns"""
+        for start in range(0, len(pks), batchsize):
+            backend.update(self, queryset.filter(pk__in=pks[start : start + batchsize]), False)
+
+        query = {
+            "bool": {
+                "filter": [{"terms": {"column_dataset_id": dataset_ids}}],
+                "must_not": [{"terms": {DJANGO_ID: [str(pk) for pk in pks]}}],
+            }
+        }
+        backend.remove_by_query(query, commit=commit)
+        return len(pks)
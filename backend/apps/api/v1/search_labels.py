@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Process local cache of the localized names of the search vocabularies
+
+Themes, organizations, tags, entities and areas are small and rarely change, so their
+names are loaded once per process and locale. Every save or delete bumps a generation
+counter in Redis, which makes all processes reload them on their next lookup.
+"""
+
+from threading import Lock
+from unicodedata import combining, normalize
+
+from django.db.models import Model
+from loguru import logger
+
+from backend.custom.client import get_redis_client
+
+GENERATION_KEY = "search:labels:generation:{model}"
+
+Labels = dict[str, dict]
+
+_cache: dict[tuple[str, str], tuple[int, Labels]] = {}
+_lock = Lock()
+
+
+def get_generation(model: type[Model]) -> int | None:
+    """Get the generation of the labels of a model, if available"""
+    try:
+        generation = get_redis_client().get(GENERATION_KEY.format(model=model._meta.label_lower))
+        return int(generation or 0)
+    except Exception as error:
+        logger.warning(error)
+        return None
+
+
+def load_labels(model: type[Model], locale: str) -> Labels:
+    """Load the localized names of all records of a model from the database"""
+    labels = {}
+    for record in model.objects.values("slug", "name", f"name_{locale}"):
+        slug = record["slug"]
+        default_name = record["name"]
+        localized_name = record[f"name_{locale}"]
+
+        labels[slug] = {
+            "name": localized_name or default_name or slug,
+            "fallback": localized_name is None,
+        }
+    return labels
+
+
+def get_labels(model: type[Model], locale: str) -> Labels:
+    """Get the localized names of a model by slug
+
+    Returns:
+        A dict from slug to `{"name": ..., "fallback": ...}`, where `fallback`
+        indicates that the name isn't translated to the locale
+    """
+    generation = get_generation(model)
+    if generation is None:
+        return load_labels(model, locale)
+
+    key = (model._meta.label_lower, locale)
+    cached = _cache.get(key)
+    if cached and cached[0] == generation:
+        return cached[1]
+
+    with _lock:
+        labels = load_labels(model, locale)
+        _cache[key] = (generation, labels)
+    return labels
+
+
+def get_label(labels: Labels, slug: str) -> dict:
+    """Get the localized name of a slug, falling back to the slug itself"""
+    return labels.get(slug, {"name": slug, "fallback": True})
+
+
+def fold(text: str) -> str:
+    """Lowercase text without accents"""
+    return "".join(char for char in normalize("NFKD", text.lower()) if not combining(char))
+
+
+def match_labels(labels: Labels, prefix: str) -> list[str]:
+    """Get the slugs whose slug or name, from any of its words on, starts with the prefix
+
+    For example, `gerais` and `minas ge` both match `Minas Gerais`
+    """
+    prefix = " ".join(fold(prefix).split())
+    slugs = []
+    for slug, label in labels.items():
+        words = fold(label["name"]).split()
+        candidates = [slug] + [" ".join(words[i:]) for i in range(len(words))]
+        if any(candidate.startswith(prefix) for candidate in candidates):
+            slugs.append(slug)
+    return sorted(slugs)
+
+
+def invalidate_labels(model: type[Model]):
+    """Make all processes reload the labels of a model"""
+    for key in [key for key in _cache if key[0] == model._meta.label_lower]:
+        _cache.pop(key, None)
+    try:
+        get_redis_client().incr(GENERATION_KEY.format(model=model._meta.label_lower))
+    except Exception as error:
+        logger.error(error)
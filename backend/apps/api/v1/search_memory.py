@@ -0,0 +1,392 @@
+# -*- coding: utf-8 -*-
+"""
+In process search engine, for tests and benchmarks without Elasticsearch
+
+Documents are kept in memory, as prepared by the search indexes, and queries are
+evaluated in Python. It supports what the search views use: text filters, narrow
+queries, filter clauses, facets, composite facets, ordering, `search_after`,
+source fields and completion, besides the removal by query of the index updates.
+Relevance is a simple count of matched terms.
+
+Usage:
+
+    with use_memory_backend() as backend:
+        backend.update(index, datasets)
+        client.get("/search/")
+"""
+
+import re
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import cmp_to_key
+
+from haystack import connections
+from haystack.backends import BaseEngine, BaseSearchBackend, BaseSearchQuery
+from haystack.constants import DJANGO_CT, DJANGO_ID, ID
+from haystack.exceptions import SkipDocument
+from haystack.models import SearchResult
+from haystack.utils import get_identifier, get_model_ct
+
+from backend.apps.api.v1.search_cache import bump_generation
+from backend.apps.api.v1.search_engines import ExtendedQueryMixin
+from backend.apps.api.v1.search_labels import fold
+
+NARROW_QUERY = re.compile(r'(?P<field>[\w.]+):"(?P<value>(?:[^"\\]|\\.)*)"')
+
+# Documents by index name, shared by all backends of the process
+_documents: dict[str, dict[str, dict]] = defaultdict(dict)
+
+
+def tokenize(text) -> list[str]:
+    return re.findall(r"\w+", fold(str(text or "")))
+
+
+def as_list(value) -> list:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+def as_term(value) -> str:
+    """Compare values as Elasticsearch terms"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def as_sort_value(value):
+    """Sort values as Elasticsearch returns them"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    if isinstance(value, date):
+        return int(datetime(value.year, value.month, value.day).timestamp() * 1000)
+    return value
+
+
+def as_range_value(value):
+    """Compare dates as datetimes, whatever their format"""
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def compare(a: list, b: list, descending: list[bool]) -> int:
+    """Compare sort values, with missing values last"""
+    for x, y, desc in zip(a, b, descending):
+        if x == y:
+            continue
+        if x is None:
+            return 1
+        if y is None:
+            return -1
+        result = -1 if x < y else 1
+        return -result if desc else result
+    return 0
+
+
+class MemorySearchBackend(BaseSearchBackend):
+    """Search backend that keeps the prepared documents in memory"""
+
+    def __init__(self, connection_alias, **connection_options):
+        super().__init__(connection_alias, **connection_options)
+        self.index_name = connection_options.get("INDEX_NAME", connection_alias)
+
+    @property
+    def documents(self) -> dict[str, dict]:
+        return _documents[self.index_name]
+
+    def update(self, index, iterable, commit=True):
+        documents = []
+        for obj in iterable:
+            try:
+                documents.append(index.full_prepare(obj))
+            except SkipDocument:
+                continue
+        self.index_documents(documents)
+
+    def index_documents(self, documents: list[dict]):
+        """Index prepared documents, as returned by `SearchIndex.full_prepare`"""
+        for document in documents:
+            self.documents[document[ID]] = document
+        bump_generation()
+
+    def remove(self, obj_or_string, commit=True):
+        self.documents.pop(get_identifier(obj_or_string), None)
+        bump_generation()
+
+    def remove_by_query(self, query: dict, commit=True):
+        for key, document in list(self.documents.items()):
+            if self.match_clause(document, query):
+                del self.documents[key]
+        bump_generation()
+
+    def clear(self, models=None, commit=True):
+        if models is None:
+            self.documents.clear()
+        else:
+            model_cts = {get_model_ct(model) for model in models}
+            for key, document in list(self.documents.items()):
+                if document[DJANGO_CT] in model_cts:
+                    del self.documents[key]
+        bump_generation()
+
+    def search(self, query_filter, **kwargs):
+        documents = self.documents.values()
+        if models := kwargs.get("models"):
+            model_cts = {get_model_ct(model) for model in models}
+            documents = [doc for doc in documents if doc[DJANGO_CT] in model_cts]
+
+        hits = []
+        for document in documents:
+            score = self.match(document, query_filter)
+            if score is None:
+                continue
+            if not all(self.match_narrow(document, q) for q in kwargs.get("narrow_queries", [])):
+                continue
+            if not all(self.match_clause(document, c) for c in kwargs.get("filter_clauses", [])):
+                continue
+            hits.append((score, document))
+
+        facets = self.get_facets(
+            [document for _, document in hits],
+            kwargs.get("facets") or {},
+            kwargs.get("composite_facets") or {},
+        )
+
+        sort_by = kwargs.get("sort_by") or ["-_score"]
+        hits = self.sort(hits, sort_by)
+        if search_after := kwargs.get("search_after"):
+            descending = [field.startswith("-") for field in sort_by]
+            hits = [hit for hit in hits if compare(hit[2], search_after, descending) > 0]
+
+        start = kwargs.get("start_offset", 0)
+        end = kwargs.get("end_offset")
+        if "size" in kwargs:
+            end = start + kwargs["size"]
+        page = hits[start:end]
+
+        return {
+            "results": [
+                self.as_result(document, score, sort_values, kwargs)
+                for score, document, sort_values in page
+            ],
+            "hits": len(hits),
+            "facets": facets,
+        }
+
+    def complete(
+        self, field_name: str, prefix: str, size: int = 10, fields: list[str] = None
+    ) -> list[dict]:
+        """Get the documents with a completion input starting with the prefix"""
+        prefix = " ".join(tokenize(prefix))
+        documents = []
+        for document in self.documents.values():
+            inputs = [" ".join(tokenize(value)) for value in as_list(document.get(field_name))]
+            if any(value.startswith(prefix) for value in inputs):
+                documents.append(self.get_source(document, fields))
+                if len(documents) >= size:
+                    break
+        return documents
+
+    def match(self, document: dict, node) -> float | None:
+        """Evaluate a query tree, returning the score of a match or None"""
+        if not node.children:
+            return 1.0
+
+        scores = []
+        for child in node.children:
+            if isinstance(child, tuple):
+                field, filter_type = node.split_expression(child[0])
+                scores.append(self.match_field(document, field, filter_type, child[1]))
+            else:
+                scores.append(self.match(document, child))
+
+        matched = [score for score in scores if score is not None]
+        if node.connector == "AND":
+            score = sum(matched) if len(matched) == len(scores) else None
+        else:
+            score = sum(matched) if matched else None
+
+        if node.negated:
+            return 1.0 if score is None else None
+        return score
+
+    def match_field(self, document: dict, field: str, filter_type: str, value) -> float | None:
+        value = getattr(value, "query_string", value)
+        field = field.split(".")[0]
+
+        content_field = connections[self.connection_alias].get_unified_index().document_field
+        if field in ("content", content_field):
+            words = tokenize(document.get(content_field))
+            score = 0.0
+            for term in str(value).split():
+                negated = term.startswith("-") and len(term) > 1
+                tokens = tokenize(term)
+                found = all(any(word.startswith(t) for word in words) for t in tokens)
+                if found == negated:
+                    return None
+                score += 0 if negated else 1
+            return score or 1.0
+
+        values = as_list(document.get(field))
+        if filter_type == "in":
+            expected = {as_term(item) for item in value}
+            return 1.0 if any(as_term(item) in expected for item in values) else None
+        if filter_type in ("gt", "gte", "lt", "lte"):
+            operators = {
+                "gt": lambda a: a > value,
+                "gte": lambda a: a >= value,
+                "lt": lambda a: a < value,
+                "lte": lambda a: a <= value,
+            }
+            return 1.0 if any(operators[filter_type](item) for item in values) else None
+        if filter_type == "startswith":
+            return 1.0 if any(str(item).startswith(str(value)) for item in values) else None
+        return 1.0 if any(as_term(item) == as_term(value) for item in values) else None
+
+    def match_narrow(self, document: dict, query: str) -> bool:
+        """Evaluate a narrow query, as `field:"value"` clauses joined by AND"""
+        for clause in query.split(" AND "):
+            match = NARROW_QUERY.fullmatch(clause.strip().strip("()"))
+            if not match:
+                raise NotImplementedError(f"Unsupported narrow query: {query}")
+            value = re.sub(r"\\(.)", r"\1", match["value"])
+            if value not in {as_term(item) for item in as_list(document.get(match["field"]))}:
+                return False
+        return True
+
+    def match_clause(self, document: dict, clause: dict) -> bool:
+        """Evaluate an Elasticsearch clause in filter context"""
+        ((clause_type, condition),) = clause.items()
+        if clause_type == "bool":
+            return all(self.match_clause(document, c) for c in condition.get("filter", [])) and (
+                not any(self.match_clause(document, c) for c in condition.get("must_not", []))
+            )
+        ((field, value),) = condition.items()
+
+        if clause_type == "range":
+            # Ranges of range fields match if they intersect, as with `relation: intersects`
+            since = as_range_value(value.get("gte"))
+            until = as_range_value(value.get("lte"))
+            for item in as_list(document.get(field)):
+                low, high = (
+                    (item.get("gte"), item.get("lte")) if isinstance(item, dict) else (item, item)
+                )
+                if (until is None or low is None or as_range_value(low) <= until) and (
+                    since is None or high is None or as_range_value(high) >= since
+                ):
+                    return True
+            return False
+
+        values = {as_term(item) for item in as_list(document.get(field))}
+
+        if clause_type in ("match", "term"):
+            return as_term(value) in values
+        if clause_type == "terms":
+            return bool(values & {as_term(item) for item in value})
+        raise NotImplementedError(f"Unsupported filter clause: {clause}")
+
+    def get_facets(self, documents: list[dict], facets: dict, composite_facets: dict) -> dict:
+        results = {"fields": {}, "dates": {}, "queries": {}}
+
+        for field, options in facets.items():
+            counts = defaultdict(int)
+            for document in documents:
+                for value in set(as_list(document.get(field))):
+                    counts[value] += 1
+            buckets = sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+            results["fields"][field] = buckets[: options.get("size", 10)]
+
+        for field, options in composite_facets.items():
+            counts = defaultdict(int)
+            for document in documents:
+                for value in set(as_list(document.get(field))):
+                    counts[str(value)] += 1
+            if options["include"] is not None:
+                counts = {key: counts[key] for key in options["include"] if key in counts}
+            after = options["after"]
+            keys = sorted(key for key in counts if after is None or key > after)
+            values = [(key, counts[key]) for key in keys[: options["size"]]]
+            results.setdefault("composite", {})[field] = {
+                "values": values,
+                "after": values[-1][0] if values else None,
+            }
+
+        return results
+
+    def sort(self, hits: list[tuple], sort_by: list[str]) -> list[tuple]:
+        """Sort the hits, returning them with their sort values"""
+        descending = [field.startswith("-") for field in sort_by]
+
+        def get_sort_values(score: float, document: dict) -> list:
+            sort_values = []
+            for field, desc in zip(sort_by, descending):
+                field = field.lstrip("-")
+                if field == "_score":
+                    sort_values.append(score)
+                    continue
+                values = [as_sort_value(v) for v in as_list(document.get(field)) if v is not None]
+                sort_values.append((max if desc else min)(values) if values else None)
+            return sort_values
+
+        hits = [(score, document, get_sort_values(score, document)) for score, document in hits]
+        return sorted(hits, key=cmp_to_key(lambda a, b: compare(a[2], b[2], descending)))
+
+    def get_source(self, document: dict, fields: list[str] = None) -> dict:
+        if not fields:
+            return dict(document)
+        return {key: value for key, value in document.items() if key in fields}
+
+    def as_result(self, document: dict, score: float, sort_values: list, kwargs: dict):
+        app_label, model_name = document[DJANGO_CT].split(".")
+        source = self.get_source(document, kwargs.get("source_fields"))
+        for key in (ID, DJANGO_CT, DJANGO_ID):
+            source.pop(key, None)
+
+        result_class = kwargs.get("result_class") or SearchResult
+        result = result_class(app_label, model_name, document[DJANGO_ID], score, **source)
+        result.sort_values = sort_values if kwargs.get("sort_by") else None
+        return result
+
+
+class MemorySearchQuery(ExtendedQueryMixin, BaseSearchQuery):
+    """Search query that is evaluated by the memory backend, instead of a query string"""
+
+    def build_query(self):
+        return self.query_filter
+
+    def add_field_facet(self, field, **options):
+        self.facets[field] = options.copy()
+
+
+class MemorySearchEngine(BaseEngine):
+    backend = MemorySearchBackend
+    query = MemorySearchQuery
+
+
+@contextmanager
+def use_memory_backend(using: str = "default"):
+    """Replace a search connection with an empty memory backend"""
+    engine = f"{MemorySearchEngine.__module__}.{MemorySearchEngine.__name__}"
+    original_options = connections.connections_info.get(using)
+    connections.connections_info[using] = {"ENGINE": engine, "INDEX_NAME": f"memory_{using}"}
+    try:
+        backend = connections.reload(using).get_backend()
+        yield backend
+        backend.clear()
+    finally:
+        if original_options is None:
+            del connections.connections_info[using]
+        else:
+            connections.connections_info[using] = original_options
+        connections.reload(using)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Per request profiling of the search views
+
+Staff members can ask for a timing breakdown of a search request, with the
+`X-Search-Profile` header or the `profile` query parameter. Profiled requests skip the
+response cache and return the breakdown in the `Server-Timing` header and in the
+`profile` key of the response. The value `es` also returns the Elasticsearch profile
+of each search.
+
+The profile of the current request is kept in a context variable, so the search
+backend records its calls without having the request at hand.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from json import loads
+from time import perf_counter
+from typing import Callable
+
+from django.db import connection
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from graphql_jwt.backends import JSONWebTokenBackend
+from graphql_jwt.exceptions import JSONWebTokenError
+
+PROFILE_HEADER = "X-Search-Profile"
+PROFILE_PARAM = "profile"
+
+_profile: ContextVar["Profile | None"] = ContextVar("search_profile", default=None)
+
+
+class Profile:
+    """Timings of the steps of a request, in milliseconds, in the order they started"""
+
+    def __init__(self, es_profile: bool = False):
+        self.es_profile = es_profile
+        self.started_at = perf_counter()
+        self.duration = None
+        self.timings: list[dict] = []
+
+    @contextmanager
+    def measure(self, name: str, **details):
+        """Measure a step, yielding its details to be completed by the caller"""
+        timing = {"name": name, **details}
+        self.timings.append(timing)
+        started_at = perf_counter()
+        try:
+            yield timing
+        finally:
+            timing["duration"] = round((perf_counter() - started_at) * 1000, 3)
+
+    def record_query(self, execute, sql, params, many, context):
+        """Measure the queries of the database connection, see `execute_wrapper`"""
+        with self.measure("sql", sql=sql):
+            return execute(sql, params, many, context)
+
+    def finish(self):
+        self.duration = round((perf_counter() - self.started_at) * 1000, 3)
+
+    def get_summary(self) -> dict[str, dict]:
+        summary = defaultdict(lambda: {"count": 0, "duration": 0.0})
+        for timing in self.timings:
+            summary[timing["name"]]["count"] += 1
+            summary[timing["name"]]["duration"] += timing["duration"]
+        return dict(summary)
+
+    def as_server_timing(self) -> str:
+        metrics = [
+            f'{name};dur={stats["duration"]:.1f};desc="{stats["count"]}x"'
+            for name, stats in self.get_summary().items()
+        ]
+        return ", ".join([*metrics, f"total;dur={self.duration:.1f}"])
+
+    def as_dict(self) -> dict:
+        return {
+            "duration": self.duration,
+            "summary": self.get_summary(),
+            "timings": self.timings,
+        }
+
+
+def get_profile() -> Profile | None:
+    """Get the profile of the current request, if it's being profiled"""
+    return _profile.get()
+
+
+@contextmanager
+def measure(name: str, **details):
+    """Measure a step of the current request, if it's being profiled"""
+    profile = get_profile()
+    if profile is None:
+        yield {}
+        return
+    with profile.measure(name, **details) as timing:
+        yield timing
+
+
+def measured(name: str):
+    """Measure every call of the decorated function, see `measure`"""
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with measure(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def get_profile_option(request: HttpRequest) -> str | None:
+    """Get the requested profile option, only for staff members
+
+    Besides the session, the user is authenticated by the same token of the graphql api
+    """
+    option = request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM)
+    if not option or option == "0":
+        return None
+
+    user = request.user
+    if not user.is_authenticated:
+        try:
+            user = JSONWebTokenBackend().authenticate(request=request)
+        except JSONWebTokenError:
+            user = None
+    if user is None or not user.is_staff:
+        return None
+    return option
+
+
+def get_profiled_response(
+    option: str,
+    get_response: Callable[[], HttpResponse],
+) -> HttpResponse:
+    """Get the response while profiling it, adding the profile to it"""
+    profile = Profile(es_profile=option == "es")
+    token = _profile.set(profile)
+    try:
+        with connection.execute_wrapper(profile.record_query):
+            response = get_response()
+    finally:
+        _profile.reset(token)
+    profile.finish()
+
+    content = {**loads(response.content), "profile": profile.as_dict()}
+    response = JsonResponse(content, status=response.status_code)
+    response["Server-Timing"] = profile.as_server_timing()
+    return response
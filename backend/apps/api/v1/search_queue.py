@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Redis backed queue of datasets waiting to be updated in the search index
+
+Every change of a dataset, or of one of its resources, adds the dataset to a set,
+so that a burst of changes (e.g. an admin save with many inline coverages) updates
+each dataset only once, after a debounce window.
+"""
+
+from typing import Iterable
+
+from django.conf import settings
+
+from backend.custom.client import get_redis_client
+
+QUEUE_KEY = "search:queue:datasets"
+LOCK_KEY = "search:queue:lock"
+EVENTS_KEY = "search:queue:events"
+TOTAL_EVENTS_KEY = "search:queue:total_events"
+TOTAL_UPDATES_KEY = "search:queue:total_updates"
+
+
+def enqueue_datasets(dataset_ids: Iterable[str], n_events: int = 1) -> bool:
+    """Add datasets to the queue
+
+    Args:
+        dataset_ids: primary keys of the datasets
+        n_events: number of changes that triggered the update
+
+    Returns:
+        True if the queue wasn't waiting for the debounce window yet,
+        meaning that the caller must schedule its update
+    """
+    dataset_ids = [str(pk) for pk in dataset_ids]
+    if not dataset_ids:
+        return False
+
+    pipeline = get_redis_client().pipeline()
+    pipeline.sadd(QUEUE_KEY, *dataset_ids)
+    pipeline.incrby(EVENTS_KEY, n_events)
+    pipeline.incrby(TOTAL_EVENTS_KEY, n_events)
+    pipeline.set(LOCK_KEY, 1, nx=True, ex=settings.SEARCH_INDEX_DEBOUNCE_SECONDS * 6)
+    *_, scheduled = pipeline.execute()
+    return bool(scheduled)
+
+
+def dequeue_datasets() -> tuple[list[str], int]:
+    """Pop all datasets from the queue
+
+    Returns:
+        The primary keys of the datasets and the number of changes collapsed into them
+    """
+    pipeline = get_redis_client().pipeline()
+    pipeline.delete(LOCK_KEY)
+    pipeline.smembers(QUEUE_KEY)
+    pipeline.delete(QUEUE_KEY)
+    pipeline.getset(EVENTS_KEY, 0)
+    _, dataset_ids, _, n_events = pipeline.execute()
+
+    dataset_ids = [pk.decode() if isinstance(pk, bytes) else pk for pk in dataset_ids]
+    return dataset_ids, int(n_events or 0)
+
+
+def count_updates(n_datasets: int):
+    """Count datasets updated from the queue"""
+    get_redis_client().incrby(TOTAL_UPDATES_KEY, n_datasets)
+
+
+def get_queue_stats() -> dict[str, int]:
+    """Get the number of queued datasets and of collapsed changes"""
+    pipeline = get_redis_client().pipeline()
+    pipeline.scard(QUEUE_KEY)
+    pipeline.get(EVENTS_KEY)
+    pipeline.get(TOTAL_EVENTS_KEY)
+    pipeline.get(TOTAL_UPDATES_KEY)
+    n_queued, n_events, total_events, total_updates = pipeline.execute()
+
+    total_events = int(total_events or 0)
+    total_updates = int(total_updates or 0)
+    return {
+        "queued_datasets": int(n_queued or 0),
+        "queued_events": int(n_events or 0),
+        "total_events": total_events,
+        "total_updates": total_updates,
+        "total_collapsed_events": max(total_events - total_updates, 0),
+    }
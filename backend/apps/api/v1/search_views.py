@@ -1,15 +1,33 @@
 # -*- coding: utf-8 -*-
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
+from calendar import monthrange
+from datetime import date, datetime
+from json import dumps, loads
 from typing import Any
 
-from django.core.files.storage import default_storage as storage
+from django.core.serializers.json import DjangoJSONEncoder
 from django.http import JsonResponse
 from django.views import View
+from haystack import connections
 from haystack.forms import FacetedSearchForm
 from haystack.generic_views import FacetedSearchView
 from haystack.models import SearchResult
 from haystack.query import SearchQuerySet
 
-from backend.apps.api.v1.models import Area, Entity, Organization, Tag, Theme
+from backend.apps.api.v1.area_tree import get_area_tree
+from backend.apps.api.v1.models import Area, Column, Dataset, Entity, Organization, Tag, Theme
+from backend.apps.api.v1.search_cache import get_cached_response
+from backend.apps.api.v1.search_labels import get_label, get_labels, match_labels
+from backend.apps.api.v1.search_profile import (
+    get_profile_option,
+    get_profiled_response,
+    measure,
+    measured,
+)
+from backend.custom.storage import get_file_urls
+
+LOCALES = ["pt", "en", "es"]
 
 
 class DatasetSearchForm(FacetedSearchForm):
@@ -22,6 +40,9 @@ class DatasetSearchForm(FacetedSearchForm):
         self.spatial_coverage = kwargs.pop("spatial_coverage", None)
         self.tag = kwargs.pop("tag", None) or []
         self.observation_level = kwargs.pop("observation_level", None) or []
+        self.temporal_start = kwargs.pop("temporal_start", None)
+        self.temporal_end = kwargs.pop("temporal_end", None)
+        self.temporal_type = kwargs.pop("temporal_type", None)
         self.locale = kwargs.pop("locale", "pt")
         super().__init__(*args, **kwargs)
 
@@ -29,8 +50,8 @@ class DatasetSearchForm(FacetedSearchForm):
         if not self.is_valid():
             return self.no_query_found()
 
-        # Start with all results
-        sqs = self.searchqueryset.all()
+        # Start with all datasets, as columns are indexed too
+        sqs = self.searchqueryset.models(Dataset)
 
         # Text search if provided
         if q := self.cleaned_data.get("q"):
@@ -55,39 +76,42 @@ class DatasetSearchForm(FacetedSearchForm):
                 sqs = sqs.narrow(f'{facet_key}:"{sqs.query.clean(qp_value)}"')
 
         if self.spatial_coverage:
-            # Build queries for all coverage values
-            coverage_queries = []
-            for coverage_list in self.spatial_coverage:
-                # Split the comma-separated values
-                coverages = coverage_list.split(",")
-                if "world" in coverages:
-                    # If world is in the list, only look for world coverage
-                    coverage_queries = ['spatial_coverage_exact:"world"']
-                    break
-                else:
-                    # Regular case: handle hierarchical patterns for each coverage
-                    for coverage in coverages:
-                        parts = coverage.split("_")
-                        coverage_patterns = ["_".join(parts[:i]) for i in range(1, len(parts))]
-                        coverage_patterns.append(coverage)  # Add the full coverage too
-
-                        # Build OR condition for the selected area and its ancestors
-                        # (broader coverage that contains it). World is intentionally
-                        # excluded: global datasets are counted only under the
-                        # International bucket, not under every lower-level area.
-                        patterns = " OR ".join(
-                            f'spatial_coverage_exact:"{pattern}"' for pattern in coverage_patterns
-                        )
-                        coverage_queries.append(f"({patterns})")
-
-            # Combine all coverage queries with AND
-            query = f"_exists_:spatial_coverage_exact AND {' AND '.join(coverage_queries)}"
-            sqs = sqs.raw_search(query)
+            areas = [area for value in self.spatial_coverage for area in value.split(",") if area]
+            # If world is selected, only look for world coverage
+            if "world" in areas:
+                areas = ["world"]
+            # Each area matches datasets covering it or any of its ancestors, which are
+            # broader coverages that contain it. World is intentionally not an ancestor:
+            # global datasets are counted only under the International bucket.
+            tree = get_area_tree()
+            for area in areas:
+                ancestors = [slug for slug in tree.get_ancestors(area) if slug != "world"]
+                lineage = [area, *ancestors]
+                sqs.query.add_filter_clause({"terms": {"spatial_coverage": lineage}})
+
+        # Datasets whose coverage intersects the period, in open or closed coverages
+        # if the type is given. Invalid dates are ignored, like unknown slugs
+        temporal_range = {}
+        for bound, value, end in [
+            ("gte", self.temporal_start, False),
+            ("lte", self.temporal_end, True),
+        ]:
+            try:
+                if value:
+                    temporal_range[bound] = parse_date_bound(value, end=end)
+            except ValueError:
+                pass
+        if temporal_range:
+            field = "temporal_range"
+            if self.temporal_type in ("open", "closed"):
+                field = f"temporal_range_{self.temporal_type}"
+            temporal_range["relation"] = "intersects"
+            sqs.query.add_filter_clause({"range": {field: temporal_range}})
 
         return sqs
 
     def no_query_found(self):
-        return self.searchqueryset.all()
+        return self.searchqueryset.models(Dataset)
 
 
 class DatasetSearchView(FacetedSearchView):
@@ -124,7 +148,13 @@ class DatasetSearchView(FacetedSearchView):
 
     @property
     def locale(self):
-        return self.request.GET.get("locale", "pt")
+        locale = self.request.GET.get("locale", "pt")
+        return locale if locale in LOCALES else "pt"
+
+    @property
+    def cursor(self) -> str | None:
+        """Opaque cursor of the next page, if paginating by cursor instead of page"""
+        return self.request.GET.get("cursor")
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -134,23 +164,85 @@ class DatasetSearchView(FacetedSearchView):
         kwargs.update({"spatial_coverage": self.request.GET.getlist("spatial_coverage")})
         kwargs.update({"tag": self.request.GET.getlist("tag")})
         kwargs.update({"observation_level": self.request.GET.getlist("observation_level")})
+        kwargs.update({"temporal_start": self.request.GET.get("temporal_start")})
+        kwargs.update({"temporal_end": self.request.GET.get("temporal_end")})
+        kwargs.update({"temporal_type": self.request.GET.get("temporal_type")})
         kwargs.update({"locale": self.locale})
         return kwargs
 
+    def get_cache_params(self) -> dict[str, list[str]]:
+        return {
+            **dict(self.request.GET.lists()),
+            "page": [str(self.page)],
+            "page_size": [str(self.page_size)],
+            "locale": [self.locale],
+        }
+
     def get(self, request, *args, **kwargs):
+        if option := get_profile_option(request):
+            return get_profiled_response(option, self.get_response)
+        return get_cached_response("search", self.get_cache_params(), self.get_response)
+
+    def get_response(self) -> JsonResponse:
         sqs = self.get_form().search()
-        return JsonResponse(
+        sqs = self.get_search_query(sqs)
+        sqs.query.set_source_fields(get_source_fields(self.locale))
+
+        if self.cursor is not None:
+            return self.get_cursor_response(sqs)
+
+        # Execute the search once: hits, total count and facet aggregations
+        # are all read from the same Elasticsearch response
+        start = (self.page - 1) * self.page_size
+        query = sqs.query
+        query.set_limits(start, start + self.page_size)
+        results = query.get_results(track_total_hits=True)
+
+        return render(
             {
                 "page": self.page,
                 "page_size": self.page_size,
-                "count": sqs.count(),
-                "results": self.get_results(sqs),
-                "aggregations": self.get_facets(sqs),
+                "count": query.get_count(),
+                "results": self.get_results(results),
+                "aggregations": self.get_facets(query.get_facet_counts()),
                 "locale": self.locale,
             }
         )
 
-    def get_facets(self, sqs: SearchQuerySet, facet_size: int = 6) -> dict[str, list]:
+    def get_cursor_response(self, sqs: SearchQuerySet) -> JsonResponse:
+        """Get the page after the cursor with `search_after`
+
+        Unlike `from`, it costs the same for every page, so walking the whole catalog
+        doesn't get slower with depth. The dataset id breaks ties of the sort.
+        """
+        kwargs = {"track_total_hits": True}
+        if self.cursor:
+            try:
+                kwargs["search_after"] = decode_cursor(self.cursor)
+            except ValueError:
+                return JsonResponse({"error": "Invalid cursor"}, status=400)
+
+        query = sqs.query
+        query.add_order_by("django_id")
+        query.set_limits(0, self.page_size)
+        results = query.get_results(**kwargs)
+
+        next_cursor = None
+        if len(results) == self.page_size and results[-1].sort_values:
+            next_cursor = encode_cursor(results[-1].sort_values)
+
+        return render(
+            {
+                "page_size": self.page_size,
+                "count": query.get_count(),
+                "next_cursor": next_cursor,
+                "results": self.get_results(results),
+                "aggregations": self.get_facets(query.get_facet_counts()),
+                "locale": self.locale,
+            }
+        )
+
+    def get_search_query(self, sqs: SearchQuerySet, facet_size: int = 6) -> SearchQuerySet:
         # Request facets from Elasticsearch
         sqs = sqs.facet("theme_slug", size=facet_size)
         sqs = sqs.facet("organization_slug", size=facet_size)
@@ -158,9 +250,15 @@ class DatasetSearchView(FacetedSearchView):
         sqs = sqs.facet("entity_slug", size=facet_size)
         sqs = sqs.facet("spatial_coverage", size=facet_size)
 
+        # Sort at Elasticsearch level
+        # NOTE: _score is the relevance score from Elasticsearch
+        return sqs.order_by("-contains_tables", "-_score", "-updated_at")
+
+    @measured("facets")
+    def get_facets(self, facet_counts: dict) -> dict[str, list]:
         # Parse facet counts from Elasticsearch response
         facets = {}
-        for field_name, values in sqs.facet_counts().get("fields", {}).items():
+        for field_name, values in facet_counts.get("fields", {}).items():
             facets[field_name] = [
                 {"key": value[0], "count": value[1]}
                 for value in values
@@ -180,70 +278,144 @@ class DatasetSearchView(FacetedSearchView):
         for es_field, api_field, model in facet_mappings:
             facet_items = facets.pop(es_field, [])
 
-            slugs = [item["key"] for item in facet_items]
-
-            # Fetch translations only for slugs present in facet results
-            translations: dict[str, dict] = {}
-            if slugs:
-                for record in model.objects.filter(slug__in=slugs).values(
-                    "slug",
-                    "name",
-                    f"name_{self.locale}",
-                ):
-                    slug = record["slug"]
-                    default_name = record["name"]
-                    localized_name = record[f"name_{self.locale}"]
-
-                    translations[slug] = {
-                        "name": localized_name or default_name or slug,
-                        "fallback": localized_name is None,
-                    }
-
             # Apply translations to facet items
-            for item in facet_items:
-                slug = item["key"]
-                translation = translations.get(slug, {})
-                item["name"] = translation.get("name", slug)
-                item["fallback"] = translation.get("fallback", True)
+            if facet_items:
+                labels = get_labels(model, self.locale)
+                for item in facet_items:
+                    item.update(get_label(labels, item["key"]))
 
             facets[api_field] = facet_items
 
         return facets
 
-    def get_results(self, sqs: SearchQuerySet) -> list[dict[str, Any]]:
-        # Sort and paginate at Elasticsearch level
-        # NOTE: _score is the relevance score from Elasticsearch
-        sqs = sqs.order_by("-contains_tables", "-_score", "-updated_at")
+    def get_results(self, results: list[SearchResult]) -> list[dict[str, Any]]:
+        # Results are prerendered in the index, see `prerender_search_result`
+        prerendered = {r.pk: getattr(r, f"result_{self.locale}") for r in results}
+        if missing := [pk for pk, result in prerendered.items() if result is None]:
+            with measure("prerender", count=len(missing)):
+                prerendered.update(get_prerendered_results(missing, self.locale))
+
+        # Organization picture urls, signed once for the whole page
+        with measure("pictures"):
+            picture_urls = get_file_urls(
+                [
+                    organization["picture"]
+                    for result in prerendered.values()
+                    if result is not None
+                    for organization in result.get("organizations", [])
+                    if organization["picture"]
+                ]
+            )
 
-        start = (self.page - 1) * self.page_size
-        end = start + self.page_size
-        results = list(sqs[start:end])
+        with measure("serialize"):
+            return [
+                with_picture_urls(prerendered[r.pk], picture_urls)
+                for r in results
+                if prerendered.get(r.pk) is not None
+            ]
+
+
+def render(data: dict) -> JsonResponse:
+    """Render a json response, measuring the encoding if the request is profiled"""
+    with measure("render"):
+        return JsonResponse(data)
+
+
+def get_source_fields(locale: str) -> list[str]:
+    """Get the index fields read by the search view in the locale"""
+    return [f"result_{locale}"]
+
+
+def prerender_search_result(data: dict, locale: str) -> dict[str, Any]:
+    """Render the search result of a prepared index document, to be stored with it
+
+    Pictures are kept as storage names, since their signed urls expire, and are
+    replaced by their urls with `with_picture_urls` when read
+    """
+    if isinstance(updated_at := data.get("updated_at"), datetime):
+        # As read back from the index, without time zone and microseconds
+        data = {**data, "updated_at": updated_at.replace(tzinfo=None, microsecond=0)}
+
+    spatial_coverage_translations = {}
+    if data.get("spatial_coverage"):
+        labels = get_labels(Area, locale)
+        spatial_coverage_translations = {
+            slug: get_label(labels, slug)["name"] for slug in data["spatial_coverage"]
+        }
+
+    pictures = {picture: picture for picture in data.get("organization_picture") or [] if picture}
+    result = SearchResult("v1", "dataset", data.get("django_id"), 1.0, **data)
+    result = as_search_result(result, locale, spatial_coverage_translations, pictures)
+    return loads(dumps(result, cls=DjangoJSONEncoder))
+
+
+def get_prerendered_results(pks: list[str], locale: str) -> dict[str, dict]:
+    """Render the search results of datasets indexed before they were prerendered
 
-        # Pre-fetch all Area objects and cache spatial coverage translations
-        all_coverage_slugs = set()
-        for r in results:
-            if hasattr(r, "spatial_coverage") and r.spatial_coverage:
-                all_coverage_slugs.update(r.spatial_coverage)
+    Datasets deleted or unpublished since they were indexed are left out
+    """
+    index = connections["default"].get_unified_index().get_index(Dataset)
+    return {
+        str(dataset.pk): index.prepare_result(dataset, locale)
+        for dataset in index.index_queryset().filter(pk__in=pks)
+    }
+
+
+def with_picture_urls(result: dict, picture_urls: dict[str, str]) -> dict[str, Any]:
+    """Replace the picture names of a prerendered result by their urls"""
+    organizations = [
+        {**organization, "picture": picture_urls.get(organization["picture"])}
+        for organization in result.get("organizations", [])
+    ]
+    return {**result, "organizations": organizations}
+
+
+def parse_date_bound(value: str, end: bool = False) -> str:
+    """Parse a year, month or day as the first or, if `end`, the last day of its period
 
-        spatial_coverage_translations = {}
-        if all_coverage_slugs:
-            for record in Area.objects.filter(slug__in=all_coverage_slugs).values(
-                "slug",
-                "name",
-                f"name_{self.locale}",
-            ):
-                slug = record["slug"]
-                default_name = record["name"]
-                localized_name = record[f"name_{self.locale}"]
+    For example, `2015` starts at `2015-01-01` and ends at `2015-12-31`
+
+    Raises:
+        ValueError: if the value isn't a valid date
+    """
+    parts = [int(part) for part in value.split("-")]
+    if not 1 <= len(parts) <= 3:
+        raise ValueError(f"Invalid date: {value}")
+    year, month, day = [*parts, None, None][:3]
+    if end:
+        month = month or 12
+        day = day or monthrange(year, month)[1]
+    return date(year, month or 1, day or 1).isoformat()
 
-                spatial_coverage_translations[slug] = localized_name or default_name or slug
 
-        return [as_search_result(r, self.locale, spatial_coverage_translations) for r in results]
+def encode_cursor(sort_values: list) -> str:
+    return urlsafe_b64encode(dumps(sort_values).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    """Decode the sort values of a cursor
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    try:
+        sort_values = loads(urlsafe_b64decode(cursor.encode()))
+    except (Base64Error, UnicodeDecodeError) as error:
+        raise ValueError(error)
+    if not isinstance(sort_values, list):
+        raise ValueError("Cursor must encode a list")
+    return sort_values
 
 
 def as_search_result(
-    result: SearchResult, locale: str = "pt", spatial_coverage_translations: dict[str, str] = {}
+    result: SearchResult,
+    locale: str = "pt",
+    spatial_coverage_translations: dict[str, str] = {},
+    picture_urls: dict[str, str] | None = None,
 ) -> dict[str, Any]:
+    if picture_urls is None:
+        picture_urls = get_file_urls(result.organization_picture or [])
+
     themes = []
     for slug, name in zip(result.theme_slug or [], getattr(result, f"theme_name_{locale}") or []):
         themes.append(
@@ -263,7 +435,7 @@ def as_search_result(
         or [],
         result.organization_picture or [],
     ):
-        picture = storage.url(picture) if picture else None
+        picture = picture_urls.get(picture) if picture else None
         organizations.append(
             {
                 "id": pk,
@@ -335,6 +507,8 @@ def as_search_result(
 class DatasetFacetValuesView(View):
     """
     View para retornar os valores de uma faceta específica baseada nos parâmetros de filtro atuais.
+
+    Os valores são paginados por cursor e podem ser filtrados pelo prefixo do nome ou do slug.
     """
 
     facet_fields = [
@@ -353,6 +527,31 @@ class DatasetFacetValuesView(View):
     def facet_name(self):
         return self.request.GET.get("facet", "").lower()
 
+    @property
+    def model(self):
+        return {
+            "theme_slug": Theme,
+            "organization_slug": Organization,
+            "tag_slug": Tag,
+            "entity_slug": Entity,
+            "spatial_coverage": Area,
+        }[self.facet_name]
+
+    @property
+    def prefix(self) -> str:
+        return self.request.GET.get("prefix", "").strip()
+
+    @property
+    def cursor(self) -> str | None:
+        return self.request.GET.get("cursor")
+
+    @property
+    def page_size(self) -> int:
+        try:
+            return min(max(int(self.request.GET.get("page_size", 20)), 1), 100)
+        except (TypeError, ValueError):
+            return 20
+
     def get_form_kwargs(self):
         kwargs = {
             "contains": self.request.GET.getlist("contains"),
@@ -361,6 +560,9 @@ class DatasetFacetValuesView(View):
             "spatial_coverage": self.request.GET.getlist("spatial_coverage"),
             "tag": self.request.GET.getlist("tag"),
             "observation_level": self.request.GET.getlist("observation_level"),
+            "temporal_start": self.request.GET.get("temporal_start"),
+            "temporal_end": self.request.GET.get("temporal_end"),
+            "temporal_type": self.request.GET.get("temporal_type"),
             "locale": self.locale,
         }
 
@@ -369,6 +571,15 @@ class DatasetFacetValuesView(View):
 
         return kwargs
 
+    def get_cache_params(self) -> dict[str, list[str]]:
+        return {
+            **dict(self.request.GET.lists()),
+            "facet": [self.facet_name],
+            "prefix": [self.prefix],
+            "page_size": [str(self.page_size)],
+            "locale": [self.locale],
+        }
+
     def get(self, request, *args, **kwargs):
         if self.facet_name not in self.facet_fields:
             return JsonResponse(
@@ -378,56 +589,254 @@ class DatasetFacetValuesView(View):
                 status=400,
             )
 
+        if option := get_profile_option(request):
+            return get_profiled_response(option, self.get_response)
+        return get_cached_response("facet_values", self.get_cache_params(), self.get_response)
+
+    def get_response(self) -> JsonResponse:
+        # Only count the values whose names start with the prefix
+        include = None
+        if self.prefix:
+            labels = get_labels(self.model, self.locale)
+            include = match_labels(labels, self.prefix)
+            if not include:
+                return self.as_response([], None)
+
+        after = None
+        if self.cursor:
+            try:
+                (after,) = decode_cursor(self.cursor)
+            except ValueError:
+                return JsonResponse({"error": "Invalid cursor"}, status=400)
+
         form = DatasetSearchForm(**self.get_form_kwargs())
-        sqs = form.search()
-
-        sqs = sqs.facet(self.facet_name, size=1000)  # Tamanho grande para pegar todos os valores
-
-        facet_counts = sqs.facet_counts()
-        facet_values = facet_counts.get("fields", {}).get(self.facet_name, [])
-
-        values = [{"key": value[0], "count": value[1]} for value in facet_values if value[0]]
-
-        if self.facet_name == "theme_slug":
-            model = Theme
-            name_field = f"name_{self.locale}"
-        elif self.facet_name == "organization_slug":
-            model = Organization
-            name_field = f"name_{self.locale}"
-        elif self.facet_name == "tag_slug":
-            model = Tag
-            name_field = f"name_{self.locale}"
-        elif self.facet_name == "entity_slug":
-            model = Entity
-            name_field = f"name_{self.locale}"
-        elif self.facet_name == "spatial_coverage":
-            model = Area
-            name_field = f"name_{self.locale}"
-        else:
-            model = None
-
-        if model:
-            slugs = [v["key"] for v in values]
-            translated_names = model.objects.filter(slug__in=slugs).values(
-                "slug", name_field, "name"
-            )
-            name_map = {
-                item["slug"]: {
-                    "name": item.get(name_field) or item.get("name") or item["slug"],
-                    "fallback": name_field not in item or item[name_field] is None,
-                }
-                for item in translated_names
-            }
+        query = form.search().query
+        query.add_composite_facet(self.facet_name, self.page_size, after=after, include=include)
+        query.get_results(size=0)
+
+        facet = query.get_facet_counts().get("composite", {}).get(self.facet_name, {})
+        values = [{"key": key, "count": count} for key, count in facet.get("values", []) if key]
 
-            for value in values:
-                translated = name_map.get(value["key"], {"name": value["key"], "fallback": True})
-                value.update(translated)
+        if values:
+            with measure("labels"):
+                labels = get_labels(self.model, self.locale)
+                for value in values:
+                    value.update(get_label(labels, value["key"]))
 
-        return JsonResponse(
+        next_cursor = None
+        if len(facet.get("values", [])) == self.page_size and facet.get("after"):
+            next_cursor = encode_cursor([facet["after"]])
+
+        return self.as_response(values, next_cursor)
+
+    def as_response(self, values: list[dict], next_cursor: str | None) -> JsonResponse:
+        return render(
             {
                 "facet": self.facet_name,
                 "values": values,
                 "count": len(values),
+                "next_cursor": next_cursor,
+                "locale": self.locale,
+            }
+        )
+
+
+class DatasetSuggestView(View):
+    """
+    View para autocompletar o nome dos conjuntos enquanto o usuário digita.
+
+    Retorna apenas o id, o slug e o nome traduzido dos conjuntos cujo nome, ou o nome de
+    uma das suas organizações, começa com o texto digitado.
+    """
+
+    @property
+    def locale(self):
+        locale = self.request.GET.get("locale", "pt")
+        return locale if locale in LOCALES else "pt"
+
+    @property
+    def q(self) -> str:
+        return self.request.GET.get("q", "").strip()
+
+    @property
+    def page_size(self) -> int:
+        try:
+            return min(max(int(self.request.GET.get("page_size", 10)), 1), 20)
+        except (TypeError, ValueError):
+            return 10
+
+    def get(self, request, *args, **kwargs):
+        results = []
+        if self.q:
+            backend = connections["default"].get_backend()
+            documents = backend.complete(
+                f"suggest_{self.locale}",
+                self.q,
+                size=self.page_size,
+                fields=["dataset_id", "dataset_slug", f"dataset_name_{self.locale}"],
+            )
+            results = [
+                {
+                    "id": document["dataset_id"],
+                    "slug": document["dataset_slug"],
+                    "name": document.get(f"dataset_name_{self.locale}") or document["dataset_slug"],
+                }
+                for document in documents
+            ]
+
+        return JsonResponse({"results": results, "locale": self.locale})
+
+
+class ColumnSearchView(View):
+    """
+    View para buscar colunas pelo nome, pela descrição ou pela sua tabela e conjunto.
+
+    Retorna as colunas paginadas, com facetas por conjunto e por tipo do BigQuery, que
+    também filtram a busca pelos parâmetros `dataset` e `bigquery_type`.
+    """
+
+    facet_size = 10
+
+    @property
+    def locale(self):
+        locale = self.request.GET.get("locale", "pt")
+        return locale if locale in LOCALES else "pt"
+
+    @property
+    def q(self) -> str:
+        return self.request.GET.get("q", "").strip()
+
+    @property
+    def page(self) -> int:
+        try:
+            return max(int(self.request.GET.get("page", 1)), 1)
+        except (TypeError, ValueError):
+            return 1
+
+    @property
+    def page_size(self) -> int:
+        try:
+            return min(max(int(self.request.GET.get("page_size", 10)), 1), 100)
+        except (TypeError, ValueError):
+            return 10
+
+    @property
+    def source_fields(self) -> list[str]:
+        return [
+            "column_id",
+            "column_name",
+            f"column_description_{self.locale}",
+            "column_bigquery_type",
+            "column_directory_primary_key",
+            "column_is_closed",
+            "table_id",
+            "table_slug",
+            f"table_name_{self.locale}",
+            "column_dataset_id",
+            "dataset_slug",
+            f"dataset_name_{self.locale}",
+        ]
+
+    def get_cache_params(self) -> dict[str, list[str]]:
+        return {
+            **dict(self.request.GET.lists()),
+            "page": [str(self.page)],
+            "page_size": [str(self.page_size)],
+            "locale": [self.locale],
+        }
+
+    def get(self, request, *args, **kwargs):
+        if option := get_profile_option(request):
+            return get_profiled_response(option, self.get_response)
+        return get_cached_response("columns", self.get_cache_params(), self.get_response)
+
+    def get_response(self) -> JsonResponse:
+        sqs = SearchQuerySet().models(Column)
+        if self.q:
+            sqs = (
+                sqs.auto_query(self.q)
+                .filter_and(**{"text.edgengram": self.q})
+                .filter_or(**{f"text.snowball_{self.locale}": self.q})
+            )
+
+        for param, field in [
+            ("dataset", "column_dataset_id"),
+            ("bigquery_type", "column_bigquery_type"),
+        ]:
+            if values := self.request.GET.getlist(param):
+                sqs.query.add_filter_clause({"terms": {field: values}})
+
+        sqs = sqs.facet("column_dataset_id", size=self.facet_size)
+        sqs = sqs.facet("column_bigquery_type", size=self.facet_size)
+        sqs = sqs.order_by("-_score", "django_id")
+
+        start = (self.page - 1) * self.page_size
+        query = sqs.query
+        query.set_source_fields(self.source_fields)
+        query.set_limits(start, start + self.page_size)
+        results = query.get_results(track_total_hits=True)
+
+        return render(
+            {
+                "page": self.page,
+                "page_size": self.page_size,
+                "count": query.get_count(),
+                "results": [as_column_result(result, self.locale) for result in results],
+                "aggregations": self.get_facets(query.get_facet_counts()),
                 "locale": self.locale,
             }
         )
+
+    @measured("facets")
+    def get_facets(self, facet_counts: dict) -> dict[str, list]:
+        fields = facet_counts.get("fields", {})
+        datasets = [
+            {"key": key, "count": count}
+            for key, count in fields.get("column_dataset_id", [])
+            if key
+        ]
+        if datasets:
+            labels = self.get_dataset_labels([item["key"] for item in datasets])
+            for item in datasets:
+                item.update(labels.get(item["key"], {"slug": None, "name": item["key"]}))
+
+        bigquery_types = [
+            {"key": key, "count": count, "name": key}
+            for key, count in fields.get("column_bigquery_type", [])
+            if key
+        ]
+        return {"datasets": datasets, "bigquery_types": bigquery_types}
+
+    def get_dataset_labels(self, ids: list[str]) -> dict[str, dict]:
+        """Get the slugs and localized names of the datasets by id"""
+        datasets = Dataset.objects.filter(pk__in=ids).values(
+            "pk", "slug", "name", f"name_{self.locale}"
+        )
+        return {
+            str(dataset["pk"]): {
+                "slug": dataset["slug"],
+                "name": dataset[f"name_{self.locale}"] or dataset["name"] or dataset["slug"],
+            }
+            for dataset in datasets
+        }
+
+
+def as_column_result(result: SearchResult, locale: str = "pt") -> dict[str, Any]:
+    return {
+        "id": result.column_id,
+        "name": result.column_name,
+        "description": getattr(result, f"column_description_{locale}"),
+        "bigquery_type": result.column_bigquery_type,
+        "directory_primary_key": result.column_directory_primary_key,
+        "is_closed": result.column_is_closed,
+        "table": {
+            "id": result.table_id,
+            "slug": result.table_slug,
+            "name": getattr(result, f"table_name_{locale}") or result.table_slug,
+        },
+        "dataset": {
+            "id": result.column_dataset_id,
+            "slug": result.dataset_slug,
+            "name": getattr(result, f"dataset_name_{locale}") or result.dataset_slug,
+        },
+    }
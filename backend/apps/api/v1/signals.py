@@ -1,85 +1,334 @@
 # -*- coding: utf-8 -*-
-from django.db import models
-from haystack.exceptions import NotHandled
-from haystack.indexes import SearchIndex
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models, transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from haystack.signals import BaseSignalProcessor
 from loguru import logger
 
+from backend.apps.api.v1.area_tree import invalidate_area_tree
 from backend.apps.api.v1.models import (
+    Area,
+    AreaClosure,
+    Column,
     Coverage,
+    CoverageSummary,
     Dataset,
     DateTimeRange,
+    Entity,
     InformationRequest,
     Organization,
     RawDataSource,
+    Status,
     Table,
+    Tag,
+    Theme,
 )
+from backend.apps.api.v1.search_labels import invalidate_labels
+from backend.apps.api.v1.search_queue import enqueue_datasets
+from backend.apps.api.v1.tasks import update_search_index_queue_task
 
 
 class BDSignalProcessor(BaseSignalProcessor):
     """
     Allows for observing when saves/deletes fire
-    and automatically updates the search engine appropriately
+    and queues the affected datasets to be updated in the search engine
+
+    The queue is drained by `update_search_index_queue_task` after a debounce window,
+    so that many changes of the same dataset update it only once
     """
 
+    senders = [
+        Dataset,
+        Organization,
+        Coverage,
+        DateTimeRange,
+        Table,
+        Column,
+        RawDataSource,
+        InformationRequest,
+        Tag,
+        Theme,
+    ]
+
+    # Records related to datasets by many to many relations, which are gone after deletion
+    many_to_many_senders = [Organization, Tag, Theme]
+
     def handle_save(self, sender, instance, raw, **kwargs):
         """
-        Given an individual model instance, determine which backends the
-        update should be sent to and update the object on those backends.
+        Given an individual model instance, queue the datasets it belongs to
 
         - If the instance is a fixture, ignore it
-        - If the instance isn't a fixture, then update it
+        - If the instance isn't a fixture, then queue its datasets
         """
 
         if raw:
             return None
 
-        using_backends = self.connection_router.for_write(instance=instance)
-
-        for using in using_backends:
-            datasets: list[Dataset] = []
-            try:
-                if sender == Dataset:
-                    datasets = [instance]
-                elif sender == Organization:
-                    datasets = instance.datasets.all()
-                elif sender == Coverage:
-                    resource = None
-                    resource = resource or instance.table
-                    resource = resource or instance.raw_data_source
-                    resource = resource or instance.information_request
-                    if resource and (dataset := resource.dataset):
-                        datasets = [dataset]
-                elif sender == DateTimeRange:
-                    if coverage := instance.coverage:
-                        resource = None
-                        resource = resource or coverage.table
-                        resource = resource or coverage.raw_data_source
-                        resource = resource or coverage.information_request
-                        if resource and (dataset := resource.dataset):
-                            datasets = [dataset]
-                elif sender in [Table, RawDataSource, InformationRequest]:
-                    if dataset := instance.dataset:
-                        datasets = [dataset]
-                index: SearchIndex = (
-                    self.connections[using]
-                    .get_unified_index()
-                    .get_index(Dataset)
-                )  # fmt: skip
-                for ds in datasets or []:
-                    if ds.status and ds.status.slug in ["under_review", "excluded"]:
-                        index.remove_object(ds, using=using)
-                    else:
-                        index.update_object(ds, using=using)
-            except NotHandled as error:
-                logger.warning(error)
-            except Exception as error:
-                logger.error(error)
+        self.handle(sender, instance)
+
+    def handle_delete(self, sender, instance, **kwargs):
+        """
+        Given an individual model instance, queue the datasets it belonged to
+        """
+
+        if sender in self.many_to_many_senders:
+            return None
+
+        self.handle(sender, instance)
+
+    def handle_pre_delete(self, sender, instance, **kwargs):
+        """
+        Queue the datasets of a record related by a many to many relation, before the
+        relation is deleted along with it
+        """
+
+        if sender not in self.many_to_many_senders:
+            return None
+
+        self.handle(sender, instance)
+
+    def handle(self, sender, instance):
+        if sender not in self.senders:
+            return None
+
+        try:
+            dataset_ids = self.get_dataset_ids(sender, instance)
+            if dataset_ids:
+                transaction.on_commit(partial(self.enqueue, dataset_ids))
+        except ObjectDoesNotExist:
+            pass
+        except Exception as error:
+            logger.error(error)
+
+    def get_dataset_ids(self, sender, instance) -> list[str]:
+        """Get the datasets affected by a change of the instance"""
+
+        def get_resource(coverage: Coverage):
+            resource = None
+            resource = resource or coverage.table
+            resource = resource or coverage.raw_data_source
+            resource = resource or coverage.information_request
+            resource = resource or (coverage.column and coverage.column.table)
+            return resource
+
+        if sender == Dataset:
+            return [instance.pk]
+        if sender in self.many_to_many_senders:
+            return list(instance.datasets.values_list("pk", flat=True))
+        if sender == Coverage:
+            if resource := get_resource(instance):
+                return [resource.dataset_id]
+        if sender == DateTimeRange:
+            if coverage := instance.coverage:
+                if resource := get_resource(coverage):
+                    return [resource.dataset_id]
+        if sender == Column:
+            return [instance.table.dataset_id]
+        if sender in [Table, RawDataSource, InformationRequest]:
+            if instance.dataset_id:
+                return [instance.dataset_id]
+        return []
+
+    @staticmethod
+    def enqueue(dataset_ids: list[str]):
+        """Queue the datasets, scheduling the queue update if it isn't already"""
+        try:
+            if enqueue_datasets(dataset_ids):
+                update_search_index_queue_task.schedule(
+                    delay=settings.SEARCH_INDEX_DEBOUNCE_SECONDS
+                )
+        except Exception as error:
+            logger.error(error)
 
     def setup(self):
         models.signals.post_save.connect(self.handle_save)
         models.signals.post_delete.connect(self.handle_delete)
+        models.signals.pre_delete.connect(self.handle_pre_delete)
 
     def teardown(self):
         models.signals.post_save.disconnect(self.handle_save)
         models.signals.post_delete.disconnect(self.handle_delete)
+        models.signals.pre_delete.disconnect(self.handle_pre_delete)
+
+
+@receiver(post_save, sender=Dataset)
+@receiver(post_save, sender=Table)
+@receiver(post_save, sender=RawDataSource)
+def update_is_public(sender, instance, raw=False, **kwargs):
+    """Keep the `is_public` flag from the status, hiding the resources along with their dataset"""
+    if raw:
+        return
+    sender.objects.filter(pk=instance.pk).refresh_is_public()
+    if sender is Dataset:
+        Table.objects.filter(dataset=instance).refresh_is_public()
+        RawDataSource.objects.filter(dataset=instance).refresh_is_public()
+    instance.refresh_from_db(fields=["is_public"])
+
+
+@receiver(post_save, sender=Status)
+def update_is_public_of_status(sender, instance, raw=False, **kwargs):
+    """Keep the `is_public` flag of the records of the status, whose slug may have changed"""
+    if raw:
+        return
+    datasets = Dataset.objects.filter(status=instance)
+    n_changes = datasets.refresh_is_public()
+    dataset_ids = set(datasets.values_list("pk", flat=True))
+    for model in [Table, RawDataSource]:
+        resources = model.objects.filter(Q(status=instance) | Q(dataset__status=instance))
+        n_changes += resources.refresh_is_public()
+        dataset_ids.update(resources.values_list("dataset_id", flat=True))
+
+    # Queryset updates don't fire the signals of the search index, so the datasets of the
+    # changed records are queued here, removing the columns of the hidden tables
+    if n_changes:
+        transaction.on_commit(partial(BDSignalProcessor.enqueue, list(dataset_ids)))
+
+
+@receiver(post_save, sender=Area)
+@receiver(post_save, sender=Entity)
+@receiver(post_save, sender=Organization)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Theme)
+@receiver(post_delete, sender=Area)
+@receiver(post_delete, sender=Entity)
+@receiver(post_delete, sender=Organization)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Theme)
+def invalidate_search_labels(sender, instance, **kwargs):
+    """Reload the cached facet names once the change is committed"""
+    transaction.on_commit(partial(invalidate_labels, sender))
+
+
+def get_coverage_resource_keys(coverages) -> set[tuple]:
+    """Get the resources whose coverage summary depends on the coverages"""
+    keys = set()
+    for coverage in coverages:
+        for field in CoverageSummary.resource_fields:
+            if pk := getattr(coverage, f"{field}_id"):
+                model = CoverageSummary._meta.get_field(field).related_model
+                keys.add((model, pk))
+    return keys
+
+
+def refresh_coverage_summaries(keys: set[tuple]):
+    """Refresh the coverage summaries of the resources, skipping the deleted ones"""
+    for model, pk in keys:
+        try:
+            resource = model.objects.prefetch_related(
+                "coverages__area",
+                "coverages__datetime_ranges",
+            ).get(pk=pk)
+            CoverageSummary.refresh(resource)
+        except model.DoesNotExist:
+            pass
+        except Exception as error:
+            logger.error(error)
+
+
+class PendingCoverageSummaries:
+    """Resources whose coverage summary is refreshed once their transaction is committed"""
+
+    def __init__(self):
+        self.keys = set()
+        self.is_done = False
+
+    def __call__(self):
+        self.is_done = True
+        refresh_coverage_summaries(self.keys)
+
+
+def schedule_coverage_summaries(coverages):
+    """Refresh the summaries of the coverages once the transaction is committed
+
+    Resources are collected on the connection, so that a transaction changing many
+    coverages or ranges refreshes each summary once, from a single callback
+    """
+    if not (keys := get_coverage_resource_keys(coverages)):
+        return
+    connection = transaction.get_connection()
+    pending = getattr(connection, "pending_coverage_summaries", None)
+    # The callback is done once run, or discarded along with a rolled back transaction
+    if (
+        pending is None
+        or pending.is_done
+        or not any(callback[1] is pending for callback in connection.run_on_commit)
+    ):
+        pending = connection.pending_coverage_summaries = PendingCoverageSummaries()
+        pending.keys.update(keys)
+        transaction.on_commit(pending)
+    else:
+        pending.keys.update(keys)
+
+
+@receiver(post_save, sender=Coverage)
+@receiver(post_delete, sender=Coverage)
+def update_coverage_summary_of_coverage(sender, instance, raw=False, **kwargs):
+    """Refresh the summary of the resource of the coverage once the change is committed"""
+    if raw:
+        return
+    schedule_coverage_summaries([instance])
+
+
+@receiver(post_save, sender=DateTimeRange)
+@receiver(post_delete, sender=DateTimeRange)
+def update_coverage_summary_of_datetime_range(sender, instance, raw=False, **kwargs):
+    """Refresh the summary of the resource of the datetime range once the change is committed"""
+    if raw:
+        return
+    try:
+        schedule_coverage_summaries([instance.coverage])
+    except ObjectDoesNotExist:
+        pass
+
+
+def refresh_areas(area_ids: list, keys: set[tuple]):
+    """Rebuild the closure of the areas, then the summaries that prune them"""
+    try:
+        AreaClosure.rebuild(area_ids)
+        invalidate_area_tree()
+    except Exception as error:
+        logger.error(error)
+    refresh_coverage_summaries(keys)
+
+
+@receiver(post_save, sender=Area)
+@receiver(pre_delete, sender=Area)
+def update_area_closure(sender, instance, raw=False, **kwargs):
+    """Rebuild the closure of the area and its descendants once the change is committed
+
+    Summaries of the coverages of the area are refreshed afterwards, along with the ones
+    of its descendants if it moved, as their pruning depends on the ancestors of the areas,
+    and the datasets of these coverages are queued to update their search results.
+    Descendants lose their parent when it's deleted, without signals, so they're
+    collected before
+    """
+    if raw:
+        return
+    area_ids = [instance.pk]
+    area_ids.extend(
+        instance.descendant_links.exclude(descendant=instance).values_list(
+            "descendant_id", flat=True
+        )
+    )
+    parent_ids = list(instance.ancestor_links.filter(depth=1).values_list("ancestor_id", flat=True))
+    parent_id = instance.parent_id
+    moved = kwargs["signal"] is pre_delete or parent_ids != ([parent_id] if parent_id else [])
+    coverages = Coverage.objects.filter(area_id__in=area_ids if moved else [instance.pk])
+    keys = get_coverage_resource_keys(coverages)
+    transaction.on_commit(partial(refresh_areas, area_ids, keys))
+
+    # Search results embed the names of the areas, and the pruned coverages
+    dataset_fields = [
+        "table__dataset_id",
+        "raw_data_source__dataset_id",
+        "information_request__dataset_id",
+        "column__table__dataset_id",
+    ]
+    dataset_ids = {pk for values in coverages.values_list(*dataset_fields) for pk in values if pk}
+    if dataset_ids:
+        transaction.on_commit(partial(BDSignalProcessor.enqueue, list(dataset_ids)))
@@ -5,13 +5,22 @@ from random import sample
 from django.core.management import call_command
 from google.api_core.exceptions import GoogleAPICallError
 from google.cloud.bigquery import Table as GBQTable
+from haystack import connection_router, connections
 from huey import crontab
-from huey.contrib.djhuey import db_periodic_task
+from huey.contrib.djhuey import db_periodic_task, db_task
 from loguru import logger
 from pandas import read_gbq
 from requests import get
 
-from backend.apps.api.v1.models import Dataset, RawDataSource, Table, TableNeighbor
+from backend.apps.api.v1.models import (
+    Column,
+    Dataset,
+    DatasetSearchDocument,
+    RawDataSource,
+    Table,
+    TableNeighbor,
+)
+from backend.apps.api.v1.search_queue import count_updates, dequeue_datasets, enqueue_datasets
 from backend.custom.client import Messenger, get_gbq_client, get_gcs_client, send_discord_message
 from backend.custom.environment import production_task
 
@@ -21,13 +30,48 @@ logger = logger.bind(module="api.v1")
 @db_periodic_task(crontab(day_of_week="1-6", hour="5", minute="0"), retries=3, retry_delay=60)
 @production_task
 def update_search_index_task():
-    call_command("update_index", batchsize=100)
+    call_command("update_search_index", batchsize=100)
 
 
 @db_periodic_task(crontab(day_of_week="0", hour="5", minute="0"), retries=3, retry_delay=60)
 @production_task
 def rebuild_search_index_task():
-    call_command("rebuild_index", interactive=False, batchsize=100)
+    call_command("rebuild_search_index", batchsize=100)
+
+
+@db_task(retries=3, retry_delay=60)
+def update_search_index_queue_task():
+    """Update the datasets queued by the search signal processor, each one once,
+    along with their columns"""
+    dataset_ids, n_events = dequeue_datasets()
+    if not dataset_ids:
+        return
+
+    try:
+        for using in connection_router.for_write():
+            backend = connections[using].get_backend()
+            index = connections[using].get_unified_index().get_index(Dataset)
+
+            queryset = index.index_queryset(using=using).filter(pk__in=dataset_ids)
+            datasets = list(queryset.with_catalog_flags().with_coverage_summaries())
+            for dataset in datasets:
+                dataset.search_document = DatasetSearchDocument.refresh(dataset)
+            if datasets:
+                backend.update(index, datasets)
+
+            # Datasets that were deleted or aren't published anymore
+            indexed_ids = {str(dataset.pk) for dataset in datasets}
+            for pk in set(dataset_ids) - indexed_ids:
+                backend.remove(f"{Dataset._meta.label_lower}.{pk}")
+
+            column_index = connections[using].get_unified_index().get_index(Column)
+            column_index.update_datasets(backend, dataset_ids, using=using)
+    except Exception:
+        enqueue_datasets(dataset_ids, n_events=0)
+        raise
+
+    count_updates(len(dataset_ids))
+    logger.info(f"Updated {len(dataset_ids)} datasets in the index from {n_events} changes")
 
 
 @db_periodic_task(crontab(day_of_week="1-5", hour="6", minute="0"))
@@ -91,19 +135,12 @@ def update_table_metadata_task(table_pks: list[str] = None):
     if not table_pks:
         tables = (
             Table.objects
-            .exclude(status__slug__in=["under_review", "excluded"])
-            .exclude(dataset__status__slug__in=["under_review", "excluded"])
+            .public()
             .order_by("updated_at")
             .all()
         )  # fmt: skip
     else:
-        tables = (
-            Table.objects.filter(pk__in=table_pks)
-            .exclude(status__slug__in=["under_review", "excluded"])
-            .exclude(dataset__status__slug__in=["under_review", "excluded"])
-            .order_by("updated_at")
-            .all()
-        )
+        tables = Table.objects.public().filter(pk__in=table_pks).order_by("updated_at").all()
 
     for table in tables:
         if messenger.is_full:
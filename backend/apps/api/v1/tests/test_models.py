@@ -3,20 +3,32 @@
 Pytest Django models tests.
 """
 import json
+from contextlib import suppress
+from datetime import datetime, timezone
+from uuid import uuid4
 
 import pytest
 from django.core.exceptions import ValidationError
+from django.db import connection, transaction
 
 from backend.apps.api.v1.models import (  # Column,
     Analysis,
     Area,
+    AreaClosure,
     CloudTable,
+    Coverage,
+    CoverageSummary,
     Dataset,
+    DatasetSearchDocument,
     DateTimeRange,
     InformationRequest,
     RawDataSource,
+    Status,
     Table,
 )
+from backend.apps.api.v1.search_indexes import ColumnIndex, DatasetIndex
+from backend.apps.api.v1.search_memory import use_memory_backend
+from backend.apps.api.v1.signals import BDSignalProcessor, PendingCoverageSummaries
 
 # from django.core.validators import RegexValidator
 
@@ -32,6 +44,27 @@ def test_area_slug_brasil_invalid():
         area.full_clean()
 
 
+@pytest.mark.django_db
+def test_area_closure_follows_the_parents():
+    """Test that the closure of the areas has their ancestors at every depth."""
+    brasil = Area.objects.create(name="Brasil", slug="br")
+    minas = Area.objects.create(name="Minas Gerais", slug="br_mg", parent=brasil)
+    belo_horizonte = Area.objects.create(name="Belo Horizonte", slug="br_mg_3106200", parent=minas)
+    AreaClosure.rebuild()
+
+    ancestors = AreaClosure.objects.filter(descendant=belo_horizonte).order_by("depth")
+    assert [(link.ancestor, link.depth) for link in ancestors] == [
+        (belo_horizonte, 0),
+        (minas, 1),
+        (brasil, 2),
+    ]
+
+    minas.parent = None
+    minas.save()
+    AreaClosure.rebuild([minas.pk])
+    assert not AreaClosure.objects.filter(ancestor=brasil).exclude(descendant=brasil).exists()
+
+
 @pytest.mark.django_db
 def test_organization_invalid(organizacao_invalida):
     """Test for Organization without name."""
@@ -76,6 +109,53 @@ def test_date_time_range_closed(coverage_tabela_open):
     assert open_date_time_range.is_closed is True
 
 
+@pytest.mark.django_db
+def test_date_time_range_stores_its_bounds(coverage_tabela_open):
+    """Test that the bounds of a DateTimeRange are stored in utc, with their precision."""
+    date_time_range = DateTimeRange.objects.create(
+        coverage=coverage_tabela_open,
+        start_year=2019,
+        start_month=1,
+        start_day=1,
+        end_year=2022,
+        end_month=6,
+        interval=1,
+    )
+    date_time_range.refresh_from_db()
+    assert date_time_range.since == datetime(2019, 1, 1, tzinfo=timezone.utc)
+    assert date_time_range.since_str == "2019-01-01"
+    assert date_time_range.until_str == "2022-06"
+
+    date_time_range.end_year = None
+    date_time_range.save(update_fields=["end_year"])
+    date_time_range.refresh_from_db()
+    assert date_time_range.until is None
+    assert date_time_range.until_str == ""
+
+    # Bulk writes store the bounds too, and raw sql writes get them once refreshed
+    (created,) = DateTimeRange.objects.bulk_create(
+        [DateTimeRange(coverage=coverage_tabela_open, start_year=2010, end_year=2012)]
+    )
+    assert DateTimeRange.objects.get(pk=created.pk).until_str == "2012"
+    DateTimeRange.objects.filter(pk=created.pk).update(end_year=2015)
+    inserted_pk = uuid4()
+    with connection.cursor() as cursor:
+        cursor.execute("UPDATE datetime_range SET since = NULL, since_precision = ''")
+        # Rows of older dumps lack the bounds, which default in the database
+        cursor.execute(
+            "INSERT INTO datetime_range (id, coverage_id, start_year, is_closed, updated_at) "
+            "VALUES (%s, %s, 2000, false, now())",
+            [inserted_pk, coverage_tabela_open.pk],
+        )
+    assert DateTimeRange.objects.refresh_bounds() == 3
+
+    created.refresh_from_db()
+    assert (created.since_str, created.until_str) == ("2010", "2015")
+    assert DateTimeRange.objects.get(pk=inserted_pk).since_str == "2000"
+    date_time_range.refresh_from_db()
+    assert date_time_range.since_str == "2019-01-01"
+
+
 @pytest.mark.django_db
 def test_date_time_range_invalid(coverage_tabela_open):
     """
@@ -304,3 +384,348 @@ def test_table_with_closed_coverages(
     ]
 
     assert tabela_bairros.full_coverage == json.dumps(table_expected_coverage)
+
+
+@pytest.mark.django_db
+def test_dataset_catalog_flags_match_the_properties(
+    dataset_dados_mestres,
+    tabela_bairros,
+    coverage_tabela_open,
+    coverage_tabela_closed,
+    datetime_range_1,
+    datetime_range_3,
+    raw_data_source,
+    pedido_informacao,
+):
+    """Test that the annotations of with_catalog_flags match the properties they replace."""
+    datetime_range_1.coverage = coverage_tabela_open
+    datetime_range_1.save()
+    datetime_range_3.coverage = coverage_tabela_closed
+    datetime_range_3.save()
+    Dataset.objects.create(slug="vazio", name="Vazio")
+
+    flags = [
+        "contains_open_data",
+        "contains_closed_data",
+        "contains_direct_download_free",
+        "contains_direct_download_paid",
+        "contains_temporalcoverage_free",
+        "contains_temporalcoverage_paid",
+        "contains_tables",
+        "contains_raw_data_sources",
+        "contains_information_requests",
+        "n_tables",
+        "n_raw_data_sources",
+        "n_information_requests",
+        "first_table_id",
+        "first_open_table_id",
+        "first_closed_table_id",
+        "first_raw_data_source_id",
+        "first_information_request_id",
+    ]
+    for annotated in Dataset.objects.with_catalog_flags():
+        dataset = Dataset.objects.get(pk=annotated.pk)
+        for flag in flags:
+            assert getattr(annotated, f"catalog_{flag}") == getattr(dataset, flag), flag
+
+
+@pytest.mark.django_db
+def test_coverage_summary_follows_the_coverages(
+    django_capture_on_commit_callbacks,
+    tabela_bairros,
+    datetime_range_1,
+    datetime_range_3,
+):
+    """Test that the summary of a table is refreshed as its coverages, ranges and areas change."""
+
+    def get_expected_summary(table):
+        coverages = list(table.coverages.all())
+        ranges = [dt for coverage in coverages for dt in coverage.datetime_ranges.all()]
+        starts = [(dt.start_year, dt.start_month) for dt in ranges]
+        ends = [(dt.end_year, dt.end_month) for dt in ranges]
+        areas = {coverage.area for coverage in coverages if coverage.area}
+
+        def has_ancestor_in_areas(area):
+            while area := area.parent:
+                if area in areas:
+                    return True
+            return False
+
+        return {
+            "since_str": "{}-{:02d}".format(*min(starts)) if starts else "",
+            "until_str": "{}-{:02d}".format(*max(ends)) if ends else "",
+            "has_open_coverage": any(not coverage.is_closed for coverage in coverages),
+            "has_closed_coverage": any(coverage.is_closed for coverage in coverages),
+            "spatial_coverage": sorted(a.slug for a in areas if not has_ancestor_in_areas(a)),
+        }
+
+    def get_summary(table):
+        summary = CoverageSummary.objects.get(table=table)
+        expected = get_expected_summary(Table.objects.get(pk=table.pk))
+        assert {key: getattr(summary, key) for key in expected} == expected
+        return summary
+
+    with django_capture_on_commit_callbacks(execute=True):
+        brasil = Area.objects.create(name="Brasil", slug="br")
+        rio = Area.objects.create(name="Rio de Janeiro", slug="br_rj")
+        coverage_open = Coverage.objects.create(table=tabela_bairros, area=brasil)
+        coverage_closed = Coverage.objects.create(table=tabela_bairros, area=rio, is_closed=True)
+        datetime_range_1.coverage = coverage_open
+        datetime_range_1.save()
+        datetime_range_3.coverage = coverage_closed
+        datetime_range_3.save()
+    summary = get_summary(tabela_bairros)
+    assert summary.spatial_coverage == ["br", "br_rj"]
+    assert (summary.since_str, summary.until_str) == ("2021-06", "2026-06")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        rio.parent = brasil
+        rio.save()
+    assert get_summary(tabela_bairros).spatial_coverage == ["br"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        datetime_range_3.delete()
+    assert get_summary(tabela_bairros).until_str == "2023-06"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        coverage_closed.delete()
+    assert not get_summary(tabela_bairros).has_closed_coverage
+
+
+@pytest.mark.django_db
+def test_coverage_summaries_are_refreshed_once_per_transaction(
+    django_capture_on_commit_callbacks, tabela_bairros
+):
+    """Test that a transaction changing many ranges refreshes their summary once."""
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        with suppress(RuntimeError), transaction.atomic():
+            Coverage.objects.create(table=tabela_bairros)
+            raise RuntimeError
+        coverage = Coverage.objects.create(table=tabela_bairros)
+        for year in range(2000, 2005):
+            DateTimeRange.objects.create(
+                coverage=coverage, start_year=year, end_year=year, interval=1
+            )
+
+    summaries = [c for c in callbacks if isinstance(c, PendingCoverageSummaries)]
+    assert len(summaries) == 1
+    assert summaries[0].keys == {(Table, tabela_bairros.pk)}
+    summary = CoverageSummary.objects.get(table=tabela_bairros)
+    assert (summary.since_str, summary.until_str) == ("2000", "2004")
+
+
+@pytest.mark.django_db
+def test_is_public_follows_the_statuses(tabela_bairros, raw_data_source, status_em_processamento):
+    """Test that the resources are hidden by their status, or along with their dataset."""
+
+    def get_is_public():
+        return [
+            model.objects.get(pk=instance.pk).is_public
+            for model, instance in [
+                (Dataset, tabela_bairros.dataset),
+                (Table, tabela_bairros),
+                (RawDataSource, raw_data_source),
+            ]
+        ]
+
+    assert get_is_public() == [True, True, True]
+
+    status_em_processamento.slug = "under_review"
+    status_em_processamento.save()
+    assert get_is_public() == [False, False, False]
+    assert not Table.objects.public().filter(pk=tabela_bairros.pk).exists()
+
+    tabela_bairros.dataset.status = None
+    tabela_bairros.dataset.save()
+    assert tabela_bairros.dataset.is_public
+    assert get_is_public() == [True, True, False]
+
+    status_em_revisao = Status.objects.create(slug="em_revisao", name="Em revisão")
+    tabela_bairros.status = status_em_revisao
+    tabela_bairros.save()
+    assert tabela_bairros.is_public
+
+    status_em_revisao.slug = "excluded"
+    status_em_revisao.save()
+    status_em_processamento.slug = "em_processamento"
+    status_em_processamento.save()
+    assert get_is_public() == [True, False, True]
+    assert RawDataSource.objects.public().filter(pk=raw_data_source.pk).exists()
+
+
+@pytest.mark.django_db
+def test_is_public_of_raw_inserted_datasets_is_refreshed():
+    """Test that datasets inserted with raw sql, as by `populate`, default to public."""
+    status = Status.objects.create(slug="under_review", name="Under review")
+    dataset_ids = [uuid4(), uuid4()]
+    with connection.cursor() as cursor:
+        for pk, status_id in zip(dataset_ids, [None, status.pk]):
+            cursor.execute(
+                "INSERT INTO dataset (id, slug, name, status_id, page_views, created_at, "
+                "updated_at) VALUES (%s, %s, 'Raw', %s, 0, now(), now())",
+                [pk, f"raw_{pk.hex}", status_id],
+            )
+    assert Dataset.objects.filter(pk__in=dataset_ids, is_public=True).count() == 2
+
+    assert Dataset.objects.refresh_is_public() == 1
+    assert list(Dataset.objects.public().filter(pk__in=dataset_ids)) == [
+        Dataset.objects.get(pk=dataset_ids[0])
+    ]
+
+
+@pytest.mark.django_db
+def test_column_index_skips_the_columns_of_hidden_tables(
+    monkeypatch,
+    django_capture_on_commit_callbacks,
+    coluna_nome_bairros,
+):
+    """Test that the columns of a hidden table leave the index, with their dataset queued."""
+    index = ColumnIndex()
+    table = coluna_nome_bairros.table
+    assert index.index_queryset().filter(pk=coluna_nome_bairros.pk).exists()
+
+    queued = []
+    monkeypatch.setattr(BDSignalProcessor, "enqueue", staticmethod(queued.extend))
+    status = Status.objects.create(slug="em_revisao", name="Em revisão")
+    table.status = status
+    table.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        status.slug = "under_review"
+        status.save()
+
+    assert queued == [table.dataset_id]
+    assert Dataset.objects.public().filter(pk=table.dataset_id).exists()
+    for queryset in [index.read_queryset(), index.index_queryset()]:
+        assert not queryset.filter(pk=coluna_nome_bairros.pk).exists()
+
+
+@pytest.mark.django_db
+def test_column_index_removes_the_stale_columns_by_batch(
+    monkeypatch, coluna_nome_bairros, coluna_populacao_bairros
+):
+    """Test that stale columns are removed by batch of datasets, keeping few terms each."""
+    index = ColumnIndex()
+    dataset_id = str(coluna_nome_bairros.table.dataset_id)
+    removed_id, other_id = str(uuid4()), str(uuid4())
+
+    def stale_column(column_dataset_id):
+        pk = str(uuid4())
+        return {
+            "id": f"v1.column.{pk}",
+            "django_ct": "v1.column",
+            "django_id": pk,
+            "column_dataset_id": column_dataset_id,
+        }
+
+    with use_memory_backend() as backend:
+        backend.index_documents([stale_column(pk) for pk in [dataset_id, removed_id, other_id]])
+        queries = []
+        remove_by_query = backend.remove_by_query
+
+        def record_query(query, commit=True):
+            queries.append(query)
+            remove_by_query(query, commit=commit)
+
+        monkeypatch.setattr(backend, "remove_by_query", record_query)
+        n_columns = index.update_datasets(backend, [removed_id, dataset_id], batchsize=1)
+        indexed = {doc["django_id"]: doc["column_dataset_id"] for doc in backend.documents.values()}
+
+    assert n_columns == 2
+    assert {str(coluna_nome_bairros.pk), str(coluna_populacao_bairros.pk)} < set(indexed)
+    assert sorted(indexed.values()) == sorted([dataset_id, dataset_id, other_id])
+    must_not = [query["bool"]["must_not"][0]["terms"]["django_id"] for query in queries]
+    assert sorted(len(column_ids) for column_ids in must_not) == [0, 2]
+
+
+@pytest.mark.django_db
+def test_stale_search_documents_are_found(dataset_dados_mestres):
+    """Test that datasets without an up to date search document are refreshed by the update."""
+    index = DatasetIndex()
+    assert index.get_stale_dataset_ids() == {dataset_dados_mestres.pk}
+
+    document = DatasetSearchDocument.refresh(dataset_dados_mestres)
+    assert document.temporal_ranges
+    assert index.get_stale_dataset_ids() == set()
+
+
+@pytest.mark.django_db
+def test_changed_datasets_follow_their_columns_tags_and_themes(
+    monkeypatch,
+    django_capture_on_commit_callbacks,
+    coluna_nome_bairros,
+    tag_aborto,
+    tema_saude,
+):
+    """Test that the incremental update and the signal queue follow the dataset relations."""
+    dataset = coluna_nome_bairros.table.dataset
+    dataset.tags.add(tag_aborto)
+    dataset.themes.add(tema_saude)
+    index = DatasetIndex()
+
+    for record in [coluna_nome_bairros, tag_aborto, tema_saude]:
+        since = datetime.now(timezone.utc)
+        assert index.get_changed_dataset_ids(since) == set()
+        record.save()
+        assert index.get_changed_dataset_ids(since) == {dataset.pk}
+
+    # Columns inserted with raw sql, as by `populate`, are stamped by the database
+    since = datetime.now(timezone.utc)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO "column" (id, name, is_in_staging, is_partition, table_id, is_closed, '
+            '"order") VALUES (%s, %s, true, false, %s, false, 0)',
+            [uuid4(), "raw", coluna_nome_bairros.table_id],
+        )
+    assert index.get_changed_dataset_ids(since) == {dataset.pk}
+
+    queued = []
+    monkeypatch.setattr(BDSignalProcessor, "enqueue", staticmethod(queued.extend))
+    with django_capture_on_commit_callbacks(execute=True):
+        tag_aborto.delete()
+    assert queued == [dataset.pk]
+
+
+@pytest.mark.django_db
+def test_prepared_result_matches_the_indexed_one(tabela_bairros, coverage_tabela_open):
+    """Test that the result rendered alone is the same as the one prepared for the index."""
+    dataset = Dataset.objects.get(pk=tabela_bairros.dataset_id)
+    index = DatasetIndex()
+    prepared = index.full_prepare(dataset)
+    for locale in ["pt", "en", "es"]:
+        assert index.prepare_result(dataset, locale) == prepared[f"result_{locale}"]
+
+
+@pytest.mark.django_db
+def test_saved_areas_queue_the_datasets_covering_them(
+    monkeypatch,
+    django_capture_on_commit_callbacks,
+    coverage_tabela_open,
+    area_br,
+):
+    """Test that the datasets of an area are queued, as their results embed its name."""
+    queued = []
+    monkeypatch.setattr(BDSignalProcessor, "enqueue", staticmethod(queued.extend))
+    with django_capture_on_commit_callbacks(execute=True):
+        area_br.name_en = "Brazil"
+        area_br.save()
+    assert queued == [coverage_tabela_open.table.dataset_id]
+
+
+@pytest.mark.django_db
+def test_temporal_ranges_end_with_their_periods(tabela_bairros):
+    """Test that the ranges end at the end of the period of `until`, or are open without it."""
+    coverage = Coverage.objects.create(table=tabela_bairros)
+    for bounds in [
+        {"start_year": 2005, "end_year": 2009},
+        {"start_year": 2012, "start_month": 1, "end_year": 2012, "end_month": 2},
+        {"start_year": 2015},
+    ]:
+        DateTimeRange.objects.create(coverage=coverage, interval=1, **bounds)
+
+    summary = CoverageSummary.refresh(Table.objects.get(pk=tabela_bairros.pk))
+    assert summary.temporal_ranges["all"] == [
+        {"gte": "2005-01-01T00:00:00", "lte": "2009-12-31T00:00:00"},
+        {"gte": "2012-01-01T00:00:00", "lte": "2012-02-29T00:00:00"},
+        {"gte": "2015-01-01T00:00:00"},
+    ]
+    assert summary.until_str == "2012-02"
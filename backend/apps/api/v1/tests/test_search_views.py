@@ -0,0 +1,470 @@
+# -*- coding: utf-8 -*-
+"""
+Pytest Django search views tests.
+"""
+
+from datetime import datetime
+from json import dumps, loads
+from unittest import mock
+from uuid import uuid4
+
+import pytest
+from django.core.serializers.json import DjangoJSONEncoder
+from elasticsearch import Elasticsearch
+from haystack import connections
+from haystack.models import SearchResult
+
+from backend.apps.api.v1.area_tree import AreaTree
+from backend.apps.api.v1.models import BigQueryType, Column, Dataset, Table
+from backend.apps.api.v1.search_cache import get_digest
+from backend.apps.api.v1.search_engines import ASCIIFoldingElasticBackend
+from backend.apps.api.v1.search_memory import use_memory_backend
+from backend.apps.api.v1.search_views import (
+    ColumnSearchView,
+    DatasetSearchView,
+    as_search_result,
+    prerender_search_result,
+    with_picture_urls,
+)
+
+
+def elasticsearch_response(total: int = 0) -> dict:
+    """Empty Elasticsearch response with the facet aggregations of the search view"""
+    facets = ["theme_slug", "organization_slug", "tag_slug", "entity_slug", "spatial_coverage"]
+    return {
+        "hits": {"total": {"value": total, "relation": "eq"}, "hits": []},
+        "aggregations": {facet: {"meta": {"_type": "terms"}, "buckets": []} for facet in facets},
+    }
+
+
+def test_search_view_makes_a_single_elasticsearch_request(client):
+    """Test that hits, count and facets of /search/ come from the same request"""
+    with (
+        mock.patch.object(ASCIIFoldingElasticBackend, "setup"),
+        mock.patch.object(
+            Elasticsearch, "search", return_value=elasticsearch_response(total=12345)
+        ) as search,
+    ):
+        response = client.get("/search/", {"q": "populacao", "page": 2, "page_size": 5})
+
+    assert response.status_code == 200
+    assert search.call_count == 1
+
+    body = search.call_args.kwargs["body"]
+    assert body["from"] == 5
+    assert body["size"] == 5
+    assert body["track_total_hits"] is True
+    assert "result_pt" in search.call_args.kwargs["_source_includes"]
+    assert "result_en" not in search.call_args.kwargs["_source_includes"]
+    assert {
+        "theme_slug",
+        "organization_slug",
+        "tag_slug",
+        "entity_slug",
+        "spatial_coverage",
+    } <= set(body["aggs"])
+
+    data = response.json()
+    assert data["count"] == 12345
+    assert data["results"] == []
+    assert {
+        "themes",
+        "organizations",
+        "tags",
+        "observation_levels",
+        "spatial_coverages",
+    } <= set(data["aggregations"])
+
+
+class FakeRedis(dict):
+    """Minimal in memory replacement of the redis client"""
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self:
+            return None
+        self[key] = value
+        return True
+
+    def exists(self, key):
+        return key in self
+
+    def delete(self, key):
+        self.pop(key, None)
+
+    def incr(self, key):
+        self[key] = int(self.get(key) or 0) + 1
+        return self[key]
+
+
+def test_search_cache_key_ignores_the_order_of_the_parameters():
+    """Test that the same filters in another order share the cached response"""
+    assert get_digest("search", {"theme": ["saude", "educacao"], "tag": [""]}) == get_digest(
+        "search", {"theme": ["educacao", "saude"]}
+    )
+    assert get_digest("search", {"page": ["1"]}) != get_digest("search", {"page": ["2"]})
+
+
+def test_search_view_caches_responses_until_the_index_changes(client):
+    """Test that repeated queries hit Elasticsearch once per index generation"""
+    redis = FakeRedis()
+    with (
+        mock.patch("backend.apps.api.v1.search_cache.get_redis_client", return_value=redis),
+        mock.patch.object(ASCIIFoldingElasticBackend, "setup"),
+        mock.patch.object(
+            Elasticsearch, "search", return_value=elasticsearch_response(total=7)
+        ) as search,
+    ):
+        first = client.get("/search/", {"theme": ["saude", "educacao"]})
+        second = client.get("/search/", {"theme": ["educacao", "saude"], "page": 1})
+        redis.incr("search:cache:generation")
+        third = client.get("/search/", {"theme": ["saude", "educacao"]})
+
+    assert search.call_count == 2
+    assert first["X-Cache"] == "MISS"
+    assert second["X-Cache"] == "HIT"
+    assert third["X-Cache"] == "MISS"
+    assert first.json() == second.json() == third.json()
+
+
+def test_search_view_profiles_requests_of_staff_members(rf):
+    """Test that staff members get the timings of the request, including Elasticsearch"""
+    raw_response = {**elasticsearch_response(total=3), "took": 4, "profile": {"shards": []}}
+    view = DatasetSearchView.as_view()
+    with (
+        mock.patch.object(ASCIIFoldingElasticBackend, "setup"),
+        mock.patch.object(Elasticsearch, "search", return_value=raw_response) as search,
+    ):
+        request = rf.get("/search/", {"profile": "es"})
+        request.user = mock.Mock(is_authenticated=True, is_staff=True)
+        response = view(request)
+
+        request = rf.get("/search/", {"profile": "es"})
+        request.user = mock.Mock(is_authenticated=True, is_staff=False)
+        anonymous_response = view(request)
+
+    assert search.call_args_list[0].kwargs["body"]["profile"] is True
+    assert "profile" not in search.call_args_list[1].kwargs["body"]
+
+    profile = loads(response.content)["profile"]
+    (es_timing,) = [timing for timing in profile["timings"] if timing["name"] == "es"]
+    assert es_timing["took"] == 4
+    assert es_timing["profile"] == {"shards": []}
+    assert {"es", "facets", "serialize", "render"} <= set(profile["summary"])
+    assert "es;dur=" in response["Server-Timing"]
+    assert "profile" not in loads(anonymous_response.content)
+    assert not anonymous_response.has_header("Server-Timing")
+
+
+def area_tree(*parents: tuple[str, str]) -> AreaTree:
+    """Area tree of `(parent, child)` slugs, without names"""
+    parent_of = {child: parent for parent, child in parents}
+    links = []
+    for slug in {slug for pair in parents for slug in pair}:
+        ancestor, depth = slug, 0
+        while ancestor:
+            links.append((ancestor, slug, depth))
+            ancestor, depth = parent_of.get(ancestor), depth + 1
+    return AreaTree(links)
+
+
+def test_search_view_filters_spatial_coverage_in_filter_context(client):
+    """Test that each selected area is a clause in filter context, matching its lineage"""
+    tree = area_tree(("world", "br"), ("br", "br_mg"), ("br_mg", "br_mg_3100104"))
+    with (
+        mock.patch.object(ASCIIFoldingElasticBackend, "setup"),
+        mock.patch.object(Elasticsearch, "search", return_value=elasticsearch_response()) as search,
+        mock.patch("backend.apps.api.v1.search_views.get_area_tree", return_value=tree),
+    ):
+        client.get("/search/", {"q": "populacao", "spatial_coverage": "br_mg_3100104,us"})
+
+    query = search.call_args.kwargs["body"]["query"]["bool"]
+    assert "query_string" in query["must"]
+    lineage = ["br_mg_3100104", "br_mg", "br"]
+    assert {"terms": {"spatial_coverage": lineage}} in query["filter"]
+    assert {"terms": {"spatial_coverage": ["us"]}} in query["filter"]
+
+
+def test_search_view_filters_temporal_coverage_by_intersecting_ranges(client):
+    """Test that the period is a range clause in filter context, from its first to last day"""
+    with (
+        mock.patch.object(ASCIIFoldingElasticBackend, "setup"),
+        mock.patch.object(Elasticsearch, "search", return_value=elasticsearch_response()) as search,
+    ):
+        client.get("/search/", {"temporal_start": "2010", "temporal_end": "2015-02"})
+        client.get("/search/", {"temporal_end": "2015", "temporal_type": "closed"})
+        client.get("/search/", {"temporal_start": "not a date"})
+
+    filters = [
+        call.kwargs["body"]["query"]["bool"].get("filter", []) for call in search.call_args_list
+    ]
+    assert {
+        "range": {
+            "temporal_range": {"gte": "2010-01-01", "lte": "2015-02-28", "relation": "intersects"}
+        }
+    } in filters[0]
+    assert {
+        "range": {"temporal_range_closed": {"lte": "2015-12-31", "relation": "intersects"}}
+    } in filters[1]
+    assert not any("range" in clause for clause in filters[2])
+
+
+def test_search_view_paginates_by_cursor_with_search_after(client):
+    """Test that the cursor of a page continues the sort after its last hit"""
+    response = elasticsearch_response(total=2)
+    response["hits"]["hits"] = [
+        {
+            "_id": "v1.dataset.1",
+            "_score": 1.0,
+            "_source": {"django_ct": "v1.dataset", "django_id": "1", "result_pt": {"id": "1"}},
+            "sort": [1, 1.0, 1700000000000, "1"],
+        }
+    ]
+    with (
+        mock.patch.object(ASCIIFoldingElasticBackend, "setup"),
+        mock.patch.object(Elasticsearch, "search", return_value=response) as search,
+    ):
+        first = client.get("/search/", {"cursor": "", "page_size": 1}).json()
+        client.get("/search/", {"cursor": first["next_cursor"], "page_size": 1})
+
+    first_body, second_body = (call.kwargs["body"] for call in search.call_args_list)
+    assert "search_after" not in first_body
+    assert second_body["search_after"] == [1, 1.0, 1700000000000, "1"]
+    assert second_body["from"] == 0
+    assert {"django_id": {"order": "asc"}} in second_body["sort"]
+
+    assert client.get("/search/", {"cursor": "not a cursor"}).status_code == 400
+
+
+def test_facet_values_view_pages_values_by_prefix(client):
+    """Test that facet values are a page of a composite aggregation of the prefixed values"""
+    labels = {
+        "saude": {"name": "Saúde", "fallback": False},
+        "saneamento": {"name": "Saneamento", "fallback": False},
+        "educacao": {"name": "Educação", "fallback": False},
+    }
+    response = elasticsearch_response()
+    response["aggregations"] = {
+        "theme_slug": {
+            "meta": {"_type": "composite"},
+            "doc_count": 3,
+            "values": {
+                "after_key": {"key": "saude"},
+                "buckets": [{"key": {"key": "saude"}, "doc_count": 3}],
+            },
+        }
+    }
+    with (
+        mock.patch("backend.apps.api.v1.search_views.get_labels", return_value=labels),
+        mock.patch.object(ASCIIFoldingElasticBackend, "setup"),
+        mock.patch.object(Elasticsearch, "search", return_value=response) as search,
+    ):
+        data = client.get(
+            "/facet_values/", {"facet": "theme_slug", "prefix": "SA", "page_size": 1}
+        ).json()
+        client.get(
+            "/facet_values/",
+            {"facet": "theme_slug", "prefix": "SA", "page_size": 1, "cursor": data["next_cursor"]},
+        )
+
+    first_body, second_body = (call.kwargs["body"] for call in search.call_args_list)
+    aggregation = first_body["aggs"]["theme_slug"]
+    assert first_body["size"] == 0
+    assert aggregation["filter"] == {"terms": {"theme_slug_exact": ["saneamento", "saude"]}}
+    assert aggregation["aggs"]["values"]["composite"]["size"] == 1
+    assert second_body["aggs"]["theme_slug"]["aggs"]["values"]["composite"]["after"] == {
+        "key": "saude"
+    }
+    assert data["values"] == [{"key": "saude", "count": 3, "name": "Saúde", "fallback": False}]
+
+
+def test_suggest_view_completes_dataset_names(client):
+    """Test that suggestions come from the completion field of the locale"""
+    response = {
+        "suggest": {
+            "suggest_en": [
+                {
+                    "text": "cens",
+                    "options": [
+                        {
+                            "text": "Census",
+                            "_source": {
+                                "dataset_id": "1",
+                                "dataset_slug": "censo",
+                                "dataset_name_en": "Census",
+                            },
+                        }
+                    ],
+                }
+            ]
+        }
+    }
+    with (
+        mock.patch.object(ASCIIFoldingElasticBackend, "setup"),
+        mock.patch.object(Elasticsearch, "search", return_value=response) as search,
+    ):
+        data = client.get("/search/suggest/", {"q": "cens", "locale": "en"}).json()
+
+    suggest = search.call_args.kwargs["body"]["suggest"]["suggest_en"]
+    assert suggest == {"prefix": "cens", "completion": {"field": "suggest_en", "size": 10}}
+    assert data["results"] == [{"id": "1", "slug": "censo", "name": "Census"}]
+
+
+def memory_document(pk: int, **fields) -> dict:
+    """Prepared dataset document, as indexed by the dataset index"""
+    document = {
+        "id": f"v1.dataset.{pk}",
+        "django_ct": "v1.dataset",
+        "django_id": str(pk),
+        "dataset_id": str(pk),
+        "dataset_slug": f"dataset_{pk}",
+        "updated_at": datetime(2024, 1, pk),
+        "contains_tables": False,
+        **fields,
+    }
+    for locale in ["pt", "en", "es"]:
+        document[f"result_{locale}"] = prerender_search_result(document, locale)
+    return document
+
+
+def test_search_results_are_prerendered_in_the_index():
+    """Test that prerendered results only lack the picture urls of the rendered ones"""
+    document = memory_document(
+        1,
+        dataset_name_pt="Censo Demográfico",
+        organization_id=["9"],
+        organization_slug=["ibge"],
+        organization_name_pt=["IBGE"],
+        organization_picture=["organization/ibge.png"],
+    )
+    picture_urls = {"organization/ibge.png": "https://storage/organization/ibge.png"}
+
+    prerendered = document["result_pt"]
+    assert prerendered["organizations"][0]["picture"] == "organization/ibge.png"
+    assert prerendered["updated_at"] == "2024-01-01T00:00:00"
+
+    result = SearchResult("v1", "dataset", "1", 1.0, **document)
+    rendered = as_search_result(result, "pt", {}, picture_urls)
+    assert with_picture_urls(prerendered, picture_urls) == loads(
+        dumps(rendered, cls=DjangoJSONEncoder)
+    )
+
+
+def test_search_views_with_the_memory_backend(client):
+    """Test the search views end to end without Elasticsearch"""
+    with (
+        use_memory_backend() as backend,
+        mock.patch("backend.apps.api.v1.search_views.get_labels", return_value={}),
+        mock.patch(
+            "backend.apps.api.v1.search_views.get_area_tree",
+            return_value=area_tree(("br", "br_sp"), ("br_sp", "br_sp_3550308")),
+        ),
+    ):
+        backend.index_documents(
+            [
+                memory_document(
+                    1,
+                    text="Censo Demográfico",
+                    theme_slug=["populacao"],
+                    spatial_coverage=["br"],
+                    suggest_pt=["Censo Demográfico", "Demográfico"],
+                    dataset_name_pt="Censo Demográfico",
+                ),
+                memory_document(
+                    2,
+                    text="Censo Escolar",
+                    theme_slug=["educacao"],
+                    spatial_coverage=["br_sp"],
+                    temporal_range=[{"gte": "2005-01-01T00:00:00", "lte": "2009-12-31T00:00:00"}],
+                    contains_tables=True,
+                ),
+                memory_document(
+                    3,
+                    text="Eleições",
+                    theme_slug=["politica"],
+                    temporal_range=[{"gte": "2015-01-01T00:00:00"}],
+                ),
+            ]
+        )
+
+        search = client.get("/search/", {"q": "censo"}).json()
+        spatial = client.get("/search/", {"spatial_coverage": "br_sp_3550308"}).json()
+        temporal = client.get("/search/", {"temporal_start": "2009-06", "temporal_end": "2012"})
+        temporal = temporal.json()
+        open_ended = client.get("/search/", {"temporal_start": "2020"}).json()
+        pages = [client.get("/search/", {"cursor": "", "page_size": 2}).json()]
+        pages.append(
+            client.get("/search/", {"cursor": pages[0]["next_cursor"], "page_size": 2}).json()
+        )
+        facet = client.get("/facet_values/", {"facet": "theme_slug", "page_size": 2}).json()
+        suggest = client.get("/search/suggest/", {"q": "demog"}).json()
+
+    assert search["count"] == 2
+    assert [r["id"] for r in search["results"]] == ["2", "1"]
+    assert {v["key"] for v in search["aggregations"]["themes"]} == {"educacao", "populacao"}
+    assert [r["id"] for r in spatial["results"]] == ["2", "1"]
+    assert [r["id"] for r in temporal["results"]] == ["2"]
+    assert [r["id"] for r in open_ended["results"]] == ["3"]
+    assert [r["id"] for page in pages for r in page["results"]] == ["2", "3", "1"]
+    assert [v["key"] for v in facet["values"]] == ["educacao", "politica"]
+    assert suggest["results"] == [{"id": "1", "slug": "dataset_1", "name": "Censo Demográfico"}]
+
+
+@pytest.mark.django_db
+def test_search_view_skips_the_hits_of_removed_datasets(client):
+    """Test that hits not prerendered, whose dataset is gone, are left out of the results"""
+    removed = memory_document(2, django_id=str(uuid4()))
+    for locale in ["pt", "en", "es"]:
+        removed.pop(f"result_{locale}")
+
+    with use_memory_backend() as backend:
+        backend.index_documents([memory_document(1), removed])
+        response = client.get("/search/", {"locale": "fr"})
+
+    assert response.status_code == 200
+    assert response.json()["locale"] == "pt"
+    assert response.json()["count"] == 2
+    assert [r["id"] for r in response.json()["results"]] == ["1"]
+
+
+def test_column_search_view_with_the_memory_backend(client):
+    """Test that columns are searched apart from datasets, with facets by dataset and type"""
+    dataset = Dataset(id=uuid4(), slug="censo", name="Censo", name_pt="Censo")
+    table = Table(id=uuid4(), dataset=dataset, slug="municipio", name_pt="Município")
+    string, integer = BigQueryType(name="STRING"), BigQueryType(name="INT64")
+    columns = [
+        Column(id=uuid4(), table=table, name="id_municipio", bigquery_type=string),
+        Column(id=uuid4(), table=table, name="populacao", bigquery_type=integer),
+        Column(id=uuid4(), table=table, name="sigla_uf", bigquery_type=string),
+    ]
+
+    with (
+        use_memory_backend() as backend,
+        mock.patch.object(
+            ColumnSearchView,
+            "get_dataset_labels",
+            return_value={str(dataset.pk): {"slug": "censo", "name": "Censo"}},
+        ),
+    ):
+        backend.index_documents([memory_document(1, text="Município")])
+        backend.update(connections["default"].get_unified_index().get_index(Column), columns)
+
+        search = client.get("/search/", {"q": "municipio"}).json()
+        found = client.get("/search/columns/", {"q": "municipio"}).json()
+        named = client.get("/search/columns/", {"q": "populacao"}).json()
+        typed = client.get("/search/columns/", {"bigquery_type": "STRING", "page_size": 1}).json()
+
+    assert [r["id"] for r in search["results"]] == ["1"]
+    assert found["count"] == 3
+    assert named["results"][0]["bigquery_type"] == "INT64"
+    assert found["results"][0]["table"] == {
+        "id": str(table.pk),
+        "slug": "municipio",
+        "name": "Município",
+    }
+    assert found["aggregations"]["datasets"] == [
+        {"key": str(dataset.pk), "count": 3, "slug": "censo", "name": "Censo"}
+    ]
+    assert typed["count"] == 2
+    assert len(typed["results"]) == 1
+    assert {v["key"]: v["count"] for v in typed["aggregations"]["bigquery_types"]} == {"STRING": 2}
+    assert [r["name"] for r in named["results"]] == ["populacao"]
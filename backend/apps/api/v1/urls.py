@@ -4,7 +4,12 @@ from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
 from graphene_file_upload.django import FileUploadGraphQLView
 
-from backend.apps.api.v1.search_views import DatasetFacetValuesView, DatasetSearchView
+from backend.apps.api.v1.search_views import (
+    ColumnSearchView,
+    DatasetFacetValuesView,
+    DatasetSearchView,
+    DatasetSuggestView,
+)
 from backend.apps.api.v1.views import (
     DatasetRedirectView,
     columns_view,
@@ -28,6 +33,8 @@ urlpatterns = [
     path("api/v1/graphql", graphql_view()),
     path("graphql", graphql_view()),
     path("search/", DatasetSearchView.as_view()),
+    path("search/suggest/", DatasetSuggestView.as_view()),
+    path("search/columns/", ColumnSearchView.as_view()),
     path("facet_values/", DatasetFacetValuesView.as_view()),
     path("dataset/", DatasetRedirectView.as_view()),
     path("dataset_redirect/", DatasetRedirectView.as_view()),
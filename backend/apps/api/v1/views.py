@@ -134,11 +134,7 @@ def table_stats(request: HttpRequest):
     """
     Calculates and returns statistics about the tables and datasets.
     """
-    treated_tables = (
-        Table.objects.exclude(status__slug__in=["under_review", "excluded"])
-        .exclude(slug__in=["dicionario", "dictionary"])
-        .exclude(dataset__status__slug__in=["under_review", "excluded"])
-    )
+    treated_tables = Table.objects.public().exclude(slug__in=["dicionario", "dictionary"])
 
     datasets_with_treated_tables_count = (
         treated_tables.values_list("dataset_id", flat=True).distinct().count()
@@ -201,10 +197,10 @@ def columns_view(request: HttpRequest, table_id: str = None, column_id: str = No
                 "table__dataset",
                 "bigquery_type",
                 "directory_primary_key__table__dataset",
+                "coverage_summary",
+                "table__coverage_summary",
             )
-            .prefetch_related(
-                "directory_primary_key__table__cloud_tables", "coverages__datetime_ranges"
-            )
+            .prefetch_related("directory_primary_key__table__cloud_tables", "coverages")
             .order_by("order")
         )
 
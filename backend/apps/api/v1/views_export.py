@@ -51,10 +51,9 @@ class ExportTablesView(View):
         writer.writerow(headers[locale])
 
         tables = (
-            Table.objects.select_related("dataset")
+            Table.objects.select_related("dataset", "coverage_summary")
             .prefetch_related("coverages", "columns", "columns__coverages")
-            .exclude(status__slug__in=["under_review", "excluded"])
-            .exclude(dataset__status__slug__in=["under_review", "excluded"])
+            .public()
             .order_by("dataset__name")
         )
 
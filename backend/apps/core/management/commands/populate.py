@@ -7,6 +7,8 @@ from django.core.management.base import BaseCommand
 from django.db import connection, models, transaction
 from tqdm import tqdm
 
+from backend.apps.api.v1.area_tree import invalidate_area_tree
+
 
 class BulkUpdate:
     """
@@ -500,6 +502,15 @@ class Command(BaseCommand):
 
             bulk.bulk_update()
 
+            # Inserções em sql puro não passam pelo `save`, que guarda os limites dos intervalos
+            apps.get_model(app_name, "DateTimeRange").objects.refresh_bounds()
+            # Nem pelos sinais, que mantêm a visibilidade dos conjuntos e seus recursos
+            for model_name in ["Dataset", "Table", "RawDataSource"]:
+                apps.get_model(app_name, model_name).objects.refresh_is_public()
+            # Nem o fechamento da hierarquia de áreas, que é recalculado para todas as áreas
+            apps.get_model(app_name, "AreaClosure").rebuild()
+            invalidate_area_tree()
+
         # Popula as tabelas sem modelos correspondentes
         if tables_without_models:
             # Desabilita constraints para tabelas sem modelos
@@ -1,4 +1,34 @@
 # -*- coding: utf-8 -*-
-from django.test import TestCase  # noqa
+import json
+from io import StringIO
 
-# Create your tests here.
+import pytest
+from django.core.management import call_command
+
+from backend.apps.api.v1.models import Area, AreaClosure
+from backend.apps.core.management.commands import populate
+
+
+@pytest.mark.django_db
+def test_populate_rebuilds_the_area_closure(monkeypatch, tmp_path):
+    """Test that the areas inserted by the populate command get their closure and tree."""
+    brasil, rio = "8b0e1f2c-3a3b-4c56-9d1e-000000000001", "8b0e1f2c-3a3b-4c56-9d1e-000000000002"
+    (tmp_path / "metabase_data").mkdir()
+    (tmp_path / "metabase_data" / "area.json").write_text(
+        json.dumps(
+            [
+                {"id": brasil, "slug": "br", "name": "Brasil"},
+                {"id": rio, "slug": "br_rj", "name": "Rio de Janeiro", "parent": brasil},
+            ]
+        )
+    )
+    invalidations = []
+    monkeypatch.setattr(populate, "invalidate_area_tree", lambda: invalidations.append(True))
+    monkeypatch.chdir(tmp_path)
+
+    call_command("populate", stdout=StringIO())
+
+    assert Area.objects.get(slug="br_rj").parent.slug == "br"
+    links = AreaClosure.objects.values_list("ancestor__slug", "descendant__slug", "depth")
+    assert sorted(links) == [("br", "br", 0), ("br", "br_rj", 1), ("br_rj", "br_rj", 0)]
+    assert invalidations == [True]
@@ -375,14 +375,15 @@ def fixture_dataset_dados_mestres(
     status_em_processamento,
 ):
     """Test for Dataset."""
-    return Dataset.objects.create(
-        organization=organizacao_bd,
+    dataset = Dataset.objects.create(
         slug="dados_mestres",
         name="Dados Mestres",
         description="Descrição dos dados mestres",
         status=status_em_processamento,
         version=1,
     )
+    dataset.organizations.add(organizacao_bd)
+    return dataset
 
 
 #############################################################################################
@@ -7,6 +7,7 @@ from django.conf import settings
 from google.cloud.bigquery import Client as GBQClient
 from google.cloud.storage import Client as GCSClient
 from google.oauth2.service_account import Credentials
+from huey.contrib.djhuey import HUEY
 from loguru import logger
 from requests import Session, post
 
@@ -35,6 +36,11 @@ def get_gcs_client():
     return GCSClient(credentials=get_gcloud_credentials())
 
 
+def get_redis_client():
+    """Get redis client, shared with the task queue"""
+    return HUEY.storage.conn
+
+
 def send_discord_message(message: str):
     """Send a message to a discord channel"""
     if url := settings.DISCORD_BACKEND_WEBHOOK_URL:
@@ -6,13 +6,15 @@ https://github.com/timothyjlaurent/auto-graphene-django
 
 from graphene import Connection, Int, Scalar, relay
 
+from backend.custom.storage import get_file_url
+
 
 class FileFieldScalar(Scalar):
     @staticmethod
     def serialize(value):
         if not value:
             return ""
-        return value.url
+        return get_file_url(value.name)
 
     @staticmethod
     def parse_literal(node):
@@ -1,9 +1,18 @@
 # -*- coding: utf-8 -*-
 from os.path import join
 from typing import Any
+from urllib.parse import quote
 
-from django.core.files.storage import get_storage_class
+from django.conf import settings
+from django.core.files.storage import default_storage, get_storage_class
 from django.core.validators import FileExtensionValidator
+from loguru import logger
+
+from backend.custom.client import get_redis_client
+
+URL_KEY = "storage:url:{name}"
+URL_HITS_KEY = "storage:url:hits"
+URL_MISSES_KEY = "storage:url:misses"
 
 
 def upload_to(instance: Any, filename: str):
@@ -25,3 +34,60 @@ class OverwriteStorage(get_storage_class()):
 
     def get_available_name(self, name, max_length=None):
         return name
+
+
+def get_file_urls(names: list[str]) -> dict[str, str]:
+    """Get the urls of many files by name
+
+    - If `STORAGE_PUBLIC_URL` is set, the urls are built from it without signing
+    - If `STORAGE_URL_CACHE_TIMEOUT` is set, signed urls are shared through redis,
+      so that each one is signed once per timeout instead of once per request
+    """
+    names = list({name for name in names if name})
+    if not names:
+        return {}
+
+    if public_url := settings.STORAGE_PUBLIC_URL:
+        return {name: f"{public_url.rstrip('/')}/{quote(name)}" for name in names}
+
+    if not settings.STORAGE_URL_CACHE_TIMEOUT:
+        return {name: default_storage.url(name) for name in names}
+
+    try:
+        redis = get_redis_client()
+        cached = redis.mget([URL_KEY.format(name=name) for name in names])
+    except Exception as error:
+        logger.warning(error)
+        return {name: default_storage.url(name) for name in names}
+
+    urls = {}
+    missing = {}
+    for name, url in zip(names, cached):
+        if url:
+            urls[name] = url.decode()
+        else:
+            urls[name] = missing[name] = default_storage.url(name)
+
+    try:
+        with redis.pipeline(transaction=False) as pipeline:
+            for name, url in missing.items():
+                pipeline.set(URL_KEY.format(name=name), url, ex=settings.STORAGE_URL_CACHE_TIMEOUT)
+            pipeline.incrby(URL_HITS_KEY, len(names) - len(missing))
+            pipeline.incrby(URL_MISSES_KEY, len(missing))
+            pipeline.execute()
+    except Exception as error:
+        logger.warning(error)
+
+    return urls
+
+
+def get_file_url(name: str) -> str | None:
+    """Get the url of a file by name, see `get_file_urls`"""
+    return get_file_urls([name]).get(name)
+
+
+def get_url_cache_stats() -> dict[str, int]:
+    """Get the number of hits and misses of the url cache"""
+    redis = get_redis_client()
+    hits, misses = redis.mget([URL_HITS_KEY, URL_MISSES_KEY])
+    return {"hits": int(hits or 0), "misses": int(misses or 0)}
@@ -142,6 +142,11 @@ STATIC_URL = "static/"
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Base url of a public bucket or cdn to serve files from, skipping signed urls
+STORAGE_PUBLIC_URL = getenv("STORAGE_PUBLIC_URL")
+# Seconds to share the signed urls of files between workers, zero disables the cache
+STORAGE_URL_CACHE_TIMEOUT = 0
+
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/"
 
@@ -217,6 +222,12 @@ HAYSTACK_LIMIT_TO_REGISTERED_MODELS = True
 HAYSTACK_SEARCH_RESULTS_PER_PAGE = 100
 HAYSTACK_SIGNAL_PROCESSOR = "backend.apps.api.v1.signals.BDSignalProcessor"
 
+# Seconds to wait for more changes before updating the datasets in the search index
+SEARCH_INDEX_DEBOUNCE_SECONDS = int(getenv("SEARCH_INDEX_DEBOUNCE_SECONDS", 10))
+
+# Seconds to keep the responses of the search views, zero disables the cache
+SEARCH_CACHE_TIMEOUT = int(getenv("SEARCH_CACHE_TIMEOUT", 300))
+
 X_FRAME_OPTIONS = "SAMEORIGIN"
 
 JAZZMIN_SETTINGS = {
@@ -69,6 +69,8 @@ GS_SERVICE_ACCOUNT = getenv("GCP_SA")
 GS_CREDENTIALS = service_account.Credentials.from_service_account_info(loads(GS_SERVICE_ACCOUNT))
 GS_BUCKET_NAME = getenv("GCP_BUCKET_NAME")
 GS_EXPIRATION = timedelta(seconds=604800)
+# Signed urls are reused for a day, so they are always valid for six more days
+STORAGE_URL_CACHE_TIMEOUT = 86400
 STORAGES = {
     "default": {
         "BACKEND": "storages.backends.gcloud.GoogleCloudStorage",